@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Offline benchmarks of the Magento and WooCommerce connectors, see run.py for the usage.
+"""
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Generators of the fixture data used by the stub servers and the benchmark scenarios. Data is generated with a
+seeded random generator, so the same options always generate the same data.
+"""
+import random
+from datetime import datetime, timedelta
+
+MAGENTO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+VARIANT_COLORS = ['Black', 'White', 'Red', 'Blue', 'Green', 'Grey', 'Yellow', 'Orange']
+VARIANT_SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+
+
+def generate_magento_catalog(product_count=100, variant_count=0, seed=1, first_id=100000):
+    """
+    Generate the Magento products of a catalogue. Each product is a simple product, or a configurable product
+    with its simple children when variant_count is set.
+    :param product_count: number of simple or configurable products
+    :param variant_count: number of children of each configurable product, 0 for simple products
+    :param seed: seed of the random generator
+    :param first_id: entity ID of the first product
+    :return: list of Magento products, like the items of /V1/products
+    """
+    rand = random.Random(seed)
+    products = []
+    entity_id = first_id
+    for index in range(product_count):
+        sku = 'BENCH-%06d' % index
+        parent = _prepare_magento_product(entity_id, sku, 'Benchmark Product %s' % index,
+                                          'configurable' if variant_count else 'simple', rand)
+        products.append(parent)
+        entity_id += 1
+        children = []
+        for variant in range(variant_count):
+            color = VARIANT_COLORS[variant % len(VARIANT_COLORS)]
+            size = VARIANT_SIZES[(variant // len(VARIANT_COLORS)) % len(VARIANT_SIZES)]
+            child = _prepare_magento_product(entity_id, '%s-%s-%s-%s' % (sku, color, size, variant),
+                                             '%s %s %s' % (parent.get('name'), color, size), 'simple', rand)
+            child.get('custom_attributes').extend([{'attribute_code': 'color', 'value': color},
+                                                   {'attribute_code': 'size', 'value': size}])
+            children.append(child)
+            entity_id += 1
+        if children:
+            parent.get('extension_attributes').update({
+                'configurable_product_links': [child.get('id') for child in children],
+                'configurable_product_options': [
+                    {'id': 1, 'attribute_id': '93', 'label': 'Color', 'position': 0,
+                     'values': [{'value_index': index} for index in range(min(variant_count, 8))],
+                     'product_id': parent.get('id')}]})
+        products.extend(children)
+    return products
+
+
+def _prepare_magento_product(entity_id, sku, name, type_id, rand):
+    now = datetime.utcnow().strftime(MAGENTO_DATETIME_FORMAT)
+    return {
+        'id': entity_id, 'sku': sku, 'name': name, 'attribute_set_id': 4, 'price': round(rand.uniform(5, 500), 2),
+        'status': 1, 'visibility': 4, 'type_id': type_id, 'created_at': now, 'updated_at': now,
+        'weight': round(rand.uniform(0.1, 5), 2),
+        'extension_attributes': {
+            'website_ids': [1],
+            'stock_item': {'item_id': entity_id, 'product_id': entity_id, 'stock_id': 1,
+                           'qty': rand.randint(0, 1000), 'is_in_stock': True}},
+        'custom_attributes': [{'attribute_code': 'description', 'value': '<p>%s</p>' % name},
+                              {'attribute_code': 'tax_class_id', 'value': '2'}],
+        'media_gallery_entries': [],
+    }
+
+
+def generate_magento_orders(catalog, order_count=100, line_count=5, seed=1, first_id=500000, payment_method='checkmo',
+                            shipping_method='flatrate_flatrate', store_id=1, website_id=1, currency='USD'):
+    """
+    Generate Magento orders of the simple products of the catalogue.
+    :param catalog: list of Magento products
+    :param order_count: number of orders
+    :param line_count: number of lines of each order
+    :param payment_method: payment method code, it must be configured in the instance
+    :param shipping_method: shipping method code, it must be configured in the instance
+    :return: list of Magento orders, like the items of /V1/orders
+    """
+    rand = random.Random(seed)
+    products = [product for product in catalog if product.get('type_id') == 'simple']
+    parents = {child_id: product for product in catalog
+               for child_id in product.get('extension_attributes', {}).get('configurable_product_links', [])}
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    orders = []
+    for index in range(order_count):
+        entity_id = first_id + index
+        items, subtotal = [], 0.0
+        for line_index, product in enumerate(rand.sample(products, min(line_count, len(products)))):
+            qty = rand.randint(1, 5)
+            subtotal += qty * product.get('price')
+            items.append({
+                'item_id': entity_id * 100 + line_index, 'order_id': entity_id, 'product_id': product.get('id'),
+                'sku': product.get('sku'), 'name': product.get('name'), 'product_type': 'simple',
+                'qty_ordered': qty, 'price': product.get('price'), 'base_price': product.get('price'),
+                'original_price': product.get('price'), 'price_incl_tax': product.get('price'), 'tax_percent': 0,
+                'tax_amount': 0, 'discount_amount': 0, 'row_total': qty * product.get('price'),
+                'store_id': store_id,
+                'extension_attributes': {'simple_parent_id': parents[product.get('id')].get('id')}
+                if product.get('id') in parents else {}})
+        address = _prepare_magento_address(index, rand)
+        orders.append({
+            'entity_id': entity_id, 'increment_id': 'B%09d' % entity_id, 'state': 'processing',
+            'status': 'processing', 'store_id': store_id, 'website_id': website_id,
+            'created_at': (created_at + timedelta(seconds=index)).strftime(MAGENTO_DATETIME_FORMAT),
+            'base_currency_code': currency, 'order_currency_code': currency, 'customer_is_guest': 1,
+            'customer_email': address.get('email'), 'customer_firstname': address.get('firstname'),
+            'customer_lastname': address.get('lastname'), 'subtotal': subtotal, 'grand_total': subtotal + 5,
+            'shipping_amount': 5, 'base_shipping_amount': 5, 'shipping_incl_tax': 5, 'base_shipping_incl_tax': 5,
+            'shipping_tax_amount': 0, 'discount_amount': 0, 'base_discount_amount': 0,
+            'discount_tax_compensation_amount': 0,
+            'items': items, 'billing_address': dict(address, address_type='billing'),
+            'payment': {'method': payment_method, 'amount_ordered': subtotal + 5},
+            'extension_attributes': {
+                'shipping_assignments': [{'shipping': {'method': shipping_method,
+                                                       'address': dict(address, address_type='shipping')},
+                                          'items': items}],
+                'payment_additional_info': [], 'applied_taxes': [], 'item_applied_taxes': []},
+        })
+    return orders
+
+
+def _prepare_magento_address(index, rand):
+    return {
+        'firstname': 'Bench', 'lastname': 'Customer %s' % index, 'email': 'bench.customer%s@example.com' % index,
+        'street': ['%s Benchmark Street' % rand.randint(1, 999)], 'city': 'Austin', 'postcode': '73301',
+        'country_id': 'US', 'region': 'Texas', 'region_code': 'TX', 'telephone': '5550100%03d' % (index % 1000),
+    }
+
+
+def generate_stock_snapshot(skus, seed=1, source_code='default'):
+    """
+    Generate the stock of the SKUs, like the source items of Magento MSI.
+    :param skus: list of SKUs
+    :return: list of dictionaries like {'sku': 'A', 'source_code': 'default', 'quantity': 10, 'status': 1}
+    """
+    rand = random.Random(seed)
+    return [{'sku': sku, 'source_code': source_code, 'quantity': rand.randint(0, 1000), 'status': 1}
+            for sku in skus]
+
+
+def generate_woo_catalog(product_count=100, variant_count=0, seed=1, first_id=100000):
+    """
+    Generate the WooCommerce products of a catalogue, variable products have their variations in the
+    variations key.
+    :return: list of WooCommerce products, like the response of products endpoint
+    """
+    rand = random.Random(seed)
+    products, woo_id = [], first_id
+    for index in range(product_count):
+        price = round(rand.uniform(5, 500), 2)
+        product = {'id': woo_id, 'name': 'Benchmark Product %s' % index, 'sku': 'BENCH-%06d' % index,
+                   'type': 'variable' if variant_count else 'simple', 'status': 'publish',
+                   'regular_price': str(price), 'price': str(price), 'manage_stock': True,
+                   'stock_quantity': rand.randint(0, 1000), 'weight': '1', 'categories': [], 'tags': [],
+                   'images': [], 'attributes': [], 'variations': []}
+        woo_id += 1
+        for variant in range(variant_count):
+            color = VARIANT_COLORS[variant % len(VARIANT_COLORS)]
+            product.get('variations').append({
+                'id': woo_id, 'sku': '%s-%s-%s' % (product.get('sku'), color, variant), 'regular_price': str(price),
+                'price': str(price), 'manage_stock': True, 'stock_quantity': rand.randint(0, 1000),
+                'attributes': [{'id': 1, 'name': 'Color', 'option': color}], 'image': {}})
+            woo_id += 1
+        if variant_count:
+            product.get('attributes').append({'id': 1, 'name': 'Color', 'variation': True, 'visible': True,
+                                              'options': VARIANT_COLORS[:min(variant_count, 8)]})
+        products.append(product)
+    return products
+
+
+def generate_woo_orders(catalog, order_count=100, line_count=5, seed=1, first_id=500000, payment_method='cod',
+                        shipping_method='flat_rate', currency='USD'):
+    """
+    Generate WooCommerce orders of the simple products and variations of the catalogue.
+    :return: list of WooCommerce orders, like the response of orders endpoint
+    """
+    rand = random.Random(seed)
+    items = []
+    for product in catalog:
+        items.extend([(product, variation) for variation in product.get('variations')] or [(product, {})])
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    orders = []
+    for index in range(order_count):
+        line_items, total = [], 0.0
+        for line_index, (product, variation) in enumerate(rand.sample(items, min(line_count, len(items)))):
+            qty = rand.randint(1, 5)
+            price = float((variation or product).get('price'))
+            total += qty * price
+            line_items.append({
+                'id': (first_id + index) * 100 + line_index, 'name': product.get('name'),
+                'product_id': product.get('id'), 'variation_id': variation.get('id', 0), 'quantity': qty,
+                'sku': (variation or product).get('sku'), 'price': price, 'subtotal': str(qty * price),
+                'total': str(qty * price), 'total_tax': '0', 'taxes': [], 'meta_data': []})
+        address = {'first_name': 'Bench', 'last_name': 'Customer %s' % index, 'company': '',
+                   'address_1': '%s Benchmark Street' % rand.randint(1, 999), 'address_2': '', 'city': 'Austin',
+                   'state': 'TX', 'postcode': '73301', 'country': 'US',
+                   'email': 'bench.customer%s@example.com' % index, 'phone': '5550100%03d' % (index % 1000)}
+        date_created = (created_at + timedelta(seconds=index)).strftime('%Y-%m-%dT%H:%M:%S')
+        orders.append({
+            'id': first_id + index, 'number': str(first_id + index), 'status': 'processing', 'currency': currency,
+            'date_created': date_created, 'date_created_gmt': date_created, 'date_modified': date_created,
+            'date_modified_gmt': date_created, 'prices_include_tax': False, 'customer_id': 0,
+            'discount_total': '0', 'shipping_total': '5', 'total_tax': '0', 'total': str(total + 5),
+            'payment_method': payment_method, 'payment_method_title': payment_method, 'transaction_id': '',
+            'billing': address, 'shipping': dict(address), 'line_items': line_items, 'tax_lines': [],
+            'shipping_lines': [{'id': first_id + index, 'method_id': shipping_method, 'method_title': shipping_method,
+                                'total': '5', 'total_tax': '0', 'taxes': []}],
+            'fee_lines': [], 'coupon_lines': [], 'meta_data': [], 'customer_note': ''})
+    return orders
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Run the benchmark scenarios in an Odoo shell of a dedicated benchmark database, from the root of the repository:
+
+    BENCH_MAGENTO_INSTANCE=1 BENCH_SCENARIOS=magento_order_import,magento_stock_export \\
+        odoo-bin shell -d benchmark --addons-path=... < benchmarks/run.py
+
+Options are read from the environment variables:
+    BENCH_MAGENTO_INSTANCE: ID of the Magento instance used by the Magento scenarios.
+    BENCH_WOO_INSTANCE: ID of the WooCommerce instance used by the WooCommerce scenarios.
+    BENCH_SCENARIOS: comma separated names of scenarios, all scenarios of the given instances by default.
+    BENCH_ORDERS, BENCH_LINES, BENCH_PRODUCTS, BENCH_VARIANTS: size of the generated fixtures.
+    BENCH_LATENCY: latency of the stub servers in seconds.
+    BENCH_ERROR_RATE: rate of the requests answered with 503 by the stub servers, like 0.01.
+    BENCH_SEED: seed of the generated fixtures.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from benchmarks.scenarios import MAGENTO_SCENARIOS, WOO_SCENARIOS  # noqa: E402
+
+
+def get_scenario_options(name):
+    options = {'latency': float(os.environ.get('BENCH_LATENCY', 0.0)),
+               'error_rate': float(os.environ.get('BENCH_ERROR_RATE', 0.0)),
+               'seed': int(os.environ.get('BENCH_SEED', 1))}
+    if name.endswith('order_import'):
+        options.update({'order_count': int(os.environ.get('BENCH_ORDERS', 100)),
+                        'line_count': int(os.environ.get('BENCH_LINES', 5)),
+                        'variant_count': int(os.environ.get('BENCH_VARIANTS', 0))})
+    elif name.endswith('product_import'):
+        options.update({'product_count': int(os.environ.get('BENCH_PRODUCTS', 100)),
+                        'variant_count': int(os.environ.get('BENCH_VARIANTS', 0))})
+    elif name.endswith('stock_export'):
+        options.update({'product_count': int(os.environ.get('BENCH_PRODUCTS', 1000))})
+    elif name == 'magento_shipment_export':
+        options.update({'picking_limit': int(os.environ.get('BENCH_ORDERS', 100))})
+    return options
+
+
+def run_benchmarks(env, magento_instance=None, woo_instance=None, scenario_names=None):
+    """
+    Run the scenarios and print their results.
+    :return: list of results
+    """
+    scenarios = []
+    if magento_instance:
+        scenarios += [(name, scenario, magento_instance) for name, scenario in MAGENTO_SCENARIOS.items()]
+    if woo_instance:
+        scenarios += [(name, scenario, woo_instance) for name, scenario in WOO_SCENARIOS.items()]
+    results = []
+    for name, scenario, instance in scenarios:
+        if scenario_names and name not in scenario_names:
+            continue
+        result = scenario(env, instance, **get_scenario_options(name))
+        print(result)
+        results.append(result)
+    return results
+
+
+shell_env = globals().get('env')
+if shell_env is not None:
+    magento_instance_id = int(os.environ.get('BENCH_MAGENTO_INSTANCE', 0))
+    woo_instance_id = int(os.environ.get('BENCH_WOO_INSTANCE', 0))
+    benchmark_results = run_benchmarks(
+        shell_env,
+        shell_env['magento.instance'].browse(magento_instance_id) if magento_instance_id else None,
+        shell_env['woo.instance.ept'].browse(woo_instance_id) if woo_instance_id else None,
+        [name for name in os.environ.get('BENCH_SCENARIOS', '').split(',') if name])
+    if os.environ.get('BENCH_OUTPUT'):
+        with open(os.environ.get('BENCH_OUTPUT'), 'w') as output_file:
+            json.dump([result.as_dict() for result in benchmark_results], output_file, indent=2)
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Benchmark scenarios of the connectors. Each scenario points the instance to a local stub server, runs the
+connector code with the generated fixtures and reports the throughput and the number of queries. Scenarios commit
+like the crons do, so they must be run on a dedicated benchmark database.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from odoo.addons.odoo_magento2_ept.models.api_request import SEARCH_ITEM_FIELDS
+from . import fixtures
+from .stub_server import StubServer, get_magento_routes, get_woo_routes
+
+_logger = logging.getLogger(__name__)
+
+
+class BenchmarkResult:
+    """
+    Result of a scenario.
+    """
+
+    def __init__(self, name, record_count, duration, query_count, request_count):
+        self.name = name
+        self.record_count = record_count
+        self.duration = duration
+        self.query_count = query_count
+        self.request_count = request_count
+
+    @property
+    def throughput(self):
+        return self.record_count / self.duration if self.duration else 0.0
+
+    def as_dict(self):
+        return {'scenario': self.name, 'records': self.record_count, 'seconds': round(self.duration, 3),
+                'records_per_second': round(self.throughput, 2), 'queries': self.query_count,
+                'queries_per_record': round(self.query_count / self.record_count, 2) if self.record_count else 0,
+                'requests': self.request_count}
+
+    def __str__(self):
+        return "%(scenario)-28s %(records)8s records %(seconds)10ss %(records_per_second)10s rec/s " \
+               "%(queries)10s queries %(queries_per_record)8s q/rec %(requests)8s requests" % self.as_dict()
+
+
+@contextmanager
+def measure(env, name, record_count, server):
+    """
+    Measure the time and the number of queries of the block.
+    """
+    result = BenchmarkResult(name, record_count, 0.0, 0, 0)
+    start, query_count, request_count = time.time(), _get_query_count(env), server.request_count
+    yield result
+    result.duration = time.time() - start
+    result.query_count = _get_query_count(env) - query_count
+    result.request_count = server.request_count - request_count
+    _logger.info("Benchmark %s", result)
+
+
+def _get_query_count(env):
+    return getattr(env.cr, 'sql_log_count', 0)
+
+
+@contextmanager
+def stub_instance_url(instance, url_field, url):
+    """
+    Point the instance to the stub server for the block, the URL is restored and committed after it.
+    """
+    original_url = instance[url_field]
+    instance.write({url_field: url})
+    instance.env.cr.commit()
+    try:
+        yield instance
+    finally:
+        instance.env.cr.rollback()
+        instance.write({url_field: original_url})
+        instance.env.cr.commit()
+
+
+def magento_order_import(env, instance, order_count=100, line_count=5, variant_count=0, latency=0.0,
+                         error_rate=0.0, seed=1):
+    """
+    Import the generated orders through the order queue. Queue lines have only the fields fetched by the queue
+    creation, so the full orders are fetched from the stub server like in production. Products of the orders are
+    imported from the stub server by the order import when they are not synced yet.
+    """
+    payment_method = instance.payment_method_ids[:1].payment_method_code or 'checkmo'
+    carrier = env['magento.delivery.carrier'].search([('magento_instance_id', '=', instance.id)], limit=1)
+    website = instance.magento_website_ids[:1]
+    catalog = fixtures.generate_magento_catalog(max(order_count // 4, line_count), variant_count, seed)
+    orders = fixtures.generate_magento_orders(
+        catalog, order_count, line_count, seed, payment_method=payment_method,
+        shipping_method=carrier.carrier_code or 'flatrate_flatrate',
+        store_id=int(website.store_view_ids[:1].magento_storeview_id or 1),
+        website_id=int(website.magento_website_id or 1),
+        currency=website.magento_base_currency.name or 'USD')
+    server = StubServer(get_magento_routes(catalog, orders), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'magento_url', server.url):
+        queue_obj = env['magento.order.data.queue.ept']
+        queue_line_obj = env['magento.order.data.queue.line.ept']
+        queues = queue_obj
+        for order in orders:
+            queue = queue_obj._create_order_queue(instance)
+            partial_order = {field: order.get(field) for field in SEARCH_ITEM_FIELDS.get('order_queue')}
+            queue_line_obj.create_order_queue_line(instance, partial_order, queue, is_partial_data=True)
+            queues |= queue
+        env.cr.commit()
+        with measure(env, 'magento_order_import', len(orders), server) as result:
+            queues.process_order_queues(is_manual=True)
+    return result
+
+
+def magento_product_import(env, instance, product_count=100, variant_count=0, latency=0.0, error_rate=0.0,
+                           seed=1):
+    """
+    Import the generated catalogue through the product queue.
+    """
+    catalog = fixtures.generate_magento_catalog(product_count, variant_count, seed, first_id=200000)
+    server = StubServer(get_magento_routes(catalog), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'magento_url', server.url):
+        queue_line_obj = env['sync.import.magento.product.queue.line']
+        queues = env['sync.import.magento.product.queue']
+        for index in range(0, len(catalog), 50):
+            queue = queue_line_obj.magento_create_product_queue(instance)
+            for product in catalog[index:index + 50]:
+                queue_line_obj.create_product_queue_line(product=product, instance_id=instance.id,
+                                                         queue_id=queue.id)
+            queues |= queue
+        env.cr.commit()
+        with measure(env, 'magento_product_import', len(catalog), server) as result:
+            queues.process_product_queues(is_manual=True)
+    return result
+
+
+def magento_stock_export(env, instance, product_count=1000, latency=0.0, error_rate=0.0, seed=1):
+    """
+    Export the stock of the synced products of the instance, or of generated SKUs if fewer products are synced.
+    """
+    m_products = env['magento.product.product'].search([('magento_instance_id', '=', instance.id)],
+                                                       limit=product_count)
+    skus = m_products.mapped('magento_sku') or ['BENCH-%06d' % index for index in range(product_count)]
+    stock_data = fixtures.generate_stock_snapshot(skus, seed)
+    server = StubServer(get_magento_routes([]), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'magento_url', server.url):
+        if instance.is_multi_warehouse_in_magento:
+            api_url, data_key = '/V1/inventory/source-items', 'sourceItems'
+        else:
+            api_url, data_key = '/V1/product/updatestock', 'skuData'
+            stock_data = [{'sku': values.get('sku'), 'qty': values.get('quantity'), 'is_in_stock': 1}
+                          for values in stock_data]
+        env['magento.product.product'].exp_prd_stock_in_batches(stock_data, instance, api_url, data_key, 'PUT',
+                                                                False)
+        env.cr.commit()
+        queues = env['magento.export.stock.queue.ept'].search([('instance_id', '=', instance.id),
+                                                                ('state', '=', 'draft')])
+        with measure(env, 'magento_stock_export', len(stock_data), server) as result:
+            queues.process_export_stock_queues(is_manual=True)
+    return result
+
+
+def magento_shipment_export(env, instance, picking_limit=100, latency=0.0, error_rate=0.0, seed=1):
+    """
+    Export the done pickings of the instance which are not exported yet. Exported pickings are marked as exported
+    like in production, so the scenario needs done pickings of imported orders.
+    """
+    pickings = env['stock.picking'].search_magento_pickings(instance=instance)[:picking_limit]
+    server = StubServer(get_magento_routes([]), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'magento_url', server.url):
+        with measure(env, 'magento_shipment_export', len(pickings), server) as result:
+            pickings.with_context(auto_export=True).magento_send_shipment(raise_error=False)
+            env.cr.commit()
+    return result
+
+
+def woo_order_import(env, instance, order_count=100, line_count=5, variant_count=0, latency=0.0, error_rate=0.0,
+                     seed=1):
+    """
+    Import the generated orders through the WooCommerce order queue.
+    """
+    catalog = fixtures.generate_woo_catalog(max(order_count // 4, line_count), variant_count, seed)
+    payment_gateway = env['woo.payment.gateway'].search([('woo_instance_id', '=', instance.id)], limit=1)
+    orders = fixtures.generate_woo_orders(catalog, order_count, line_count, seed,
+                                          payment_method=payment_gateway.code or 'cod')
+    server = StubServer(get_woo_routes(catalog, orders), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'woo_host', server.url):
+        queues = env['sale.order'].create_woo_order_data_queue(instance, list(orders), 'processing')
+        with measure(env, 'woo_order_import', len(orders), server) as result:
+            for queue in queues:
+                queue.order_data_queue_line_ids.process_order_queue_line()
+            env.cr.commit()
+    return result
+
+
+def woo_product_import(env, instance, product_count=100, variant_count=0, latency=0.0, error_rate=0.0, seed=1):
+    """
+    Import the generated catalogue through the WooCommerce product queue.
+    """
+    catalog = fixtures.generate_woo_catalog(product_count, variant_count, seed, first_id=200000)
+    server = StubServer(get_woo_routes(catalog), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'woo_host', server.url):
+        queue_obj = env['woo.product.data.queue.ept']
+        last_queue = queue_obj.search([], order='id desc', limit=1)
+        wizard = env['woo.process.import.export'].create({'woo_instance_id': instance.id,
+                                                         'woo_operation': 'import_product'})
+        wizard.woo_import_products(catalog)
+        queues = queue_obj.search([('woo_instance_id', '=', instance.id), ('id', '>', last_queue.id)])
+        env.cr.commit()
+        with measure(env, 'woo_product_import', len(catalog), server) as result:
+            for queue in queues:
+                queue.queue_line_ids.process_woo_product_queue_lines()
+            env.cr.commit()
+    return result
+
+
+def woo_stock_export(env, instance, product_count=1000, latency=0.0, error_rate=0.0, seed=1):
+    """
+    Export the stock of the exported products of the instance through the WooCommerce export stock queue. Stock is
+    computed from the warehouses of the instance, so the scenario needs imported or exported products.
+    """
+    woo_templates = env['woo.product.template.ept'].search([('woo_instance_id', '=', instance.id),
+                                                            ('exported_in_woo', '=', True)], limit=product_count)
+    server = StubServer(get_woo_routes([]), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'woo_host', server.url):
+        # Active IDs skip the check of the products in the store, all templates are exported.
+        queue_ids = env['woo.product.template.ept'].with_context(
+            active_ids=woo_templates.ids).woo_create_queue_for_export_stock(instance, woo_templates)
+        env.cr.commit()
+        queues = env['woo.export.stock.queue.ept'].browse(queue_ids or [])
+        with measure(env, 'woo_stock_export', len(woo_templates.woo_product_ids), server) as result:
+            for queue in queues:
+                queue.export_stock_queue_line_ids.process_export_stock_queue_data()
+            env.cr.commit()
+    return result
+
+
+def woo_shipment_export(env, instance, latency=0.0, error_rate=0.0, seed=1):
+    """
+    Update the status of the shipped orders of the instance which are not updated yet. All of them are updated, like
+    the update order status cron does, so the scenario needs done pickings of imported orders.
+    """
+    order_count = env['sale.order'].search_count([('woo_instance_id', '=', instance.id), ('woo_order_id', '!=', False),
+                                                  ('state', 'in', ['sale', 'done']),
+                                                  ('woo_status', '!=', 'completed'), ('updated_in_woo', '=', False)])
+    server = StubServer(get_woo_routes([]), latency=latency, error_rate=error_rate, seed=seed)
+    with server, stub_instance_url(instance, 'woo_host', server.url):
+        with measure(env, 'woo_shipment_export', order_count, server) as result:
+            env['sale.order'].update_woo_order_status(instance)
+            env.cr.commit()
+    return result
+
+
+MAGENTO_SCENARIOS = {
+    'magento_order_import': magento_order_import,
+    'magento_product_import': magento_product_import,
+    'magento_stock_export': magento_stock_export,
+    'magento_shipment_export': magento_shipment_export,
+}
+WOO_SCENARIOS = {
+    'woo_order_import': woo_order_import,
+    'woo_product_import': woo_product_import,
+    'woo_stock_export': woo_stock_export,
+    'woo_shipment_export': woo_shipment_export,
+}
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Lightweight local HTTP servers which mimic the Magento REST and WooCommerce endpoints called by the connectors.
+Responses are built from the fixture data, with a configurable latency and error rate.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FILTER_FIELD_KEY = re.compile(r'searchCriteria\[filter_?[gG]roups\]\[(?P<group>\d+)\]\[filters\]\[\d+\]\[field\]')
+
+
+class StubServer:
+    """
+    HTTP server running in a daemon thread. Each route is a tuple (method, path regex, handler), the handler is
+    called with the match of the path, the query parameters and the decoded JSON body, and returns a tuple
+    (status code, payload). Unknown routes return 404.
+    """
+
+    def __init__(self, routes, latency=0.0, latency_jitter=0.0, error_rate=0.0, error_status=503, seed=1,
+                 host='127.0.0.1', port=0):
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.request_count = 0
+        self.server = ThreadingHTTPServer((host, port), self._get_handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return 'http://%s:%s' % (host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        return True
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def dispatch(self, method, path, body):
+        """
+        Find the route of the request and build the response, after the configured latency.
+        :return: tuple (status code, payload)
+        """
+        with self.random_lock:
+            self.request_count += 1
+            delay = self.latency + self.random.uniform(0, self.latency_jitter)
+            is_error = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if is_error:
+            return self.error_status, {'message': 'Stub server error.'}
+        url = urlsplit(path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path)
+            if route_method == method and match:
+                return handler(match, query, body)
+        return 404, {'message': 'Route %s %s is not available in the stub server.' % (method, url.path)}
+
+    def _get_handler_class(self):
+        stub = self
+
+        class StubRequestHandler(BaseHTTPRequestHandler):
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = None
+                status, payload = stub.dispatch(self.command, self.path, body)
+                content = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, *args):
+                return
+
+        return StubRequestHandler
+
+
+def get_magento_routes(catalog, orders=None):
+    """
+    Routes of the Magento REST endpoints used by the order import, product import, stock export and shipment
+    export. Store code prefix of the path, like /rest/default/V1, is accepted.
+    :param catalog: list of Magento products
+    :param orders: list of Magento orders
+    """
+    orders = orders or []
+    products_by_sku = {product.get('sku'): product for product in catalog}
+    prefix = r'/rest(?:/[a-z_]+)?/V1'
+    entity_counter = iter(range(1, 10 ** 9))
+
+    def search_products(match, query, body):
+        items = _filter_items(catalog, query, {'entity_id': 'id', 'sku': 'sku'})
+        return 200, _get_page(items, query)
+
+    def search_orders(match, query, body):
+        items = _filter_items(orders, query, {'entity_id': 'entity_id', 'increment_id': 'increment_id'})
+        return 200, _get_page(items, query)
+
+    def get_product(match, query, body):
+        product = products_by_sku.get(match.group('sku'))
+        return (200, product) if product else (404, {'message': 'Product not found.'})
+
+    def create_document(match, query, body):
+        return 200, next(entity_counter)
+
+    def update_stock(match, query, body):
+        return 200, []
+
+    return [
+        ('GET', prefix + r'/products', search_products),
+        ('GET', prefix + r'/products/(?P<sku>[^/]+)', get_product),
+        ('GET', prefix + r'/orders', search_orders),
+        ('POST', prefix + r'/order/\d+/ship/?', create_document),
+        ('POST', prefix + r'/order/\d+/invoice/?', create_document),
+        ('PUT', prefix + r'/product/updatestock', update_stock),
+        ('POST', prefix + r'/inventory/source-items', update_stock),
+        ('PUT', prefix + r'/inventory/source-items', update_stock),
+    ]
+
+
+def get_woo_routes(catalog, orders=None):
+    """
+    Routes of the WooCommerce REST endpoints used by the order import, product import, stock export and shipment
+    export.
+    :param catalog: list of WooCommerce products
+    :param orders: list of WooCommerce orders
+    """
+    orders = orders or []
+    products_by_id = {product.get('id'): product for product in catalog}
+    prefix = r'/wp-json/wc/v3'
+
+    def list_records(records):
+        def handler(match, query, body):
+            return 200, _get_page(records, {'searchCriteria[currentPage]': query.get('page'),
+                                            'searchCriteria[pageSize]': query.get('per_page')})['items']
+        return handler
+
+    def get_product(match, query, body):
+        product = products_by_id.get(int(match.group('id')))
+        return (200, product) if product else (404, {'message': 'Product not found.'})
+
+    def get_variations(match, query, body):
+        return 200, products_by_id.get(int(match.group('id')), {}).get('variations', [])
+
+    def update_batch(match, query, body):
+        return 200, {'update': (body or {}).get('update', [])}
+
+    return [
+        ('GET', prefix + r'/products', list_records(catalog)),
+        ('GET', prefix + r'/products/(?P<id>\d+)', get_product),
+        ('GET', prefix + r'/products/(?P<id>\d+)/variations', get_variations),
+        ('POST', prefix + r'/products/batch', update_batch),
+        ('POST', prefix + r'/products/(?P<id>\d+)/variations/batch', update_batch),
+        ('GET', prefix + r'/orders', list_records(orders)),
+        ('POST', prefix + r'/orders/batch', update_batch),
+    ]
+
+
+def _filter_items(items, query, fields):
+    """
+    Apply the filter groups of the search criteria like Magento does, filters of a group are combined with OR and
+    the groups with AND. Only the eq and in conditions of the given fields are applied, a group having any other
+    filter matches all items.
+    :param items: list of records
+    :param query: query parameters of the request
+    :param fields: dictionary of the filtered fields and their keys in the records, like {'entity_id': 'id'}
+    :return: list of records matching the filter groups
+    """
+    groups = {}
+    for key, field in query.items():
+        match = FILTER_FIELD_KEY.fullmatch(key)
+        if match:
+            filter_key = key[:-len('[field]')]
+            groups.setdefault(match.group('group'), []).append(
+                (field, query.get(filter_key + '[condition_type]') or 'eq', query.get(filter_key + '[value]', '')))
+    for filters in groups.values():
+        if any(field not in fields or condition not in ('eq', 'in') for field, condition, value in filters):
+            continue
+        values = [(fields[field], set(value.split(','))) for field, condition, value in filters]
+        items = [item for item in items if any(str(item.get(key)) in group_values for key, group_values in values)]
+    return items
+
+
+def _get_page(items, query):
+    page = int(query.get('searchCriteria[currentPage]') or 1)
+    page_size = int(query.get('searchCriteria[pageSize]') or query.get('searchCriteria[page_size]') or
+                    len(items) or 1)
+    return {'items': items[(page - 1) * page_size:page * page_size], 'total_count': len(items),
+            'search_criteria': {}}
@@ -25,6 +25,8 @@
              'views/sale_workflow_process_view.xml',
              'data/automatic_workflow_data.xml',
              'views/common_log_lines_ept.xml',
+             'views/common_api_metric_ept.xml',
+             'views/queue_stage_timing_ept.xml',
              'views/digest_views.xml',
              'views/delivery_carrier_view.xml',
              ],
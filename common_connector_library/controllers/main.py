@@ -2,6 +2,7 @@
 # See LICENSE file for full copyright and licensing details.
 
 import base64
+import hmac
 import logging
 from odoo import http
 from odoo.http import request
@@ -32,3 +33,21 @@ class ImageUrl(http.Controller):
             except Exception:
                 return request.not_found()
         return request.not_found()
+
+
+class ApiMetrics(http.Controller):
+
+    @http.route('/connector/api_metrics', type='http', auth='public', csrf=False)
+    def get_api_metrics(self, token='', **kwargs):
+        """ Use to expose the API call metrics of the connectors in the Prometheus text format. Token must match the
+            common_connector_library.api_metrics_token system parameter, metrics are not exposed if it is not set.
+        """
+        metrics_token = request.env['ir.config_parameter'].sudo().get_param(
+            'common_connector_library.api_metrics_token')
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        if not metrics_token or not hmac.compare_digest(str(token), metrics_token):
+            return request.not_found()
+        content = request.env['common.api.metric.ept'].sudo().get_prometheus_metrics_ept()
+        return request.make_response(content, [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
@@ -13,7 +13,10 @@ from . import product_attribute
 from . import product_attribute_value
 from . import common_log_book_ept
 from . import common_log_lines_ept
+from . import lookup_cache_ept
 from . import account_fiscal_position
+from . import account_tax
+from . import res_country
 from . import common_product_image_ept
 from . import product_template
 from . import account_move
@@ -23,3 +26,12 @@ from . import account_bank_statement_line
 from . import queue_line_dashboard
 from . import digest
 from . import delivery_carrier
+from . import sale_dashboard_rollup_ept
+from . import queue_lease_mixin_ept
+from . import queue_payload_archive_ept
+from . import queue_payload_archive_entity_ept
+from . import queue_payload_archive_mixin_ept
+from . import api_metric_ept
+from . import queue_stage_timing_ept
+from . import api_cassette_ept
+from . import api_rate_limit_ept
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
 from odoo import fields, models, api
+from .lookup_cache_ept import get_cached_lookup_ept
 
 
 class AccountFiscalPosition(models.Model):
-    _inherit = 'account.fiscal.position'
+    _name = 'account.fiscal.position'
+    _inherit = ['account.fiscal.position', 'lookup.cache.mixin.ept']
 
     origin_country_ept = fields.Many2one('res.country', string='Origin Country',
                                          help="Warehouse country based on sales order warehouse country system will "
@@ -37,20 +39,30 @@ class AccountFiscalPosition(models.Model):
         :param vat_required: True / False
         :return: fpos object
         Migration done by Haresh Mori on September 2021
+        Result is cached for the workers until a change of the fiscal positions or the country groups is
+        committed.
         """
         if not country_id:
             return False
         if self._context.get('is_b2b_amz_order', False):
             vat_required = self._context.get('is_b2b_amz_order', False)
-        base_domain = [('vat_required', '=', vat_required), ('company_id', 'in', [self.env.company.id, False]),
+        key = (self._name, origin_country_id, country_id, state_id or False, zipcode or False, bool(vat_required),
+               self.env.company.id, self._context.get('is_amazon_fpos', False),
+               self._context.get('is_bol_fpos', False))
+        fpos_ids = get_cached_lookup_ept(self.env, key,
+                                         lambda env: env[self._name]._search_fiscal_position_ids_ept(*key[1:]))
+        return self.browse(fpos_ids)
+
+    @api.model
+    def _search_fiscal_position_ids_ept(self, origin_country_id, country_id, state_id, zipcode, vat_required,
+                                       company_id, is_amazon_fpos, is_bol_fpos):
+        base_domain = [('vat_required', '=', vat_required), ('company_id', 'in', [company_id, False]),
                        ('origin_country_ept', 'in', [origin_country_id, False])]
         null_state_dom = state_domain = [('state_ids', '=', False)]
         null_zip_dom = zip_domain = [('zip_from', '=', False), ('zip_to', '=', False)]
         null_country_dom = [('country_id', '=', False), ('country_group_id', '=', False)]
-        is_amazon_fpos = self._context.get('is_amazon_fpos', False)
         if is_amazon_fpos:
             base_domain.append(('is_amazon_fpos', '=', is_amazon_fpos))
-        is_bol_fpos = self._context.get('is_bol_fpos', False)
         if is_bol_fpos:
             base_domain.append(('is_bol_fiscal_position', '=', is_bol_fpos))
         if zipcode:
@@ -75,4 +87,4 @@ class AccountFiscalPosition(models.Model):
         if not fpos:
             # Fallback on catchall (no country, no group)
             fpos = self.search(base_domain + null_country_dom, limit=1)
-        return fpos
+        return tuple(fpos.ids)
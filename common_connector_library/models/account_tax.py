@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo import models, api
+from .lookup_cache_ept import get_cached_lookup_ept
+
+
+class AccountTax(models.Model):
+    _name = 'account.tax'
+    _inherit = ['account.tax', 'lookup.cache.mixin.ept']
+
+    @api.model
+    def find_sale_tax_ept(self, rate, price_include=False, title=False, country=False, company=False,
+                          precision=0.0):
+        """ Use to find the sale tax of the rate. Result is cached for the workers until a change of the taxes is
+            committed, so the same taxes of the orders are searched once. Archived taxes are found with
+            active_test=False in the context.
+            @param rate: Tax rate in percent.
+            @param price_include: Tax included in price or not.
+            @param title: Name of the tax, tax having the name is preferred to the other taxes of the rate.
+            @param country: Country of the tax, or False for any country.
+            @param company: Company of the tax, or False for the allowed companies.
+            @param precision: Difference allowed between the rate and the amount of the tax.
+            @return: account.tax()
+        """
+        key = (self._name, float(rate), bool(price_include), title or '', country.id if country else False,
+               company.id if company else False, precision, self._context.get('active_test', True),
+               tuple(self.env.companies.ids))
+        tax_ids = get_cached_lookup_ept(self.env, key, lambda env: env[self._name]._find_sale_tax_ids_ept(*key[1:]))
+        return self.browse(tax_ids)
+
+    @api.model
+    def _find_sale_tax_ids_ept(self, rate, price_include, title, country_id, company_id, precision, active_test,
+                               allowed_company_ids):
+        domain = [('price_include', '=', price_include), ('type_tax_use', '=', 'sale'),
+                  ('amount', '>=', rate - precision), ('amount', '<=', rate + precision)]
+        if country_id:
+            domain.append(('country_id', '=', country_id))
+        if company_id:
+            domain.append(('company_id', '=', company_id))
+        tax_obj = self.with_context(active_test=active_test, allowed_company_ids=list(allowed_company_ids))
+        tax = tax_obj.search([('name', '=ilike', title)] + domain, limit=1) if title else tax_obj
+        if not tax:
+            tax = tax_obj.search(domain, limit=1)
+        return tuple(tax.ids)
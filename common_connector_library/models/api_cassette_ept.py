@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl
+import requests
+from requests.structures import CaseInsensitiveDict
+from odoo import models, fields
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# Query parameters holding credentials, they are neither recorded nor used to match the calls.
+CASSETTE_SECRET_PARAMS = ('consumer_key', 'consumer_secret', 'oauth_consumer_key', 'oauth_signature',
+                          'oauth_nonce', 'oauth_timestamp', 'oauth_signature_method')
+CASSETTE_SKIPPED_HEADERS = ('set-cookie', 'content-encoding', 'transfer-encoding', 'connection')
+
+_cassettes_lock = threading.Lock()
+# Cassettes in use by the worker, by file path.
+_cassettes = {}
+
+
+class ApiCassetteEpt:
+    """ File of recorded API calls, one JSON line per request/response pair. In record mode the calls are sent
+        and appended to the file, in replay mode the responses are read from the file without network access.
+        Calls are matched by method, URL, query parameters and body; the same call recorded more than once is
+        replayed in the recorded order and the last response is repeated after that.
+    """
+
+    def __init__(self, path, mode='replay', time_scale=1.0):
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.lock = threading.Lock()
+        self.interactions = None
+        self.positions = {}
+
+    @staticmethod
+    def get_request_key(method, url, params=None, data=None):
+        """ Use to get the key which matches the call with its recording, credentials are removed from it.
+            @return: Tuple (method, URL without query, sorted query parameters, body).
+        """
+        split_url = urlsplit(url)
+        query = parse_qsl(split_url.query, keep_blank_values=True)
+        if isinstance(params, dict):
+            query += list(params.items())
+        elif params:
+            query += list(params)
+        query = sorted((str(key), str(value)) for key, value in query if key not in CASSETTE_SECRET_PARAMS)
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        if data:
+            try:
+                data = json.dumps(json.loads(data), sort_keys=True)
+            except ValueError:
+                pass
+        url = urlunsplit((split_url.scheme, split_url.netloc, split_url.path, '', ''))
+        return method.upper(), url, tuple(query), data or ''
+
+    def _load(self):
+        interactions = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as cassette_file:
+                for line in cassette_file:
+                    if not line.strip():
+                        continue
+                    interaction = json.loads(line)
+                    key = (interaction.get('method'), interaction.get('url'),
+                           tuple(tuple(item) for item in interaction.get('params')), interaction.get('body'))
+                    interactions.setdefault(key, []).append(interaction)
+        _logger.info("API cassette %s is loaded with %s calls.", self.path,
+                     sum(len(values) for values in interactions.values()))
+        return interactions
+
+    def record(self, key, response, duration):
+        """ Use to append the call and its response to the cassette file.
+            @param key: Key of the call, see get_request_key.
+            @param response: Response of the call.
+            @param duration: Time taken by the call in seconds.
+        """
+        method, url, params, body = key
+        content = response.content or b''
+        interaction = {'method': method, 'url': url, 'params': params, 'body': body,
+                       'status_code': response.status_code, 'reason': response.reason,
+                       'headers': {name: value for name, value in response.headers.items()
+                                   if name.lower() not in CASSETTE_SKIPPED_HEADERS},
+                       'duration': round(duration, 4), 'recorded_at': datetime.utcnow().isoformat()}
+        try:
+            interaction['content'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            interaction['content_base64'] = base64.b64encode(content).decode('ascii')
+        line = json.dumps(interaction) + '\n'
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as cassette_file:
+                cassette_file.write(line)
+        return True
+
+    def replay(self, key):
+        """ Use to get the recorded response of the call, after the recorded duration multiplied by the time
+            scale of the cassette.
+            @param key: Key of the call, see get_request_key.
+            @return: Response built from the recording.
+        """
+        with self.lock:
+            if self.interactions is None:
+                self.interactions = self._load()
+            recorded = self.interactions.get(key)
+            if not recorded:
+                raise requests.exceptions.ConnectionError(
+                    "No response is recorded in the API cassette %s for %s %s." % (self.path, key[0], key[1]))
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            interaction = recorded[min(position, len(recorded) - 1)]
+        if self.time_scale > 0 and interaction.get('duration'):
+            time.sleep(interaction.get('duration') * self.time_scale)
+        response = requests.models.Response()
+        response.status_code = interaction.get('status_code')
+        response.reason = interaction.get('reason')
+        response.headers = CaseInsensitiveDict(interaction.get('headers') or {})
+        response.url = key[1]
+        response.encoding = 'utf-8'
+        if 'content_base64' in interaction:
+            response._content = base64.b64decode(interaction.get('content_base64'))
+        else:
+            response._content = (interaction.get('content') or '').encode('utf-8')
+        return response
+
+
+def get_api_cassette_ept(path, mode, time_scale=1.0):
+    """ Use to get the cassette of the file for the worker, so concurrent calls append to the same file and replay
+        continues from the position of the previous calls.
+        @param path: Path of the cassette file.
+        @param mode: record or replay.
+        @param time_scale: Recorded durations are multiplied by it on replay, 0 replays without waiting.
+        @return: Cassette.
+    """
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if not cassette or cassette.mode != mode:
+            cassette = _cassettes[path] = ApiCassetteEpt(path, mode, time_scale)
+        cassette.time_scale = time_scale
+    return cassette
+
+
+def reset_api_cassette_ept(path):
+    """ Use to forget the cassette of the file, so the next replay starts again from the first recorded call.
+    """
+    with _cassettes_lock:
+        _cassettes.pop(path, None)
+    return True
+
+
+def send_api_request_ept(cassette, method, url, **kwargs):
+    """ Use to send the API request through the cassette of the instance. Without cassette the request is sent
+        like requests.request.
+        @param cassette: Cassette of the instance, or None.
+        @param method: HTTP method.
+        @param url: URL of the request.
+        @return: Response.
+    """
+    if not cassette:
+        return requests.request(method, url, **kwargs)
+    key = cassette.get_request_key(method, url, kwargs.get('params'), kwargs.get('data'))
+    if cassette.mode == 'replay':
+        return cassette.replay(key)
+    start = time.time()
+    response = requests.request(method, url, **kwargs)
+    cassette.record(key, response, time.time() - start)
+    return response
+
+
+class ApiCassetteMixinEpt(models.AbstractModel):
+    _name = 'api.cassette.mixin.ept'
+    _description = 'API Cassette Mixin'
+
+    api_transport_mode = fields.Selection([('live', 'Live'), ('record', 'Record'), ('replay', 'Replay')],
+                                          string="API Transport", default='live', copy=False,
+                                          help="Record: API calls are sent and saved in the cassette file.\n"
+                                               "Replay: API calls are answered from the cassette file without "
+                                               "network access.")
+    api_cassette_path = fields.Char(string="API Cassette File", copy=False, groups="base.group_system",
+                                    help="Path of the cassette file on the server, a file in the data directory "
+                                         "is used if it is not set. Recorded calls are appended to the file.")
+    api_replay_time_scale = fields.Float(string="Replay Time Scale", default=1.0,
+                                         help="Recorded durations of the calls are multiplied by it on replay, "
+                                              "like 3 to simulate a slow store or 0 to replay without waiting.")
+
+    def write(self, vals):
+        """ Use to restart the replay from the first recorded call when the transport of the instance is changed.
+        """
+        if {'api_transport_mode', 'api_cassette_path'} & set(vals):
+            for record in self:
+                reset_api_cassette_ept(record._get_api_cassette_path_ept())
+        return super(ApiCassetteMixinEpt, self).write(vals)
+
+    def _get_api_cassette_path_ept(self):
+        self.ensure_one()
+        return self.sudo().api_cassette_path or os.path.join(
+            config['data_dir'], 'api_cassettes', self.env.cr.dbname, '%s-%s.jsonl' % (self._name, self.id))
+
+    def get_api_cassette_ept(self):
+        """ Use to get the cassette of the instance for the API requests.
+            @return: Cassette, None for live transport.
+        """
+        self.ensure_one()
+        if self.api_transport_mode not in ('record', 'replay'):
+            return None
+        return get_api_cassette_ept(self._get_api_cassette_path_ept(), self.api_transport_mode,
+                                    self.api_replay_time_scale)
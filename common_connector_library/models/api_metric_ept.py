@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+import odoo
+from odoo import models, fields, api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is +Inf.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Metrics of the worker are flushed to the database once in this many seconds.
+API_METRIC_FLUSH_SECONDS = 60
+
+_metrics_lock = threading.Lock()
+# Metrics collected by the worker since the last flush, by database.
+_pending_metrics = {}
+_last_flush = {}
+
+
+def get_endpoint_template_ept(path):
+    """ Use to get the endpoint template of the path, segments having an ID, SKU or UUID are replaced by {id} so
+        calls of the same endpoint are counted together.
+        @param path: API path, like /V1/orders/10?fields=items.
+        @return: Endpoint template, like /V1/orders/{id}.
+    """
+    segments = []
+    for segment in urlsplit(path or '').path.split('/'):
+        if any(char.isdigit() for char in segment) or '%' in segment or len(segment) > 40:
+            segment = '{id}'
+        segments.append(segment)
+    return '/'.join(segments) or '/'
+
+
+def record_api_call_ept(connector, url, path, method, status_code=0, error=None, duration=0.0, bytes_in=0,
+                        bytes_out=0):
+    """ Use to record the API call in the metrics of the worker. Metrics are kept in memory and flushed to
+        common.api.metric.ept by the worker thread of the database once in API_METRIC_FLUSH_SECONDS.
+        @param connector: Name of the connector, like magento.
+        @param url: URL of the instance, host of the URL is used as the instance.
+        @param path: API path of the call.
+        @param method: HTTP method.
+        @param status_code: HTTP status code, 0 if no response is received.
+        @param error: Exception raised by the call.
+        @param duration: Time taken by the call in seconds.
+        @param bytes_in: Size of the response body.
+        @param bytes_out: Size of the request body.
+    """
+    key = (connector, urlsplit(url or '').netloc or url or '', method.upper(), get_endpoint_template_ept(path),
+           status_code or 0, type(error).__name__ if error else '')
+    dbname = getattr(threading.current_thread(), 'dbname', None)
+    bucket = next((index for index, bound in enumerate(LATENCY_BUCKETS) if duration <= bound), len(LATENCY_BUCKETS))
+    with _metrics_lock:
+        metric = _pending_metrics.setdefault(dbname, {}).setdefault(key, {
+            'call_count': 0, 'duration_sum': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1)})
+        metric['call_count'] += 1
+        metric['duration_sum'] += duration
+        metric['bytes_in'] += bytes_in or 0
+        metric['bytes_out'] += bytes_out or 0
+        metric['buckets'][bucket] += 1
+        is_flush_needed = dbname and time.time() - _last_flush.setdefault(dbname, time.time()) >= \
+            API_METRIC_FLUSH_SECONDS
+    if is_flush_needed:
+        flush_api_metrics_ept(dbname)
+    return True
+
+
+def flush_api_metrics_ept(dbname):
+    """ Use to write the metrics of the worker to the database with a new cursor, so the transaction of the caller
+        is not affected. Metrics recorded by threads without database, like the workers of concurrent requests, are
+        flushed with them.
+        @param dbname: Name of the database.
+    """
+    with _metrics_lock:
+        metrics = _pending_metrics.pop(dbname, {})
+        for key, metric in _pending_metrics.pop(None, {}).items():
+            if key in metrics:
+                _merge_metric_values(metrics[key], metric)
+            else:
+                metrics[key] = metric
+        _last_flush[dbname] = time.time()
+    if not metrics:
+        return True
+    try:
+        with odoo.registry(dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['common.api.metric.ept'].merge_api_metrics_ept(metrics)
+    except Exception as error:
+        _logger.warning("API metrics of %s calls could not be saved. %s", len(metrics), error)
+    return True
+
+
+def _merge_metric_values(metric, values):
+    metric['call_count'] += values.get('call_count')
+    metric['duration_sum'] += values.get('duration_sum')
+    metric['bytes_in'] += values.get('bytes_in')
+    metric['bytes_out'] += values.get('bytes_out')
+    metric['buckets'] = [count + new_count for count, new_count in zip(metric['buckets'], values.get('buckets'))]
+    return metric
+
+
+class CommonApiMetricEpt(models.Model):
+    _name = "common.api.metric.ept"
+    _description = "Connector API Call Metric"
+    _order = "period_start desc, call_count desc"
+
+    period_start = fields.Datetime(required=True, index=True, readonly=True, help="Hour of the API calls.")
+    connector = fields.Char(readonly=True, index=True)
+    instance_host = fields.Char(string="Instance", readonly=True, index=True)
+    method = fields.Char(readonly=True)
+    endpoint = fields.Char(readonly=True, help="Endpoint template, IDs are replaced by {id}.")
+    status_code = fields.Integer(readonly=True, help="0 if no response is received.")
+    error_class = fields.Char(readonly=True, help="Class of the exception raised by the call.")
+    call_count = fields.Integer(string="Calls", readonly=True)
+    duration_sum = fields.Float(string="Total Duration (s)", readonly=True)
+    duration_avg = fields.Float(string="Average Duration (s)", compute="_compute_duration_percentiles",
+                                store=True, group_operator="avg")
+    duration_p50 = fields.Float(string="p50 (s)", compute="_compute_duration_percentiles", store=True,
+                                group_operator="max")
+    duration_p95 = fields.Float(string="p95 (s)", compute="_compute_duration_percentiles", store=True,
+                                group_operator="max")
+    duration_p99 = fields.Float(string="p99 (s)", compute="_compute_duration_percentiles", store=True,
+                                group_operator="max")
+    bytes_in = fields.Integer(string="Bytes In", readonly=True)
+    bytes_out = fields.Integer(string="Bytes Out", readonly=True)
+    duration_buckets = fields.Text(readonly=True, help="Number of calls per latency bucket.")
+
+    @api.depends('call_count', 'duration_sum', 'duration_buckets')
+    def _compute_duration_percentiles(self):
+        for metric in self:
+            buckets = json.loads(metric.duration_buckets or '[]')
+            metric.duration_avg = metric.duration_sum / metric.call_count if metric.call_count else 0.0
+            metric.duration_p50 = self._get_bucket_percentile(buckets, 0.50)
+            metric.duration_p95 = self._get_bucket_percentile(buckets, 0.95)
+            metric.duration_p99 = self._get_bucket_percentile(buckets, 0.99)
+
+    @staticmethod
+    def _get_bucket_percentile(buckets, quantile):
+        """ Use to estimate the percentile from the histogram by linear interpolation within the bucket, like
+            Prometheus histogram_quantile. Calls of the last bucket are estimated at its lower bound.
+        """
+        total = sum(buckets)
+        if not total:
+            return 0.0
+        rank, count = quantile * total, 0
+        for index, bucket_count in enumerate(buckets):
+            lower_bound = LATENCY_BUCKETS[index - 1] if index else 0.0
+            if count + bucket_count >= rank and bucket_count:
+                if index >= len(LATENCY_BUCKETS):
+                    return lower_bound
+                return lower_bound + (LATENCY_BUCKETS[index] - lower_bound) * (rank - count) / bucket_count
+            count += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+    def init(self):
+        """ Use to create the unique index of the metric rows, rows of the same key which are created before the
+            index by concurrent flushes are merged first.
+        """
+        self._cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'common_api_metric_ept_key_unique'")
+        if not self._cr.fetchone():
+            self._merge_duplicate_api_metrics_ept()
+        self._cr.execute("""CREATE UNIQUE INDEX IF NOT EXISTS common_api_metric_ept_key_unique
+                            ON common_api_metric_ept (period_start, connector, instance_host, method, endpoint,
+                                                      status_code, coalesce(error_class, ''))""")
+
+    def _merge_duplicate_api_metrics_ept(self):
+        self._cr.execute("""SELECT array_agg(id ORDER BY id) FROM common_api_metric_ept
+                            GROUP BY period_start, connector, instance_host, method, endpoint, status_code,
+                                     coalesce(error_class, '')
+                            HAVING count(id) > 1""")
+        for metric_ids, in self._cr.fetchall():
+            metrics = self.browse(metric_ids)
+            merged = {'call_count': 0, 'duration_sum': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                      'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+            for metric in metrics:
+                _merge_metric_values(merged, {
+                    'call_count': metric.call_count, 'duration_sum': metric.duration_sum,
+                    'bytes_in': metric.bytes_in, 'bytes_out': metric.bytes_out,
+                    'buckets': json.loads(metric.duration_buckets or '[]') or [0] * (len(LATENCY_BUCKETS) + 1)})
+            metrics[:1].write({'call_count': merged.get('call_count'), 'duration_sum': merged.get('duration_sum'),
+                               'bytes_in': merged.get('bytes_in'), 'bytes_out': merged.get('bytes_out'),
+                               'duration_buckets': json.dumps(merged.get('buckets'))})
+            metrics[1:].unlink()
+        return True
+
+    def merge_api_metrics_ept(self, metrics):
+        """ Use to add the metrics of a worker to the rows of the current hour. Each row is inserted or added to
+            the existing row by one INSERT ON CONFLICT statement on the unique key, so workers can flush the same
+            key at the same time.
+            @param metrics: Dictionary like {(connector, instance, method, endpoint, status, error): values}.
+        """
+        period_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        metric_ids = []
+        for (connector, instance_host, method, endpoint, status_code, error_class), values in metrics.items():
+            self._cr.execute("""
+                INSERT INTO common_api_metric_ept AS metric (period_start, connector, instance_host, method,
+                    endpoint, status_code, error_class, call_count, duration_sum, bytes_in, bytes_out,
+                    duration_buckets, create_uid, create_date, write_uid, write_date)
+                VALUES (%(period_start)s, %(connector)s, %(instance_host)s, %(method)s, %(endpoint)s,
+                    %(status_code)s, %(error_class)s, %(call_count)s, %(duration_sum)s, %(bytes_in)s, %(bytes_out)s,
+                    %(buckets)s, %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+                ON CONFLICT (period_start, connector, instance_host, method, endpoint, status_code,
+                             coalesce(error_class, ''))
+                DO UPDATE SET call_count = metric.call_count + EXCLUDED.call_count,
+                    duration_sum = metric.duration_sum + EXCLUDED.duration_sum,
+                    bytes_in = metric.bytes_in + EXCLUDED.bytes_in,
+                    bytes_out = metric.bytes_out + EXCLUDED.bytes_out,
+                    duration_buckets = (
+                        SELECT json_agg(coalesce(old.value::integer, 0) + coalesce(new.value::integer, 0)
+                                        ORDER BY coalesce(old.position, new.position))::text
+                        FROM json_array_elements_text(coalesce(nullif(metric.duration_buckets, ''), '[]')::json)
+                             WITH ORDINALITY AS old(value, position)
+                        FULL JOIN json_array_elements_text(EXCLUDED.duration_buckets::json)
+                             WITH ORDINALITY AS new(value, position) ON old.position = new.position),
+                    write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+                RETURNING id""", {
+                'period_start': period_start, 'connector': connector, 'instance_host': instance_host,
+                'method': method, 'endpoint': endpoint, 'status_code': status_code, 'error_class': error_class,
+                'call_count': values.get('call_count'), 'duration_sum': values.get('duration_sum'),
+                'bytes_in': values.get('bytes_in'), 'bytes_out': values.get('bytes_out'),
+                'buckets': json.dumps(values.get('buckets')), 'uid': self.env.uid})
+            metric_ids.append(self._cr.fetchone()[0])
+        # Rows are changed by SQL, so the stored percentiles are recomputed from the new values.
+        records = self.browse(metric_ids)
+        records.invalidate_cache()
+        records.modified(['call_count', 'duration_sum', 'duration_buckets'])
+        records.flush()
+        return True
+
+    @api.model
+    def cron_flush_api_metrics_ept(self):
+        """ Use to flush the metrics of the worker which runs the cron, so metrics of the last calls of an idle
+            worker are not kept in memory.
+        """
+        flush_api_metrics_ept(self._cr.dbname)
+        return True
+
+    def get_prometheus_metrics_ept(self):
+        """ Use to export the totals of all rows in the Prometheus text format.
+            @return: Text of metrics.
+        """
+        totals = {}
+        for metric in self.search_read([], ['connector', 'instance_host', 'method', 'endpoint', 'status_code',
+                                            'error_class', 'call_count', 'duration_sum', 'bytes_in', 'bytes_out',
+                                            'duration_buckets']):
+            key = (metric.get('connector'), metric.get('instance_host'), metric.get('method'),
+                   metric.get('endpoint'), metric.get('status_code'), metric.get('error_class') or '')
+            buckets = json.loads(metric.get('duration_buckets') or '[]') or [0] * (len(LATENCY_BUCKETS) + 1)
+            total = totals.setdefault(key, {'call_count': 0, 'duration_sum': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                                            'buckets': [0] * len(buckets)})
+            _merge_metric_values(total, dict(metric, buckets=buckets))
+        lines = ["# HELP connector_api_requests_total Number of API calls.",
+                 "# TYPE connector_api_requests_total counter"]
+        histogram_lines = ["# HELP connector_api_request_duration_seconds Duration of API calls.",
+                           "# TYPE connector_api_request_duration_seconds histogram"]
+        bytes_lines = ["# HELP connector_api_bytes_total Size of API request and response bodies.",
+                       "# TYPE connector_api_bytes_total counter"]
+        for key, total in totals.items():
+            labels = self._get_prometheus_labels(key)
+            lines.append("connector_api_requests_total{%s} %s" % (labels, total.get('call_count')))
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), total.get('buckets')):
+                cumulative += bucket_count
+                histogram_lines.append('connector_api_request_duration_seconds_bucket{%s,le="%s"} %s'
+                                       % (labels, bound, cumulative))
+            histogram_lines.append("connector_api_request_duration_seconds_sum{%s} %s"
+                                   % (labels, total.get('duration_sum')))
+            histogram_lines.append("connector_api_request_duration_seconds_count{%s} %s"
+                                   % (labels, total.get('call_count')))
+            bytes_lines.append('connector_api_bytes_total{%s,direction="in"} %s' % (labels, total.get('bytes_in')))
+            bytes_lines.append('connector_api_bytes_total{%s,direction="out"} %s' % (labels, total.get('bytes_out')))
+        return '\n'.join(lines + histogram_lines + bytes_lines) + '\n'
+
+    @staticmethod
+    def _get_prometheus_labels(key):
+        names = ('connector', 'instance', 'method', 'endpoint', 'status', 'error')
+        return ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                        for name, value in zip(names, key))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import logging
+import time
+import odoo
+from odoo import models, fields
+
+_logger = logging.getLogger(__name__)
+
+# Status codes by which the store signals that it is overloaded or throttling the requests.
+API_PRESSURE_STATUS_CODES = (429, 503)
+# Status code of the throttled requests, they are not processed by the store, so any request is sent again.
+API_THROTTLE_STATUS_CODE = 429
+# Requests of these methods may be processed by the store before it answers 503, they are sent again only on 429.
+API_NON_IDEMPOTENT_METHODS = ('post', 'patch')
+# Requests answered with a pressure status code are sent again this many times, after the backoff.
+API_RATE_LIMIT_RETRIES = 3
+# Backoff in seconds when the store does not send a Retry-After header.
+API_RATE_LIMIT_BACKOFF = 5
+# Sustained rate is halved on each pressure response down to this factor, and recovers by the step on success.
+API_RATE_MIN_FACTOR = 0.1
+API_RATE_RECOVERY_STEP = 0.05
+# Maximum seconds to wait for a token before the request is sent anyway.
+API_RATE_LIMIT_MAX_WAIT = 300
+
+
+class ApiRateLimiterEpt:
+    """ Token bucket of an instance shared by all workers through the api.rate.limit.state.ept row of the
+        instance. Each request takes a token, tokens are refilled at the sustained rate up to the burst. A token is
+        reserved even if the bucket is empty, the caller waits until the reserved token is refilled, so workers are
+        served in order with one short transaction per request. Pressure responses of the store move the refill
+        time to the end of the backoff and lower the sustained rate, which recovers gradually on success.
+    """
+
+    def __init__(self, dbname, res_model, res_id, burst, rate):
+        self.dbname = dbname
+        self.res_model = res_model
+        self.res_id = res_id
+        self.burst = burst
+        self.rate = rate
+        self.rate_factor = 1.0
+
+    def _execute(self, callback, *args):
+        """ Use to run the callback in its own transaction, so the lock of the bucket is released at once and
+            the limiter can be used by the threads without environment. Requests are not limited if the bucket
+            can not be read.
+        """
+        try:
+            with odoo.registry(self.dbname).cursor() as cr:
+                return callback(cr, *args)
+        except Exception as error:
+            _logger.warning("API rate limit of %s %s could not be applied. %s", self.res_model, self.res_id, error)
+            return 0.0
+
+    def _lock_bucket(self, cr):
+        query = """SELECT id, tokens, refill_time, rate_factor, extract(epoch FROM clock_timestamp())
+                   FROM api_rate_limit_state_ept WHERE res_model = %s AND res_id = %s FOR UPDATE"""
+        cr.execute(query, (self.res_model, self.res_id))
+        row = cr.fetchone()
+        if not row:
+            cr.execute("""INSERT INTO api_rate_limit_state_ept (res_model, res_id, tokens, refill_time, rate_factor,
+                          create_date, write_date) VALUES (%s, %s, %s, extract(epoch FROM clock_timestamp()), 1.0,
+                          now() at time zone 'UTC', now() at time zone 'UTC') ON CONFLICT DO NOTHING""",
+                          (self.res_model, self.res_id, self.burst))
+            cr.execute(query, (self.res_model, self.res_id))
+            row = cr.fetchone()
+        return row
+
+    def _reserve_token(self, cr):
+        bucket_id, tokens, refill_time, rate_factor, now = self._lock_bucket(cr)
+        self.rate_factor = rate_factor or 1.0
+        rate = self.rate * self.rate_factor
+        tokens = min(self.burst, tokens + max(0.0, now - refill_time) * rate) - 1
+        refill_time = max(now, refill_time)
+        cr.execute("UPDATE api_rate_limit_state_ept SET tokens = %s, refill_time = %s WHERE id = %s",
+                   (tokens, refill_time, bucket_id))
+        return refill_time - now + max(0.0, -tokens / rate)
+
+    def _update_rate(self, cr, is_pressure, backoff):
+        bucket_id, tokens, refill_time, rate_factor, now = self._lock_bucket(cr)
+        if is_pressure:
+            rate_factor = max(API_RATE_MIN_FACTOR, (rate_factor or 1.0) / 2)
+            tokens, refill_time = min(tokens, 0.0), max(refill_time, now + backoff)
+        else:
+            rate_factor = min(1.0, (rate_factor or 1.0) + API_RATE_RECOVERY_STEP)
+        cr.execute("""UPDATE api_rate_limit_state_ept SET tokens = %s, refill_time = %s, rate_factor = %s,
+                      write_date = now() at time zone 'UTC' WHERE id = %s""",
+                   (tokens, refill_time, rate_factor, bucket_id))
+        self.rate_factor = rate_factor
+        return 0.0
+
+    def acquire(self):
+        """ Use to take a token of the bucket, it waits until the token is available.
+        """
+        wait = self._execute(self._reserve_token)
+        if wait > 0:
+            time.sleep(min(wait, API_RATE_LIMIT_MAX_WAIT))
+        return True
+
+    def report(self, response):
+        """ Use to adapt the rate to the response of the store, nothing is written while the rate is not lowered
+            and the response is not a pressure response.
+            @param response: Response of the request.
+        """
+        if response.status_code in API_PRESSURE_STATUS_CODES:
+            retry_after = str(response.headers.get('Retry-After') or '')
+            backoff = int(retry_after) if retry_after.isdigit() else API_RATE_LIMIT_BACKOFF
+            _logger.warning("Store of %s %s answered %s, requests are paused for %s seconds.", self.res_model,
+                            self.res_id, response.status_code, backoff)
+            self._execute(self._update_rate, True, backoff)
+        elif self.rate_factor < 1.0:
+            self._execute(self._update_rate, False, 0)
+        return True
+
+
+def send_rate_limited_request_ept(limiter, send, *args, http_method='get', **kwargs):
+    """ Use to send the request with the rate limiter of the instance. Requests answered with a pressure status
+        code are sent again after the backoff, up to API_RATE_LIMIT_RETRIES times. Requests of the non idempotent
+        methods are sent again only when they are throttled, so they are not processed twice by the store.
+        @param limiter: Rate limiter of the instance, or None.
+        @param send: Function which sends the request and returns the response, called with args and kwargs.
+        @param http_method: HTTP method of the request, like 'get' or 'post'.
+        @return: Response.
+    """
+    if not limiter:
+        return send(*args, **kwargs)
+    if str(http_method).lower() in API_NON_IDEMPOTENT_METHODS:
+        retry_status_codes = (API_THROTTLE_STATUS_CODE,)
+    else:
+        retry_status_codes = API_PRESSURE_STATUS_CODES
+    for attempt in range(API_RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        response = send(*args, **kwargs)
+        limiter.report(response)
+        if response.status_code not in retry_status_codes or attempt == API_RATE_LIMIT_RETRIES:
+            break
+    return response
+
+
+class ApiRateLimitStateEpt(models.Model):
+    _name = 'api.rate.limit.state.ept'
+    _description = 'API Rate Limit State'
+
+    res_model = fields.Char(string="Instance Model", required=True, readonly=True)
+    res_id = fields.Integer(string="Instance ID", required=True, readonly=True)
+    tokens = fields.Float(readonly=True)
+    refill_time = fields.Float(readonly=True, help="Epoch time from which the tokens are refilled.")
+    rate_factor = fields.Float(default=1.0, readonly=True, help="Factor of the sustained rate lowered by the "
+                                                                "pressure responses of the store.")
+
+    _sql_constraints = [('instance_unique', 'unique(res_model, res_id)', 'Rate limit state of the instance exists.')]
+
+
+class ApiRateLimitMixinEpt(models.AbstractModel):
+    _name = 'api.rate.limit.mixin.ept'
+    _description = 'API Rate Limit Mixin'
+
+    api_rate_limit_burst = fields.Integer(string="API Burst Requests", default=10,
+                                          help="Number of requests which can be sent at once after an idle time.")
+    api_rate_limit_rate = fields.Float(string="API Requests per Second", default=0.0,
+                                       help="Sustained rate of the requests of all workers to the store, 0 to "
+                                            "send the requests without limit. It is lowered automatically when "
+                                            "the store answers 429 or 503.")
+
+    def get_api_rate_limiter_ept(self):
+        """ Use to get the rate limiter of the instance for the API requests.
+            @return: Rate limiter, None if the rate is not limited.
+        """
+        self.ensure_one()
+        if self.api_rate_limit_rate <= 0:
+            return None
+        return ApiRateLimiterEpt(self.env.cr.dbname, self._name, self.id, max(1, self.api_rate_limit_burst),
+                                 self.api_rate_limit_rate)
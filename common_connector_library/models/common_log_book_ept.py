@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
 from odoo import models, fields, api
+from .common_log_lines_ept import LogLineBufferEpt
 
 
 class CommonLogBookEpt(models.Model):
@@ -37,6 +38,19 @@ class CommonLogBookEpt(models.Model):
         vals['name'] = seq
         return super(CommonLogBookEpt, self).create(vals)
 
+    def write(self, vals):
+        """ Log lines written on a log book are kept in the active log line buffer of the cursor, if any, and
+            created together when the buffer is flushed.
+        """
+        log_buffer = LogLineBufferEpt.get_active(self._cr)
+        log_lines = vals.get('log_lines')
+        if log_buffer and len(self) == 1 and list(vals) == ['log_lines'] and isinstance(log_lines, list) and \
+                all(isinstance(command, (list, tuple)) and command[0] == 0 for command in log_lines):
+            for command in log_lines:
+                log_buffer.add(dict(command[2], log_book_id=self.id))
+            return True
+        return super(CommonLogBookEpt, self).write(vals)
+
     def create_common_log_book(self, process_type, instance_field, instance, model_id, module):
         """ This method used to create a log book record.
             @param process_type: Generally, the process type value is 'import' or 'export'.
@@ -67,5 +81,4 @@ class CommonLogBookEpt(models.Model):
         return self.create(values)
 
     def _get_model_id(self, model_name):
-        model_id = self.env['ir.model']
-        return model_id.search([('model', '=', model_name)])
+        return self.env['ir.model']._get(model_name)
@@ -1,7 +1,94 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
+import weakref
 from odoo import models, fields, api
 
+# Active log line buffers by database cursor.
+_LOG_LINE_BUFFERS = weakref.WeakKeyDictionary()
+
+
+class LogLineBufferEpt:
+    """ Keeps the log lines in memory and creates them with one create call at flush. Identical log lines are
+        created once with the number of times they are logged in repeat_count. While the buffer is active for a
+        cursor, log lines written on the log book with log.write({'log_lines': [(0, 0, {...})]}) are kept in it.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.line_values = {}
+        self.line_keys = []
+        self.depth = 0
+
+    @classmethod
+    def activate(cls, env):
+        """ Use to activate the buffer of the cursor, the already active buffer is returned if any.
+            @return: Object of LogLineBufferEpt.
+        """
+        log_buffer = _LOG_LINE_BUFFERS.get(env.cr)
+        if not log_buffer:
+            log_buffer = _LOG_LINE_BUFFERS[env.cr] = cls(env)
+        log_buffer.depth += 1
+        return log_buffer
+
+    @staticmethod
+    def get_active(cr):
+        """ Use to get the active buffer of the cursor.
+            @return: Object of LogLineBufferEpt or None.
+        """
+        return _LOG_LINE_BUFFERS.get(cr)
+
+    def add(self, values):
+        """ Use to keep the log line in memory, the counter of the line is increased if it is already logged.
+            @param values: Dictionary of values of common.log.lines.ept.
+        """
+        key = tuple(sorted((field_name, repr(value)) for field_name, value in values.items()))
+        if key in self.line_values:
+            self.line_values[key]['repeat_count'] += 1
+        else:
+            self.line_values[key] = dict(values, repeat_count=1)
+        self.line_keys.append(key)
+        return True
+
+    def mark(self):
+        """ Use to get the position of the buffer, to discard the log lines added after it with rollback.
+        """
+        return len(self.line_keys)
+
+    def rollback(self, mark):
+        """ Use to discard the log lines added after the mark, like the log lines of a queue line which is rolled
+            back.
+            @param mark: Position of the buffer returned by mark.
+        """
+        for key in self.line_keys[mark:]:
+            self.line_values[key]['repeat_count'] -= 1
+            if not self.line_values[key]['repeat_count']:
+                del self.line_values[key]
+        del self.line_keys[mark:]
+        return True
+
+    def flush(self):
+        """ Use to create the log lines kept in memory.
+            @return: Records of created log lines.
+        """
+        vals_list = list(self.line_values.values())
+        self.line_values, self.line_keys = {}, []
+        if not vals_list:
+            return self.env['common.log.lines.ept']
+        return self.env['common.log.lines.ept'].create(vals_list)
+
+    def close(self, flush=True):
+        """ Use to flush the buffer and deactivate it for the cursor once its last user has closed it.
+            @param flush: Pass False to discard the log lines kept in memory, like when the transaction failed.
+        """
+        if flush:
+            self.flush()
+        else:
+            self.line_values, self.line_keys = {}, []
+        self.depth -= 1
+        if self.depth <= 0 and _LOG_LINE_BUFFERS.get(self.env.cr) is self:
+            del _LOG_LINE_BUFFERS[self.env.cr]
+        return True
+
 
 class CommonLogLineEpt(models.Model):
     _name = "common.log.lines.ept"
@@ -18,6 +105,7 @@ class CommonLogLineEpt(models.Model):
     file_name = fields.Char()
     sale_order_id = fields.Many2one(comodel_name='sale.order', string='Sale Order')
     log_line_type = fields.Selection(selection=[('success', 'Success'), ('fail', 'Fail')],default='fail')
+    repeat_count = fields.Integer(string="Repeated", default=1, help="Number of times the same message is logged.")
 
     @api.model
     def get_model_id(self, model_name):
@@ -27,10 +115,10 @@ class CommonLogLineEpt(models.Model):
             @author: Haresh Mori @Emipro Technologies Pvt. Ltd on date 23 September 2021 .
             Task_id: 178058
         """
-        model = self.env['ir.model'].search([('model', '=', model_name)])
-        if model:
-            return model.id
-        return False
+        if not model_name:
+            return False
+        # Id of the model is cached by ir.model, so it is not searched for each log line.
+        return self.env['ir.model']._get_id(model_name) or False
 
     def create_log_lines(self, message, model_id, res_id, log_book_id, default_code='', order_ref='', product_id=False):
         """ Used to create a log lines.
@@ -1,6 +1,150 @@
 # -*- coding: utf-8 -*-
 # See LICENSE file for full copyright and licensing details.
-from odoo import models
+import logging
+import time
+from datetime import timedelta
+from odoo import models, fields
+from .api_metric_ept import flush_api_metrics_ept
+from .common_log_lines_ept import LogLineBufferEpt
+from .queue_lease_mixin_ept import QUEUE_LEASE_DURATION
+
+_logger = logging.getLogger(__name__)
+
+# Default number of lines and seconds after which the processed queue lines are committed.
+QUEUE_COMMIT_LINES = 20
+QUEUE_COMMIT_SECONDS = 30
+# Default number of days the queues and log books are kept and number of records deleted in one chunk.
+QUEUE_RETENTION_DAYS = 7
+QUEUE_PURGE_CHUNK_SIZE = 1000
+# Number of queue lines processed in the savepoint of a commit batch by cursor.
+_QUEUE_LINE_SAVEPOINTS = {}
+
+
+def commit_queue_line_ept(cr):
+    """ Use to commit the changes of a queue line processed without commit batch. Queue lines processed in the
+        savepoint of a commit batch are committed by the batch, a commit would release its savepoint.
+        @param cr: Cursor of the queue line.
+        @return: True if the transaction is committed.
+    """
+    if _QUEUE_LINE_SAVEPOINTS.get(cr):
+        return False
+    cr.commit()
+    return True
+
+
+class QueueCommitBatchEpt:
+    """ Commits the processed queue lines in batches. Each line is processed in its own savepoint, so a failed line
+        is rolled back alone, and the transaction is committed once every N lines or T seconds. State values and
+        log lines of the processed lines are kept in memory and written together before each commit. Log line
+        buffer of the cursor is active till the batch is closed, so the batch is used as a context manager:
+        with queue_obj.get_queue_commit_batch_ept() as batch. Lease of the queues being processed is renewed at
+        each commit, so another worker can not claim them while they are processed.
+    """
+
+    def __init__(self, env, commit_lines=QUEUE_COMMIT_LINES, commit_seconds=QUEUE_COMMIT_SECONDS,
+                 timestamp_field=False, lease_records=None, lease_duration=QUEUE_LEASE_DURATION):
+        self.env = env
+        self.commit_lines = max(commit_lines, 1)
+        self.commit_seconds = commit_seconds
+        self.timestamp_field = timestamp_field
+        self.lease_records = lease_records
+        self.lease_duration = lease_duration
+        self.line_values = {}
+        self.log_buffer = LogLineBufferEpt.activate(env)
+        self.line_count = 0
+        self.last_commit = time.time()
+
+    def process_line(self, function, *args, **kwargs):
+        """ Use to process one queue line in a savepoint. Changes of the line are rolled back if it raises an
+            error, while the lines processed before it are kept. The method must not commit, it commits with
+            commit_queue_line_ept.
+            @param function: Method which processes the line.
+            @return: Tuple of the result of the method and the error if it is raised.
+        """
+        cr = self.env.cr
+        self.line_count += 1
+        log_mark = self.log_buffer.mark()
+        _QUEUE_LINE_SAVEPOINTS[cr] = _QUEUE_LINE_SAVEPOINTS.get(cr, 0) + 1
+        try:
+            with cr.savepoint():
+                return function(*args, **kwargs), False
+        except Exception as error:
+            _logger.exception("Queue line could not be processed.")
+            self.log_buffer.rollback(log_mark)
+            return False, error
+        finally:
+            _QUEUE_LINE_SAVEPOINTS[cr] -= 1
+            if not _QUEUE_LINE_SAVEPOINTS[cr]:
+                del _QUEUE_LINE_SAVEPOINTS[cr]
+
+    def write_line_values(self, lines, values):
+        """ Use to write the values of the lines at the next commit, lines having the same values are written
+            together.
+            @param lines: Records of queue lines.
+            @param values: Dictionary of values, like {'state': 'done'}.
+        """
+        key = (lines._name, tuple(sorted(values.items())))
+        self.line_values.setdefault(key, []).extend(lines.ids)
+        return True
+
+    def add_log_line(self, values):
+        """ Use to create the log line at the next commit.
+            @param values: Dictionary of values of common.log.lines.ept.
+        """
+        return self.log_buffer.add(values)
+
+    def commit_if_needed(self):
+        """ Use to commit when the number of lines or the time of the batch is reached.
+            @return: True if committed.
+        """
+        if self.line_count >= self.commit_lines or time.time() - self.last_commit >= self.commit_seconds:
+            return self.commit()
+        return False
+
+    def flush(self):
+        """ Use to write the values and create the log lines kept in memory.
+        """
+        for (model_name, values), line_ids in self.line_values.items():
+            values = dict(values)
+            if self.timestamp_field:
+                values.update({self.timestamp_field: fields.Datetime.now()})
+            self.env[model_name].browse(line_ids).write(values)
+        self.log_buffer.flush()
+        self.line_values = {}
+        return True
+
+    def commit(self):
+        """ Use to flush the batch, renew the lease of the queues and commit the transaction.
+        """
+        self.flush()
+        if self.lease_records:
+            self.lease_records.renew_queue_lease_ept(self.lease_duration)
+        self.env.cr.commit()
+        _logger.info("Queue batch of %s lines committed.", self.line_count)
+        self.line_count = 0
+        self.last_commit = time.time()
+        return True
+
+    def close(self, flush=True):
+        """ Use to flush the batch and deactivate the log line buffer of the cursor, once all lines are processed.
+            API metrics of the worker are saved at the end of each queue run.
+            @param flush: Pass False to discard the values and log lines kept in memory.
+        """
+        if flush:
+            self.flush()
+        else:
+            self.line_values = {}
+        self.log_buffer.close(flush=flush)
+        flush_api_metrics_ept(self.env.cr.dbname)
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Log line buffer is deactivated even if the loop raised, pending values are discarded with the transaction.
+        self.close(flush=exc_type is None)
+        return False
 
 
 class DataQueueMixinEpt(models.AbstractModel):
@@ -9,6 +153,10 @@ class DataQueueMixinEpt(models.AbstractModel):
 
     def delete_data_queue_ept(self, queue_detail=[], is_delete_queue=False):
         """  Uses to delete unused data of queues and log book. logbook deletes which created before 7 days ago.
+            Records are deleted in chunks of ids and the transaction is committed after each chunk, so the tables
+            are not locked for the whole cleanup. Days and chunk size are configured by the
+            common_connector_library.queue_retention_days and common_connector_library.queue_purge_chunk_size
+            system parameters.
             @param queue_detail: list of queue records, like product, order queue [['product_queue',
             'order_queue']]
             @param is_delete_queue: Identification to delete queue
@@ -16,15 +164,115 @@ class DataQueueMixinEpt(models.AbstractModel):
             Migration done by Haresh Mori on September 2021
         """
         if queue_detail:
+            config_parameter = self.env['ir.config_parameter'].sudo()
+            retention_days = int(config_parameter.get_param('common_connector_library.queue_retention_days',
+                                                            QUEUE_RETENTION_DAYS))
+            chunk_size = int(config_parameter.get_param('common_connector_library.queue_purge_chunk_size',
+                                                        QUEUE_PURGE_CHUNK_SIZE))
+            before_date = False if is_delete_queue else fields.Datetime.now() - timedelta(days=retention_days)
             try:
                 queue_detail += ['common_log_book_ept']
+                if not is_delete_queue:
+                    # Metrics and timings are kept for all instances, they are only purged by the retention.
+                    queue_detail += ['common_api_metric_ept', 'queue_stage_timing_ept']
                 queue_detail = list(set(queue_detail))
                 for tbl_name in queue_detail:
-                    if is_delete_queue:
-                        self._cr.execute("""delete from %s """ % str(tbl_name))
-                        continue
-                    self._cr.execute(
-                        """delete from %s where cast(create_date as Date) <= current_date - %d""" % (str(tbl_name), 7))
+                    # Records are deleted in the transaction of the caller when all queues are deleted.
+                    self.purge_table_in_chunks_ept(tbl_name, before_date, chunk_size, commit=not is_delete_queue)
             except Exception as error:
+                _logger.exception("Queues could not be deleted.")
                 return error
         return True
+
+    def purge_table_in_chunks_ept(self, table, before_date=False, chunk_size=QUEUE_PURGE_CHUNK_SIZE, commit=True):
+        """ Use to delete the records of the table created before the date in chunks of ids. Each chunk is found
+            and deleted with the primary key index, and as ids are increased with the create date, purge is
+            stopped at the first chunk which has only newer records. Records deleted in cascade, like the queue
+            lines and log lines, are deleted before their parents in chunks of ids too.
+            @param table: Name of the table, like sync_import_magento_product_queue.
+            @param before_date: Records created before this date are deleted, all records if not passed.
+            @param chunk_size: Maximum number of records deleted in one chunk.
+            @param commit: Commit the transaction after each chunk.
+            @return: Number of deleted records.
+        """
+        last_id, total_count, start = 0, 0, time.time()
+        date_clause = "AND create_date < %(before_date)s" if before_date else ""
+        while True:
+            self._cr.execute("""SELECT max(id), count(id) FROM (
+                                    SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s) AS chunk
+                             """.format(table=table), (last_id, chunk_size))
+            chunk_last_id, chunk_count = self._cr.fetchone()
+            if not chunk_count:
+                break
+            self._cr.execute("""SELECT id FROM {table} WHERE id > %(first_id)s AND id <= %(last_id)s {date_clause}
+                             """.format(table=table, date_clause=date_clause),
+                             {'first_id': last_id, 'last_id': chunk_last_id, 'before_date': before_date})
+            record_ids = [row[0] for row in self._cr.fetchall()]
+            deleted_count = self._delete_records_in_chunks_ept(table, record_ids, chunk_size, commit)
+            total_count += deleted_count
+            _logger.info("Purge of %s: %s records deleted, %s in total in %.1f seconds.", table, deleted_count,
+                         total_count, time.time() - start)
+            if not deleted_count:
+                break
+            last_id = chunk_last_id
+        return total_count
+
+    def _delete_records_in_chunks_ept(self, table, record_ids, chunk_size, commit):
+        """ Use to delete the records, the records of the tables deleted in cascade with them are deleted before
+            in chunks of ids, so one statement does not delete an unlimited number of lines.
+            @param table: Name of the table.
+            @param record_ids: Ids of the records to delete.
+            @return: Number of deleted records of the table.
+        """
+        if not record_ids:
+            return 0
+        for child_table, column in self._get_cascade_child_tables_ept(table):
+            while True:
+                self._cr.execute("""SELECT id FROM {table} WHERE {column} = ANY(%s) ORDER BY id LIMIT %s
+                                 """.format(table=child_table, column=column), (record_ids, chunk_size))
+                child_ids = [row[0] for row in self._cr.fetchall()]
+                if not child_ids:
+                    break
+                self._delete_records_in_chunks_ept(child_table, child_ids, chunk_size, commit)
+        self._cr.execute("DELETE FROM {table} WHERE id = ANY(%s)".format(table=table), (record_ids,))
+        deleted_count = self._cr.rowcount
+        if commit:
+            self._cr.commit()
+        return deleted_count
+
+    def _get_cascade_child_tables_ept(self, table):
+        """ Use to get the tables having records deleted in cascade with the records of the table. Relation
+            tables without id are left to the cascade.
+            @param table: Name of the table.
+            @return: List of tuples like [(child table, foreign key column)].
+        """
+        self._cr.execute("""SELECT child.relname, att.attname
+                                FROM pg_constraint AS con
+                                    JOIN pg_class AS child ON child.oid = con.conrelid
+                                    JOIN pg_attribute AS att
+                                        ON att.attrelid = con.conrelid AND att.attnum = con.conkey[1]
+                                WHERE con.contype = 'f' AND con.confdeltype = 'c' AND con.confrelid = %s::regclass
+                                    AND array_length(con.conkey, 1) = 1 AND con.conrelid != con.confrelid
+                                    AND EXISTS (SELECT 1 FROM pg_attribute AS id_att
+                                                    WHERE id_att.attrelid = con.conrelid AND id_att.attname = 'id'
+                                                        AND NOT id_att.attisdropped)
+                         """, (table,))
+        return self._cr.fetchall()
+
+    def get_queue_commit_batch_ept(self, timestamp_field=False, lease_records=None,
+                                   lease_duration=QUEUE_LEASE_DURATION):
+        """ Use to get the commit batch to process the queue lines. Number of lines and seconds of the batch are
+            configured by the common_connector_library.queue_commit_lines and
+            common_connector_library.queue_commit_seconds system parameters.
+            @param timestamp_field: Field of the line which is set to the commit time, like processed_at.
+            @param lease_records: Queues claimed by the current worker, their lease is renewed at each commit.
+            @param lease_duration: Lease of the queues is expired at least this many seconds after each commit.
+            @return: Object of QueueCommitBatchEpt.
+        """
+        config_parameter = self.env['ir.config_parameter'].sudo()
+        commit_lines = int(config_parameter.get_param('common_connector_library.queue_commit_lines',
+                                                      QUEUE_COMMIT_LINES))
+        commit_seconds = int(config_parameter.get_param('common_connector_library.queue_commit_seconds',
+                                                        QUEUE_COMMIT_SECONDS))
+        return QueueCommitBatchEpt(self.env, commit_lines, commit_seconds, timestamp_field, lease_records,
+                                   lease_duration)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import logging
+import threading
+import weakref
+import odoo
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+# Sequence increased after each committed change of the cached models, so the workers drop their lookup cache.
+LOOKUP_CACHE_SEQUENCE = 'common_connector_lookup_cache_seq_ept'
+
+_lookup_cache_lock = threading.Lock()
+# Cached lookups by database, like {dbname: {'version': 3, 'values': {key: ids}}}.
+_lookup_caches = {}
+# Cursors of which the transaction has changed the cached models, lookups of them are not cached.
+_changed_cursors = weakref.WeakSet()
+
+
+def get_cached_lookup_ept(env, key, compute):
+    """ Use to get the ids of a lookup from the cache of the worker. The cache is dropped when a change of the
+        cached models is committed by any worker. Lookups are computed in a new cursor, so only committed records
+        are cached, and in the cursor of the caller without cache while its transaction has changed the models.
+        Cached ids are checked with exists, as they may be committed after the snapshot of the caller.
+        @param env: Environment of the caller.
+        @param key: Hashable key of the lookup, the model of the ids first, like ('account.tax', 10.0, False).
+        @param compute: Function called with an environment, it returns the tuple of ids of the lookup.
+        @return: Tuple of ids.
+    """
+    if env.cr in _changed_cursors:
+        return compute(env)
+    env.cr.execute("SELECT last_value FROM %s" % LOOKUP_CACHE_SEQUENCE)
+    version = env.cr.fetchone()[0]
+    dbname = env.cr.dbname
+    with _lookup_cache_lock:
+        cache = _lookup_caches.get(dbname)
+        if not cache or cache['version'] != version:
+            cache = _lookup_caches[dbname] = {'version': version, 'values': {}}
+        ids = cache['values'].get(key)
+    if ids is not None:
+        model = env[key[0]]
+        if len(model.browse(ids).exists()) == len(ids):
+            return ids
+        return compute(env)
+    with env.registry.cursor() as cr:
+        ids = compute(api.Environment(cr, env.uid, env.context))
+    with _lookup_cache_lock:
+        if _lookup_caches.get(dbname) is cache:
+            cache['values'][key] = ids
+    return ids
+
+
+def _signal_lookup_cache_change(dbname):
+    try:
+        with odoo.registry(dbname).cursor() as cr:
+            cr.execute("SELECT nextval('%s')" % LOOKUP_CACHE_SEQUENCE)
+    except Exception as error:
+        _logger.warning("Lookup cache change could not be signalled. %s", error)
+    with _lookup_cache_lock:
+        _lookup_caches.pop(dbname, None)
+
+
+class LookupCacheMixinEpt(models.AbstractModel):
+    _name = 'lookup.cache.mixin.ept'
+    _description = 'Lookup Cache Mixin'
+
+    def init(self):
+        super(LookupCacheMixinEpt, self).init()
+        self._cr.execute("CREATE SEQUENCE IF NOT EXISTS %s" % LOOKUP_CACHE_SEQUENCE)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """ Use to drop the cached lookups once the new records are committed.
+        """
+        self._mark_lookup_cache_changed_ept()
+        return super(LookupCacheMixinEpt, self).create(vals_list)
+
+    def write(self, vals):
+        """ Use to drop the cached lookups once the changes are committed.
+        """
+        self._mark_lookup_cache_changed_ept()
+        return super(LookupCacheMixinEpt, self).write(vals)
+
+    def unlink(self):
+        """ Use to drop the cached lookups once the deletion is committed.
+        """
+        self._mark_lookup_cache_changed_ept()
+        return super(LookupCacheMixinEpt, self).unlink()
+
+    def _mark_lookup_cache_changed_ept(self):
+        cr = self._cr
+        if cr in _changed_cursors:
+            return True
+        _changed_cursors.add(cr)
+        dbname = cr.dbname
+
+        def after_commit():
+            _changed_cursors.discard(cr)
+            _signal_lookup_cache_change(dbname)
+
+        cr.postcommit.add(after_commit)
+        cr.postrollback.add(lambda: _changed_cursors.discard(cr))
+        return True
@@ -25,21 +25,42 @@ class ProductPricelist(models.Model):
             @author: Haresh Mori @Emipro Technologies Pvt. Ltd on date 23 September 2021 .
             Task_id: 178058
         """
+        return self.set_product_prices_ept({product_id: price}, min_qty=min_qty)
+
+    def set_product_prices_ept(self, product_prices, min_qty=1):
+        """ Use to Create/Update prices of many products in the pricelist. Existing items are searched at once,
+            changed prices are written together for each price and missing items are created at once.
+            @param product_prices: Dictionary like {product_id: price}.
+            @param min_qty: Minimum quantity of the items.
+            @return: Records of pricelist items.
+        """
         pricelist_item_obj = self.env['product.pricelist.item']
-        domain = [('pricelist_id', '=', self.id), ('product_id', '=', product_id), ('min_quantity', '=', min_qty)]
-
-        pricelist_item = pricelist_item_obj.search(domain)
-
-        if pricelist_item:
-            pricelist_item.write({'fixed_price': price})
-        else:
-            vals = self.prepre_pricelistitem_vals(product_id, min_qty, price)
-            new_record = pricelist_item_obj.new(vals)
-            new_record._onchange_product_id()
-            new_vals = pricelist_item_obj._convert_to_write(
-                {name: new_record[name] for name in new_record._cache})
-            pricelist_item = pricelist_item_obj.create(new_vals)
-        return pricelist_item
+        if not product_prices:
+            return pricelist_item_obj
+        domain = [('pricelist_id', '=', self.id), ('product_id', 'in', list(product_prices.keys())),
+                  ('min_quantity', '=', min_qty)]
+        pricelist_items = pricelist_item_obj.search(domain)
+
+        items_by_price = {}
+        for pricelist_item in pricelist_items:
+            price = product_prices.get(pricelist_item.product_id.id)
+            if pricelist_item.fixed_price != float(price or 0.0):
+                items_by_price.setdefault(price, pricelist_item_obj)
+                items_by_price[price] |= pricelist_item
+        for price, items in items_by_price.items():
+            items.write({'fixed_price': price})
+
+        missing_ids = set(product_prices.keys()) - set(pricelist_items.product_id.ids)
+        if missing_ids:
+            vals_list = []
+            # Template of the item is set like the onchange of the product of the item.
+            for product in self.env['product.product'].browse([product_id for product_id in product_prices
+                                                               if product_id in missing_ids]):
+                vals = self.prepre_pricelistitem_vals(product.id, min_qty, product_prices.get(product.id))
+                vals.update({'product_tmpl_id': product.product_tmpl_id.id})
+                vals_list.append(vals)
+            pricelist_items |= pricelist_item_obj.create(vals_list)
+        return pricelist_items
 
     def prepre_pricelistitem_vals(self, product_id, min_qty, price):
         """ Use to preapre a vals of pricelist item.
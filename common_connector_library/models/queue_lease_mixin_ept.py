@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import logging
+import uuid
+from psycopg2.extensions import TransactionRollbackError
+from odoo import models, fields
+
+_logger = logging.getLogger(__name__)
+
+# Lease is expired after this many seconds, so records of a crashed worker can be claimed again.
+QUEUE_LEASE_DURATION = 600
+
+
+class QueueLeaseMixinEpt(models.AbstractModel):
+    _name = 'queue.lease.mixin.ept'
+    _description = 'Queue Lease Mixin'
+
+    lease_token = fields.Char(copy=False, readonly=True, help="Token of the worker which is processing the record.")
+    lease_expire_at = fields.Datetime(copy=False, readonly=True, index=True,
+                                      help="Record can be claimed by another worker after this time.")
+
+    def claim_queue_lease_ept(self, where_clause="", params=None, limit=1, order="id",
+                              lease_duration=QUEUE_LEASE_DURATION):
+        """ Use to claim the records of the queue for the current worker. Records which are leased by another
+            worker are skipped with FOR UPDATE SKIP LOCKED, so many cron workers or threads with their own cursor
+            can process the same queue type at the same time without processing the same record. Transaction
+            is committed before and after the claim to make the lease visible to other workers.
+            @param where_clause: SQL condition to filter the records, like "AND state = 'draft'".
+            @param params: Dictionary of parameters used in the where clause.
+            @param limit: Maximum number of records to claim.
+            @param order: SQL order of the records to claim.
+            @param lease_duration: Lease of the records is expired after this many seconds.
+            @return: Records claimed by the current worker, only within self if self is not empty.
+        """
+        params = dict(params or {})
+        if self.ids:
+            where_clause += " AND id = ANY(%(lease_ids)s)"
+            params.update({'lease_ids': self.ids})
+        lease_token = uuid.uuid4().hex
+        params.update({'lease_token': lease_token, 'lease_duration': lease_duration, 'limit': limit})
+        query = """UPDATE {table} SET lease_token = %(lease_token)s,
+                    lease_expire_at = (now() at time zone 'UTC') + %(lease_duration)s * interval '1 second'
+                    WHERE id IN (
+                        SELECT id FROM {table}
+                        WHERE (lease_expire_at IS NULL OR lease_expire_at < (now() at time zone 'UTC'))
+                        {where_clause}
+                        ORDER BY {order} LIMIT %(limit)s
+                        FOR UPDATE SKIP LOCKED)
+                    RETURNING id""".format(table=self._table, where_clause=where_clause, order=order)
+        # Start a new snapshot, so leases committed by other workers are visible to the claim.
+        self._cr.commit()
+        try:
+            with self._cr.savepoint(flush=False):
+                self._cr.execute(query, params)
+                claimed_ids = [row[0] for row in self._cr.fetchall()]
+        except TransactionRollbackError:
+            # Another worker has claimed the records after the snapshot is taken.
+            claimed_ids = []
+        self._cr.commit()
+        self.invalidate_cache(['lease_token', 'lease_expire_at'], claimed_ids)
+        if claimed_ids:
+            _logger.info("%s records of %s claimed with lease %s.", len(claimed_ids), self._name, lease_token)
+        return self.browse(claimed_ids)
+
+    def renew_queue_lease_ept(self, lease_duration=QUEUE_LEASE_DURATION):
+        """ Use to extend the lease of the records claimed by the current worker, when processing takes more time
+            than the lease duration. It is called by the queue commit batch at each commit, a longer lease is kept.
+            @param lease_duration: Lease of the records is expired at least this many seconds from now.
+        """
+        if self.ids:
+            self._cr.execute("""UPDATE {table} SET lease_expire_at = GREATEST(lease_expire_at,
+                                    (now() at time zone 'UTC') + %s * interval '1 second')
+                                WHERE id = ANY(%s) AND lease_token IS NOT NULL""".format(table=self._table),
+                             (lease_duration, self.ids))
+            self.invalidate_cache(['lease_expire_at'], self.ids)
+        return True
+
+    def release_queue_lease_ept(self):
+        """ Use to release the lease of the records once the current worker has processed them, so they can be
+            claimed again without waiting for the lease to expire.
+        """
+        if self.ids:
+            self._cr.execute("""UPDATE {table} SET lease_token = NULL, lease_expire_at = NULL
+                                WHERE id = ANY(%s)""".format(table=self._table), (self.ids,))
+            self.invalidate_cache(['lease_token', 'lease_expire_at'], self.ids)
+        return True
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo import models, fields
+
+
+class QueuePayloadArchiveEntityEpt(models.Model):
+    _name = 'queue.payload.archive.entity.ept'
+    _description = 'Queue Payload Archive Entity'
+    _order = 'archive_id, position'
+
+    archive_id = fields.Many2one('queue.payload.archive.ept', string="Archive Segment", required=True, index=True,
+                                 ondelete="cascade")
+    res_model = fields.Char(string="Queue Line Model", readonly=True, index=True)
+    entity_id = fields.Char(string="Entity ID", readonly=True, index=True,
+                            help="ID of the connector record, like Magento order ID.")
+    line_res_id = fields.Integer(string="Queue Line ID", readonly=True)
+    position = fields.Integer(readonly=True, help="Position of the queue line in the archived segment.")
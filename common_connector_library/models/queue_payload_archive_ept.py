@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import gzip
+import json
+import logging
+from odoo import models, fields
+
+_logger = logging.getLogger(__name__)
+
+# Default number of days after which the payloads of processed queue lines are archived, it is kept lower than
+# the retention days of the queues, so the payloads are archived before the queues are purged.
+QUEUE_ARCHIVE_DAYS = 3
+
+
+class QueuePayloadArchiveEpt(models.Model):
+    _name = 'queue.payload.archive.ept'
+    _description = 'Queue Payload Archive Segment'
+    _order = 'id desc'
+
+    name = fields.Char(readonly=True)
+    res_model = fields.Char(string="Queue Line Model", readonly=True, index=True)
+    instance_res_id = fields.Integer(string="Instance ID", readonly=True, index=True,
+                                     help="ID of the connector instance of the archived queue lines.")
+    date_from = fields.Datetime(readonly=True, index=True, help="Create date of the first archived queue line.")
+    date_to = fields.Datetime(readonly=True, index=True, help="Create date of the last archived queue line.")
+    line_count = fields.Integer(readonly=True)
+    entity_line_ids = fields.One2many('queue.payload.archive.entity.ept', 'archive_id', string="Entities",
+                                      readonly=True,
+                                      help="IDs of the connector records in the segment, like Magento order IDs.")
+    attachment_id = fields.Many2one('ir.attachment', string="Attachment", readonly=True, ondelete="restrict")
+
+    def archive_queue_payloads_ept(self):
+        """ Use to archive the payloads of processed queue lines of all queue line models which inherit
+            queue.payload.archive.mixin.ept. Days are configured by the common_connector_library.queue_archive_days
+            system parameter. Called by cron.
+        """
+        days = int(self.env['ir.config_parameter'].sudo().get_param('common_connector_library.queue_archive_days',
+                                                                      QUEUE_ARCHIVE_DAYS))
+        for model_name in self.env.registry['queue.payload.archive.mixin.ept']._inherit_children:
+            if not self.env[model_name]._abstract:
+                self.env[model_name].archive_payloads_ept(days)
+        return True
+
+    def create_segment_ept(self, res_model, instance_res_id, records):
+        """ Use to write the payloads in a compressed JSONL file and create the segment with it.
+            @param res_model: Name of the queue line model.
+            @param instance_res_id: ID of the instance of the queue lines.
+            @param records: List of dictionaries, like {'id': 1, 'entity_id': '10', 'create_date': '', 'data': ''}.
+            @return: Record of the segment.
+        """
+        content = gzip.compress(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+        create_dates = [record.get('create_date') for record in records]
+        segment = self.create({
+            'name': "%s-%s-%s" % (res_model, instance_res_id or 0, records[0].get('id')),
+            'res_model': res_model,
+            'instance_res_id': instance_res_id,
+            'date_from': min(create_dates),
+            'date_to': max(create_dates),
+            'line_count': len(records),
+        })
+        self.env['queue.payload.archive.entity.ept'].create([{
+            'archive_id': segment.id,
+            'res_model': res_model,
+            'entity_id': str(record.get('entity_id')),
+            'line_res_id': record.get('id'),
+            'position': position,
+        } for position, record in enumerate(records) if record.get('entity_id')])
+        segment.attachment_id = self.env['ir.attachment'].create({
+            'name': "%s.jsonl.gz" % segment.name,
+            'raw': content,
+            'mimetype': 'application/gzip',
+            'res_model': self._name,
+            'res_id': segment.id,
+        })
+        return segment
+
+    def search_entity_payloads_ept(self, res_model, entity_id):
+        """ Use to find the archived payloads of a connector record, like all archived payloads of a Magento order.
+            @param res_model: Name of the queue line model.
+            @param entity_id: ID of the connector record.
+            @return: List of archived records of the entity, newest segment first.
+        """
+        entity_lines = self.env['queue.payload.archive.entity.ept'].search([('res_model', '=', res_model),
+                                                                            ('entity_id', '=', str(entity_id))])
+        records = []
+        for segment in entity_lines.mapped('archive_id').sorted('id', reverse=True):
+            segment_records = segment.read_segment_records_ept()
+            records += [segment_records[entity_line.position] for entity_line in entity_lines
+                        if entity_line.archive_id == segment]
+        return records
+
+    def read_segment_records_ept(self):
+        """ Use to read the archived records of the segment.
+            @return: List of dictionaries in the archived order.
+        """
+        self.ensure_one()
+        content = gzip.decompress(self.attachment_id.raw).decode('utf-8')
+        return [json.loads(line) for line in content.splitlines() if line]
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import json
+import logging
+from datetime import timedelta
+from odoo import models, fields
+
+_logger = logging.getLogger(__name__)
+
+# Number of queue lines archived in one segment.
+QUEUE_ARCHIVE_SEGMENT_SIZE = 1000
+# Key of the stub which replaces the archived payload.
+ARCHIVE_STUB_KEY = 'archived_payload'
+
+
+class QueuePayloadArchiveMixinEpt(models.AbstractModel):
+    """ Queue line models inherit this mixin to archive the payloads of the processed lines, by setting the field
+        names of the payload, the entity ID and the instance. Lines whose payload is still needed after they are
+        processed are excluded with the SQL condition of _archive_where_clause.
+    """
+    _name = 'queue.payload.archive.mixin.ept'
+    _description = 'Queue Payload Archive Mixin'
+    _archive_payload_field = 'data'
+    _archive_entity_field = False
+    _archive_instance_field = 'instance_id'
+    _archive_where_clause = ""
+
+    payload_archive_id = fields.Many2one('queue.payload.archive.ept', string="Payload Archive", copy=False,
+                                         readonly=True, index=True, ondelete="restrict",
+                                         help="Payload of the line is archived in this segment.")
+
+    def archive_payloads_ept(self, days, segment_size=QUEUE_ARCHIVE_SEGMENT_SIZE):
+        """ Use to move the payloads of done and cancelled lines older than the days to compressed JSONL segments.
+            Payload of each line is replaced by a stub pointing to its segment and position, and the transaction is
+            committed after each segment.
+            @param days: Payloads of the lines created before this many days are archived.
+            @param segment_size: Maximum number of lines in one segment.
+            @return: Number of archived lines.
+        """
+        before_date = fields.Datetime.now() - timedelta(days=days)
+        payload_field = self._archive_payload_field
+        read_fields = [payload_field, 'create_date', self._archive_instance_field]
+        if self._archive_entity_field:
+            read_fields.append(self._archive_entity_field)
+        last_id, total_count = 0, 0
+        while True:
+            self._cr.execute("""SELECT id FROM {table} WHERE id > %s AND state IN ('done', 'cancel')
+                                AND create_date < %s AND payload_archive_id IS NULL AND {payload} IS NOT NULL
+                                {where_clause} ORDER BY id LIMIT %s
+                             """.format(table=self._table, payload=payload_field,
+                                        where_clause=self._archive_where_clause),
+                             (last_id, before_date, segment_size))
+            line_ids = [row[0] for row in self._cr.fetchall()]
+            if not line_ids:
+                break
+            records_by_instance = {}
+            for values in self.browse(line_ids).read(read_fields, load=False):
+                records_by_instance.setdefault(values.get(self._archive_instance_field) or False, []).append({
+                    'id': values.get('id'),
+                    'entity_id': values.get(self._archive_entity_field) if self._archive_entity_field else False,
+                    'create_date': fields.Datetime.to_string(values.get('create_date')),
+                    'data': values.get(payload_field),
+                })
+            for instance_res_id, records in records_by_instance.items():
+                segment = self.env['queue.payload.archive.ept'].create_segment_ept(self._name, instance_res_id,
+                                                                                  records)
+                stubs = [json.dumps({ARCHIVE_STUB_KEY: segment.id, 'position': position})
+                         for position in range(len(records))]
+                self._cr.execute("""UPDATE {table} SET {payload} = line.stub, payload_archive_id = %s
+                                    FROM unnest(%s, %s) AS line(id, stub) WHERE {table}.id = line.id
+                                 """.format(table=self._table, payload=payload_field),
+                                 (segment.id, [record.get('id') for record in records], stubs))
+            self.invalidate_cache([payload_field, 'payload_archive_id'], line_ids)
+            self._cr.commit()
+            total_count += len(line_ids)
+            last_id = line_ids[-1]
+            _logger.info("Payloads of %s lines of %s archived, %s in total.", len(line_ids), self._name,
+                         total_count)
+        return total_count
+
+    def restore_archived_payload_ept(self):
+        """ Use to restore the archived payloads of the lines from their segments, each segment is read once.
+        """
+        payload_field = self._archive_payload_field
+        for segment in self.mapped('payload_archive_id'):
+            payloads = {record.get('id'): record.get('data') for record in segment.read_segment_records_ept()}
+            for line in self.filtered(lambda queue_line: queue_line.payload_archive_id == segment):
+                line.write({payload_field: payloads.get(line.id), 'payload_archive_id': False})
+        return True
+
+    def get_payload_ept(self):
+        """ Use to get the payload of the line, the archived payload is read from its segment without restoring it.
+            @return: Payload of the line.
+        """
+        self.ensure_one()
+        if not self.payload_archive_id:
+            return self[self._archive_payload_field]
+        stub = json.loads(self[self._archive_payload_field])
+        return self.payload_archive_id.read_segment_records_ept()[stub.get('position')].get('data')
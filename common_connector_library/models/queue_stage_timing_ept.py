@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+from odoo import models, fields
+
+# Stage timers of the queue lines being processed, by database cursor.
+_STAGE_TIMERS = weakref.WeakKeyDictionary()
+
+
+class QueueStageTimerEpt:
+    """ Measures the elapsed time and number of queries of each stage of a queue line. Stages are measured with
+        queue_stage_ept, so the methods called while processing the line do not need the timer.
+    """
+
+    def __init__(self, env, line, instance):
+        self.env = env
+        self.line = line
+        self.instance = instance
+        self.stage_values = {}
+
+    def _get_query_count(self):
+        return getattr(self.env.cr, 'sql_log_count', 0)
+
+    @contextmanager
+    def stage(self, name):
+        """ Use to measure the stage, time of the same stage is added if it is measured more than once.
+            @param name: Name of the stage, like partner.
+        """
+        start, query_count = time.time(), self._get_query_count()
+        try:
+            yield self
+        finally:
+            values = self.stage_values.setdefault(name, [0.0, 0])
+            values[0] += time.time() - start
+            values[1] += self._get_query_count() - query_count
+
+    def save(self):
+        """ Use to create the timing records of the stages of the line.
+        """
+        vals_list = [{
+            'res_model': self.line._name,
+            'res_id': self.line.id,
+            'instance_name': self.instance.display_name if self.instance else False,
+            'stage': stage,
+            'duration': duration,
+            'query_count': query_count,
+        } for stage, (duration, query_count) in self.stage_values.items()]
+        return self.env['queue.stage.timing.ept'].create(vals_list)
+
+
+@contextmanager
+def time_queue_line_ept(line, instance):
+    """ Use to measure the stages of the queue line processed in the block, when it is enabled by the
+        common_connector_library.queue_stage_timing system parameter. Timing of a line which raises an error is
+        rolled back with the line.
+        @param line: Record of the queue line.
+        @param instance: Record of the instance of the queue line.
+    """
+    env = line.env
+    if env['ir.config_parameter'].sudo().get_param('common_connector_library.queue_stage_timing') != 'True':
+        yield None
+        return
+    timer = _STAGE_TIMERS[env.cr] = QueueStageTimerEpt(env, line, instance)
+    try:
+        with timer.stage('total'):
+            yield timer
+        timer.save()
+    finally:
+        _STAGE_TIMERS.pop(env.cr, None)
+
+
+def queue_stage_ept(env, name):
+    """ Use to measure the stage of the queue line being processed with the cursor, nothing is measured if stage
+        timing is not enabled.
+        @param env: Environment of the cursor.
+        @param name: Name of the stage, like partner.
+        @return: Context manager.
+    """
+    timer = _STAGE_TIMERS.get(env.cr)
+    return timer.stage(name) if timer else nullcontext()
+
+
+class QueueStageTimingEpt(models.Model):
+    _name = 'queue.stage.timing.ept'
+    _description = 'Queue Line Stage Timing'
+    _order = 'id desc'
+
+    res_model = fields.Char(string="Queue Line Model", readonly=True, index=True)
+    res_id = fields.Integer(string="Queue Line ID", readonly=True, index=True)
+    instance_name = fields.Char(string="Instance", readonly=True, index=True)
+    stage = fields.Char(readonly=True, index=True)
+    duration = fields.Float(string="Duration (s)", readonly=True, group_operator="avg")
+    query_count = fields.Integer(string="Queries", readonly=True, group_operator="avg")
+    stage_date = fields.Date(string="Date", default=fields.Date.context_today, readonly=True, index=True)
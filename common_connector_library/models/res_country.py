@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo import models, api
+from .lookup_cache_ept import get_cached_lookup_ept
+
+
+class ResCountry(models.Model):
+    _name = 'res.country'
+    _inherit = ['res.country', 'lookup.cache.mixin.ept']
+
+    @api.model
+    def search_country_ept(self, country_name_or_code):
+        """ Use to search the country by name or code, ignoring the case. Result is cached for the workers until a
+            change of the countries is committed, so the country of each order is not searched again.
+            @param country_name_or_code: Country Name or Country Code, Type: Char
+            @return: res.country()
+        """
+        key = (self._name, country_name_or_code or False, self.env.lang or False)
+        country_ids = get_cached_lookup_ept(self.env, key,
+                                            lambda env: env[self._name]._search_country_ids_ept(*key[1:]))
+        return self.browse(country_ids)
+
+    @api.model
+    def _search_country_ids_ept(self, country_name_or_code, lang):
+        country = self.with_context(lang=lang).search(['|', ('code', '=ilike', country_name_or_code),
+                                                       ('name', '=ilike', country_name_or_code)], limit=1)
+        return tuple(country.ids)
+
+
+class ResCountryGroup(models.Model):
+    _name = 'res.country.group'
+    _inherit = ['res.country.group', 'lookup.cache.mixin.ept']
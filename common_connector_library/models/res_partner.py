@@ -64,9 +64,7 @@ class ResPartner(models.Model):
             @Updated By : Dipak Gogiya, 21/09/2020
             :return: res.country()
         """
-        country = self.env['res.country'].search(['|', ('code', '=ilike', country_name_or_code),
-                                                  ('name', '=ilike', country_name_or_code)], limit=1)
-        return country
+        return self.env['res.country'].search_country_ept(country_name_or_code)
 
     def create_or_update_state_ept(self, country_code, state_name_or_code, zip_code, country_obj=False):
         """ This method is used to search state-based country, state code or zip code.
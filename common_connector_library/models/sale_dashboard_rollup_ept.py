@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+import logging
+from datetime import timedelta
+from odoo import models, fields
+
+_logger = logging.getLogger(__name__)
+
+ROLLUP_COLUMNS = ['order_count', 'amount_untaxed', 'shipped_order_count', 'refund_count']
+# Number of days before today recomputed at each update, so changes which are not seen through the write date, like
+# deletions committed while the last update was running, are reconciled.
+ROLLUP_RECONCILE_DAYS = 2
+
+
+class SaleDashboardRollupEpt(models.Model):
+    _name = "sale.dashboard.rollup.ept"
+    _description = "Sale Dashboard Daily Rollup"
+    _order = "rollup_date desc"
+
+    rollup_date = fields.Date(required=True, index=True)
+    order_count = fields.Integer(help="Number of confirmed sale orders of the day.")
+    amount_untaxed = fields.Float(help="Untaxed amount of confirmed sale orders of the day.")
+    shipped_order_count = fields.Integer(help="Number of shipped sale orders of the day.")
+    refund_count = fields.Integer(help="Number of refunds of the day.")
+    is_dirty = fields.Boolean(help="Day is recomputed at the next update, like when a record of the day is deleted.")
+
+    def update_dashboard_rollup(self, instance_field, rollup_queries, dirty_day_query, website_field=False):
+        """ Use to keep the rollup up to date incrementally. It recomputes only those days which have orders,
+            pickings or refunds written since the last run, the days marked by the deleted records and the last
+            days. The first run rebuilds the whole rollup.
+            @param instance_field: Name of the instance field of the connector, like magento_instance_id.
+            @param rollup_queries: List of tuples (date column, query), see rebuild_dashboard_rollup.
+            @param dirty_day_query: Query which returns the days changed since %(last_sync)s.
+            @param website_field: Name of the website field of the connector if the dashboard is website wise.
+        """
+        config_parameter = self.env['ir.config_parameter'].sudo()
+        param_name = "common_connector_library.%s_rollup_sync" % instance_field
+        last_sync = config_parameter.get_param(param_name)
+        sync_time = fields.Datetime.now()
+        if not last_sync:
+            self.rebuild_dashboard_rollup(instance_field, rollup_queries, website_field=website_field)
+        else:
+            # Transactions which were running during the last sync are committed with an older write date,
+            # so take a margin to recompute them as well.
+            last_sync = fields.Datetime.from_string(last_sync) - timedelta(minutes=10)
+            self._cr.execute(dirty_day_query, {'last_sync': last_sync})
+            days = [row[0] for row in self._cr.fetchall() if row[0]]
+            self._cr.execute("SELECT DISTINCT rollup_date FROM %s WHERE %s IS NOT NULL AND is_dirty = True" % (
+                self._table, instance_field))
+            days += [row[0] for row in self._cr.fetchall()]
+            today = fields.Date.today()
+            days += [today - timedelta(days=day) for day in range(ROLLUP_RECONCILE_DAYS + 1)]
+            self.rebuild_dashboard_rollup(instance_field, rollup_queries, days, website_field)
+        config_parameter.set_param(param_name, fields.Datetime.to_string(sync_time))
+        return True
+
+    def mark_dashboard_rollup_days_ept(self, instance_field, days):
+        """ Use to recompute the days at the next update of the rollup. Deleted records do not change the write
+            date of any record, so the days of the deleted orders, pickings and refunds are marked.
+            @param instance_field: Name of the instance field of the connector, like magento_instance_id.
+            @param days: List of dates.
+        """
+        days = list({day for day in days if day})
+        if days:
+            self._cr.execute("UPDATE %s SET is_dirty = True WHERE %s IS NOT NULL AND rollup_date = ANY(%%s)" % (
+                self._table, instance_field), (days,))
+            self.invalidate_cache(['is_dirty'])
+        return True
+
+    def rebuild_dashboard_rollup(self, instance_field, rollup_queries, days=None, website_field=False):
+        """ Use to recompute the rollup rows of the given days, all days are recomputed when days are not passed.
+            @param instance_field: Name of the instance field of the connector, like magento_instance_id.
+            @param rollup_queries: List of tuples (date column, query). Query must select instance_id,
+            website_id (if website wise), rollup_date and rollup columns, and contain a {day_clause} placeholder
+            which is replaced by the day filter on the date column.
+            @param days: List of dates to recompute.
+            @param website_field: Name of the website field of the connector if the dashboard is website wise.
+            @return: Records of rollup.
+        """
+        rollup_data = {}
+        params = {}
+        if days is not None:
+            days = sorted(set(days))
+            params = {'days': days, 'date_from': days[0], 'date_to': days[-1] + timedelta(days=1)}
+        for date_column, query in rollup_queries:
+            day_clause = ""
+            if days is not None:
+                day_clause = "AND {col} >= %(date_from)s AND {col} < %(date_to)s AND date({col}) = ANY(%(days)s)" \
+                    .format(col=date_column)
+            self._cr.execute(query.format(day_clause=day_clause), params)
+            for row in self._cr.dictfetchall():
+                key = (row.pop('instance_id'), row.pop('website_id', False) or False, row.pop('rollup_date'))
+                rollup_data.setdefault(key, {}).update(row)
+
+        delete_query = "DELETE FROM %s WHERE %s IS NOT NULL" % (self._table, instance_field)
+        if days is not None:
+            delete_query += " AND rollup_date = ANY(%(days)s)"
+        self._cr.execute(delete_query, params)
+        self.invalidate_cache()
+
+        vals_list = []
+        for (instance_id, website_id, rollup_date), values in rollup_data.items():
+            vals = {column: values.get(column) or 0 for column in ROLLUP_COLUMNS}
+            vals.update({'rollup_date': rollup_date, instance_field: instance_id})
+            if website_field:
+                vals.update({website_field: website_id})
+            vals_list.append(vals)
+        _logger.info("Dashboard rollup of %s recomputed for %s days with %s rows.", instance_field,
+                     len(days) if days is not None else 'all', len(vals_list))
+        return self.create(vals_list)
+
+    def get_dashboard_rollup_data(self, sort, **key_values):
+        """ Use to prepare the dashboard data from the rollup, like graph values, total sales, comparison with the
+            previous period and order, shipped order and refund counts of the selected period.
+            @param sort: Period of the dashboard, week, month, year or all.
+            @param key_values: Instance/website fields with its value, like magento_instance_id=1.
+            @return: Dictionary of dashboard data.
+        """
+        period_start, period_end, previous_start, previous_end = self._get_dashboard_periods(sort)
+        daily_data = self._get_rollup_daily_data(previous_start, **key_values)
+        current_data = {day: data for day, data in daily_data.items() if not period_start or day >= period_start}
+        graph_data = {day: data for day, data in current_data.items() if not period_end or day <= period_end}
+        values = self._prepare_rollup_graph_values(sort, graph_data, period_start, period_end)
+
+        current_total = sum(data['amount_untaxed'] for data in current_data.values()) if period_start else 0.0
+        previous_total = sum(data['amount_untaxed'] for day, data in daily_data.items()
+                             if previous_start and previous_start <= day <= previous_end)
+        data_type, total_percentage = False, 0.0
+        if current_total > 0.0:
+            if current_total >= previous_total:
+                data_type = 'positive'
+                total_percentage = (current_total - previous_total) * 100 / current_total
+            if previous_total > current_total:
+                data_type = 'negative'
+                total_percentage = (previous_total - current_total) * 100 / current_total
+
+        dashboard_data = {
+            'values': values,
+            'total_sales': round(sum([key['y'] for key in values]), 2),
+            'graph_sale_percentage': {'type': data_type, 'value': round(total_percentage, 2)},
+        }
+        for column in ['order_count', 'shipped_order_count', 'refund_count']:
+            dashboard_data.update({column: sum(data[column] for data in current_data.values())})
+        return dashboard_data
+
+    def get_dashboard_period_start(self, sort):
+        """ Use to get the first day of the selected dashboard period, used in the domain of dashboard actions.
+            @param sort: Period of the dashboard, week, month, year or all.
+            @return: Start date of the period or False for all time.
+        """
+        return self._get_dashboard_periods(sort)[0]
+
+    @staticmethod
+    def _get_dashboard_periods(sort):
+        """ Use to get the current and the previous period of the dashboard. Previous period ends on the same day
+            of the period as today to compare the sales.
+            @return: Tuple of period start, period end, previous period start and previous period end.
+        """
+        today = fields.Date.today()
+        if sort == 'week':
+            period_start = today - timedelta(days=today.weekday())
+            period_end = period_start + timedelta(days=6)
+            previous_start = period_start - timedelta(days=7)
+            previous_end = previous_start + timedelta(days=today.weekday())
+        elif sort == 'month':
+            period_start = today.replace(day=1)
+            period_end = (period_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            previous_start = (period_start - timedelta(days=1)).replace(day=1)
+            previous_end = previous_start + timedelta(days=today.day - 1)
+        elif sort == 'year':
+            period_start = today.replace(month=1, day=1)
+            period_end = today.replace(month=12, day=31)
+            previous_start = period_start.replace(year=period_start.year - 1)
+            previous_end = previous_start + timedelta(days=(today - period_start).days - 1)
+        else:
+            period_start = period_end = previous_start = previous_end = False
+        return period_start, period_end, previous_start, previous_end
+
+    def _get_rollup_daily_data(self, date_from=False, **key_values):
+        """ Use to read the rollup summed by day for the given instance/website.
+            @param date_from: Read days from this date, all days if not passed.
+            @return: Dictionary like {date: {'order_count': 2, 'amount_untaxed': 20.0, ...}}
+        """
+        where_clause = " AND ".join("%s = %%(%s)s" % (field, field) for field in key_values)
+        params = dict(key_values)
+        if date_from:
+            where_clause += " AND rollup_date >= %(date_from)s"
+            params.update({'date_from': date_from})
+        query = """SELECT rollup_date, %s FROM %s WHERE %s GROUP BY rollup_date""" % (
+            ", ".join("sum(%s) AS %s" % (column, column) for column in ROLLUP_COLUMNS), self._table,
+            where_clause)
+        self._cr.execute(query, params)
+        return {row.pop('rollup_date'): row for row in self._cr.dictfetchall()}
+
+    @staticmethod
+    def _prepare_rollup_graph_values(sort, daily_data, period_start, period_end):
+        """ Use to prepare the graph points of the dashboard, days of the week or month, months of the year or
+            months having orders for all time.
+            @return: List of points like [{'x': 'MONDAY', 'y': 10.0}]
+        """
+        points = {}
+        if sort in ('week', 'month'):
+            day = period_start
+            while day <= period_end:
+                label = day.strftime('%A').upper().ljust(9) if sort == 'week' else str(day.day)
+                points[label] = 0.0
+                day += timedelta(days=1)
+        elif sort == 'year':
+            for month in range(1, 13):
+                points[period_start.replace(month=month).strftime('%B').upper()] = 0.0
+        for day, data in sorted(daily_data.items()):
+            if sort == 'week':
+                label = day.strftime('%A').upper().ljust(9)
+            elif sort == 'month':
+                label = str(day.day)
+            elif sort == 'year':
+                label = day.strftime('%B').upper()
+            else:
+                label = day.strftime('%Y-%m')
+            points[label] = points.get(label, 0.0) + (data['amount_untaxed'] or 0.0)
+        return [{"x": label, "y": amount} for label, amount in points.items()]
@@ -4,6 +4,8 @@ import logging
 from odoo import models
 
 logger = logging.getLogger(__name__)
+# Number of quants of which the inventory is applied together.
+INVENTORY_APPLY_CHUNK_SIZE = 1000
 
 
 class StockQuant(models.Model):
@@ -23,19 +25,35 @@ class StockQuant(models.Model):
         """
         quant_list = self.env['stock.quant']
         if product_qty_data and location_id:
-            for product_id, product_qty in product_qty_data.items():
-                val = self.prepare_vals_for_inventory_adjustment(location_id, product_id, product_qty)
-                product = self.env['product.product'].browse(product_id)
-                if product.detailed_type in ['consu','service']:
-                    continue
-                logger.info("Product ID: %s and its Qty: %s" % (product_id, product_qty))
-                quant_list += self.with_context(inventory_mode=True).create(val)
+            # Types of the products are read at once, services and consumables have no quant.
+            products = self.env['product.product'].browse(list(product_qty_data.keys())).filtered(
+                lambda x: x.detailed_type not in ['consu', 'service'])
+            vals_list = []
+            for product in products:
+                vals_list.append(self.prepare_vals_for_inventory_adjustment(location_id, product.id,
+                                                                            product_qty_data.get(product.id)))
+            logger.info("Inventory adjustment of %s products in location %s.", len(vals_list), location_id.name)
+            quant_list = self.with_context(inventory_mode=True).create(vals_list)
             if auto_apply and quant_list:
-                quant_list.filtered(lambda x: x.product_id.tracking not in ['lot', 'serial'] and
-                                              x.product_id.detailed_type not in ['consu','service']).with_context(
-                    inventory_name=name).action_apply_inventory()
+                quants = quant_list.filtered(lambda x: x.product_id.tracking not in ['lot', 'serial'])
+                self.apply_inventory_in_chunks_ept(quants, name)
         return quant_list
 
+    def apply_inventory_in_chunks_ept(self, quants, name=""):
+        """ Use to apply the inventory of the quants in chunks of INVENTORY_APPLY_CHUNK_SIZE quants, so the changes
+            of each chunk are flushed and removed from the cache before the next chunk and the progress is logged.
+            @param quants: Records of quant.
+            @param name: set name in inventory adjustment name
+            @return: True
+        """
+        for index in range(0, len(quants), INVENTORY_APPLY_CHUNK_SIZE):
+            quants[index:index + INVENTORY_APPLY_CHUNK_SIZE].with_context(inventory_name=name).action_apply_inventory()
+            self.flush()
+            self.invalidate_cache()
+            logger.info("Inventory adjustment %s: %s of %s quants applied.", name,
+                        min(index + INVENTORY_APPLY_CHUNK_SIZE, len(quants)), len(quants))
+        return True
+
     def prepare_vals_for_inventory_adjustment(self, location_id, product_id, product_qty):
         """ This method is use to prepare a vals for the inventory adjustment.
             @param location_id: Browsable record of location.
@@ -46,6 +46,7 @@
         'views/customer_queue_line_ept.xml',
         'views/export_stock_queue.xml',
         'views/export_stock_queue_line.xml',
+        'views/magento_async_bulk_ept.xml',
         'data/magento_data_cron.xml',
         'data/ir_cron_data.xml',
         'data/ir_attachment_data.xml',
@@ -48,3 +48,6 @@ from . import magento_order_status
 from . import digest
 from . import export_stock_queue
 from . import export_stock_queue_line
+from . import sale_dashboard_rollup_ept
+from . import magento_async_bulk_ept
+from . import magento_product_price_ept
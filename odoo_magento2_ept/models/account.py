@@ -12,20 +12,5 @@ class AccountTaxCode(models.Model):
         @return : Tax_ids
         @author: Haresh Mori on dated 10-Dec-2018
         """
-        for precision in [0.001, 0.01]:
-            if country:
-                tax_ids = self.with_context(active_test=False).search(
-                    [('price_include', '=', is_tax_included),
-                     ('type_tax_use', 'in', ['sale']),
-                     ('amount', '>=', rate - precision),
-                     ('amount', '<=', rate + precision),
-                     ('country_id', '=', country.id)], limit=1)
-                return tax_ids
-            else:
-                tax_ids = self.with_context(active_test=False).search(
-                    [('price_include', '=', is_tax_included),
-                     ('type_tax_use', 'in', ['sale']),
-                     ('amount', '>=', rate - precision),
-                     ('amount', '<=', rate + precision)], limit=1)
-                return tax_ids
-        return self
+        return self.with_context(active_test=False).find_sale_tax_ept(rate, is_tax_included, country=country,
+                                                                      precision=0.001)
@@ -6,7 +6,7 @@ Describes methods for account move
 import logging
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-from .api_request import req, create_search_criteria
+from .api_request import req_concurrent, create_search_criteria
 
 _logger = logging.getLogger("MagentoAccountMove")
 ACCOUNT_MOVE = 'account.move'
@@ -31,6 +31,14 @@ class AccountInvoice(models.Model):
     max_no_of_attempts = fields.Integer(string='Max NO. of attempts', default=0)
     magento_message = fields.Char(string="Invoice Message")
 
+    def unlink(self):
+        """
+        Mark the days of the deleted Magento refunds to recompute them in the dashboard rollup.
+        """
+        days = [move.date for move in self if move.move_type == 'out_refund' and move.magento_instance_id]
+        self.env['sale.dashboard.rollup.ept'].mark_dashboard_rollup_days_ept('magento_instance_id', days)
+        return super(AccountInvoice, self).unlink()
+
     def export_invoices_to_magento(self, instance):
         invoices = self.search([
             ('move_type', '=', 'out_invoice'),
@@ -40,13 +48,11 @@ class AccountInvoice(models.Model):
             ('state', 'in', ['posted']),
             ('max_no_of_attempts', '<=', 3)
         ])
-        for invoice in invoices:
-            invoice.export_invoice_magento(wizard=False)
+        invoices.export_invoice_magento(wizard=False)
         return True
 
     def export_invoice_magento(self, wizard=True):
-        instance = self.magento_instance_id
-        log_book_id = False
+        invoices = self.browse()
         for invoice in self:
             create_invoice_on = invoice.magento_payment_method_id.create_invoice_on or ''
             # m_state is used for identify that what kind of invoices we are export to Magento.
@@ -55,7 +61,7 @@ class AccountInvoice(models.Model):
                 and invoice.payment_state in ['in_payment', 'paid']) \
                     or (create_invoice_on == 'open'
                         and invoice.payment_state not in ['in_payment', 'paid']):
-                log_book_id = invoice.call_export_invoice_api(instance, log_book_id)
+                invoices |= invoice
             else:
                 if wizard:
                     # Raise the UserError while the respected Payment method
@@ -70,52 +76,63 @@ class AccountInvoice(models.Model):
                         Please check the Configuration and try it again!!
                     """
                     raise UserError(message)
+        for instance in invoices.mapped('magento_instance_id'):
+            invoices.filtered(lambda x: x.magento_instance_id == instance).call_export_invoice_api(instance)
         return True
 
-    def call_export_invoice_api(self, instance, log_book_id):
+    def call_export_invoice_api(self, instance, log_book_id=False):
         """
-        Export All invoices in Magento through API
+        Export All invoices in Magento through API. Invoices are sent concurrently with the
+        worker pool of the instance and the results are written together.
         """
-        sale_orders = self.invoice_line_ids.mapped('sale_line_ids').mapped('order_id')
-        sale_order = sale_orders and sale_orders[0]
-        data = self._prepare_export_invoice_data()
-        m_inv_id = 0
-        try:
+        requests_data = dict()
+        sale_orders = dict()
+        for invoice in self:
+            sale_order = invoice.invoice_line_ids.mapped('sale_line_ids').mapped('order_id')[:1]
+            sale_orders[invoice.id] = sale_order
             api_url = f"/V1/order/{sale_order.magento_order_id}/invoice"
-            m_inv_id = req(self.magento_instance_id, api_url, 'POST', data)
-        except Exception as error:
-            if self.max_no_of_attempts == 2:
+            requests_data[invoice.id] = (api_url, 'POST', invoice._prepare_export_invoice_data())
+        results = instance.export_documents(requests_data)
+        magento_ids = {invoice_id: int(response) for invoice_id, (response, error) in results.items()
+                       if not error and str(response).isdigit()}
+        failed_invoices = self.browse([invoice_id for invoice_id, (response, error) in results.items()
+                                       if error or (response and invoice_id not in magento_ids)])
+        instance.write_exported_documents(self.browse(list(magento_ids)), magento_ids, 'magento_invoice_id')
+        if not failed_invoices:
+            return log_book_id
+        if not log_book_id:
+            log_book_id = failed_invoices[0].create_common_logbook(instance)
+        log_lines = []
+        for invoice in failed_invoices:
+            sale_order = sale_orders.get(invoice.id)
+            if invoice.max_no_of_attempts == 2:
                 note = f"""
-                Attention {self.name} Export Invoice is processed 3 times and it failed.\n
+                Attention {invoice.name} Export Invoice is processed 3 times and it failed.\n
                 You need to export it manually.
                 """
                 self.env['magento.instance'].create_activity(model_name=self._name,
-                                                             res_id=self.id,
+                                                             res_id=invoice.id,
                                                              message=note,
-                                                             summary=self.name,
+                                                             summary=invoice.name,
                                                              instance=instance)
-            _logger.error(error)
-            if not log_book_id:
-                log_book_id = self.create_common_logbook(instance)
-            self.write({
-                "max_no_of_attempts": self.max_no_of_attempts + 1,
-                "magento_message": _("The request could not be satisfied while export this invoice."
-                                     "\nPlease check Process log {}".format(log_book_id.name))
-            })
             message = _(f"""
                 The request could not be satisfied and an invoice couldn't be created in Magento 
-                for Sale Order : {sale_order.name} & Invoice : {self.name} due to any of the 
+                for Sale Order : {sale_order.name} & Invoice : {invoice.name} due to any of the 
                 following reasons.\n 
                 1. An invoice can't be created when an order has a status of 
                 'On Hold/Canceled/Closed'\n
                 2. An invoice can't be created without products. Add products and try again. 
                 The order does not allow an invoice to be created
             """)
-            log_book_id.write({
-                'log_lines': [(0, 0, {'message': message, 'order_ref': sale_order.name})]
+            log_lines.append((0, 0, {'message': message, 'order_ref': sale_order.name}))
+        magento_message = _("The request could not be satisfied while export this invoice."
+                            "\nPlease check Process log {}".format(log_book_id.name))
+        for attempts in set(failed_invoices.mapped('max_no_of_attempts')):
+            failed_invoices.filtered(lambda x: x.max_no_of_attempts == attempts).write({
+                "max_no_of_attempts": attempts + 1,
+                "magento_message": magento_message
             })
-        if m_inv_id:
-            self.write({'magento_invoice_id': int(m_inv_id), 'is_exported_to_magento': True})
+        log_book_id.write({'log_lines': log_lines})
         return log_book_id
 
     def _prepare_export_invoice_data(self):
@@ -307,56 +324,94 @@ class AccountInvoice(models.Model):
 
     def action_create_credit_memo(self, refund_type, return_stock):
         """
-        This method is responsible for creation of the CreditMemo
+        This method is responsible for creation of the CreditMemo. Credit memos of an instance
+        are sent concurrently with the worker pool of the instance.
         :task_id : 173739
         -------------------
         :param refund_type: possible values (online/offline)
         :param return_stock: bool
         :return: bool(True/False)
         """
-        instance = self.magento_instance_id
-        parent_id = self.reversed_entry_id
-        if instance and not self.is_exported_to_magento and parent_id:
-            order = parent_id.invoice_line_ids.mapped('sale_line_ids.order_id')
-            if order:
-                values = self._get_payload_values(refund_type, return_stock, order)
-                # Offline Refund API Endpoint
-                request_path = '/V1/order/{}/refund'.format(order.magento_order_id)
-                if refund_type == 'online':
-                    invoice_id = self._get_magento_invoice_id(order.magento_order_id, instance)
-                    if not invoice_id:
-                        message = _(f"""
+        for instance in self.mapped('magento_instance_id'):
+            credit_notes = self.filtered(lambda x: x.magento_instance_id == instance
+                                         and not x.is_exported_to_magento and x.reversed_entry_id)
+            orders = dict()
+            for credit_note in credit_notes:
+                order = credit_note.reversed_entry_id.invoice_line_ids.mapped('sale_line_ids.order_id')
+                if order:
+                    orders[credit_note.id] = order
+            errors = dict()
+            # Offline Refund API Endpoint
+            request_paths = {credit_note_id: '/V1/order/{}/refund'.format(order.magento_order_id)
+                             for credit_note_id, order in orders.items()}
+            if refund_type == 'online':
+                invoice_ids = self._get_magento_invoice_ids(instance, orders)
+                for credit_note_id, order in orders.items():
+                    if not invoice_ids.get(credit_note_id):
+                        errors[credit_note_id] = _(f"""
                             For Order #{order.client_order_ref} Invoice are not created at Magento.
                             Refund are only possible if invoice is already created at Magento. 
                         """)
-                        raise UserError(_(message))
+                        continue
                     # Online Refund API Endpoint
-                    request_path = '/V1/invoice/{}/refund'.format(invoice_id)
-                result = req(instance, request_path, 'POST', data=values)
-                if result:
-                    self.write({'is_exported_to_magento': True})
-                else:
-                    raise UserError(_('Could not create credit memo at Magento!!'))
+                    request_paths[credit_note_id] = '/V1/invoice/{}/refund'.format(invoice_ids.get(credit_note_id))
+            requests_data = {
+                credit_note_id: (path, 'POST', self.browse(credit_note_id)._get_payload_values(
+                    refund_type, return_stock, orders.get(credit_note_id)))
+                for credit_note_id, path in request_paths.items() if credit_note_id not in errors}
+            results = instance.export_documents(requests_data)
+            exported_ids = [credit_note_id for credit_note_id, (result, error) in results.items() if result]
+            errors.update({credit_note_id: str(error) if error else _('Could not create credit memo at Magento!!')
+                           for credit_note_id, (result, error) in results.items() if not result})
+            instance.write_exported_documents(self.browse(exported_ids))
+            if errors:
+                self.browse(list(errors))._log_credit_memo_errors(instance, errors, raise_error=not exported_ids)
         return True
 
+    def _log_credit_memo_errors(self, instance, errors, raise_error=False):
+        """
+        Raise the errors of the credit memos if none of them is created at Magento, otherwise add
+        them in the log book to keep the created credit memos.
+        :param instance: Magento instance
+        :param errors: dictionary like {credit note ID: error message}
+        :param raise_error: True if none of the credit memos is created at Magento
+        :return: log book record
+        """
+        if raise_error:
+            raise UserError("\n".join(errors.values()))
+        model_id = self.env['common.log.lines.ept'].get_model_id(ACCOUNT_MOVE)
+        log = self.env['common.log.book.ept'].create_common_log_book('export', 'magento_instance_id', instance,
+                                                                     model_id, 'magento_ept')
+        log.write({
+            'log_lines': [(0, 0, {
+                'message': "Credit Memo : {}\n{}".format(credit_note.name, errors.get(credit_note.id)),
+                'order_ref': credit_note.invoice_origin
+            }) for credit_note in self]
+        })
+        return log
+
     @staticmethod
-    def _get_magento_invoice_id(magento_id, instance):
+    def _get_magento_invoice_ids(instance, orders):
         """
-        This method help to build the url path for the ONLINE REFUND
+        This method help to build the url path for the ONLINE REFUND. Invoices of the orders are
+        searched concurrently with the worker pool of the instance.
         :task_id : 173739
         -------------------
-        :param magento_id: magento oder id
         :param instance: Magento instance
-        :return: Magento Invoice Id
+        :param orders: dictionary like {credit note ID: sale order}
+        :return: dictionary like {credit note ID: Magento Invoice Id}
         """
-        filters = create_search_criteria({'order_id': magento_id})
-        path = f"/V1/invoices?{filters}"
-        result = req(instance, path, 'GET')
-        invoice_id = False
-        if result and result.get('items'):
-            # FIXME: Need to handle the case when one order has multiple invoices at Magento
-            invoice_id = result.get('items')[0].get('entity_id')
-        return invoice_id
+        requests_data = dict()
+        for credit_note_id, order in orders.items():
+            filters = create_search_criteria({'order_id': order.magento_order_id})
+            requests_data[credit_note_id] = (f"/V1/invoices?{filters}", 'GET', None)
+        results = req_concurrent(instance, requests_data, instance.export_document_workers)
+        invoice_ids = dict()
+        for credit_note_id, (result, error) in results.items():
+            if not error and isinstance(result, dict) and result.get('items'):
+                # FIXME: Need to handle the case when one order has multiple invoices at Magento
+                invoice_ids[credit_note_id] = result.get('items')[0].get('entity_id')
+        return invoice_ids
 
     @api.model
     def _refund_cleanup_lines(self, lines):
@@ -6,11 +6,27 @@ Requrests API to magento.
 import json
 import logging
 import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
 import requests
 from odoo import _
 from odoo.exceptions import UserError
+from odoo.addons.common_connector_library.models.api_metric_ept import record_api_call_ept
+from odoo.addons.common_connector_library.models.api_cassette_ept import send_api_request_ept
+from odoo.addons.common_connector_library.models.api_rate_limit_ept import send_rate_limited_request_ept
 
 _logger = logging.getLogger("Magento EPT")
+# Fields of the search result items used by each use case, see get_search_fields. Entities are fetched with the
+# fields used by the use case only, heavy parts like the media gallery are fetched when they are needed.
+SEARCH_ITEM_FIELDS = {
+    'order_queue': ['entity_id', 'increment_id', 'updated_at'],
+    'product': ['id', 'sku', 'name', 'attribute_set_id', 'price', 'status', 'visibility', 'type_id', 'created_at',
+                'updated_at', 'weight', 'extension_attributes', 'custom_attributes'],
+    'product_images': ['media_gallery_entries'],
+    'customer': ['id', 'email', 'firstname', 'lastname', 'store_id', 'website_id', 'taxvat', 'created_at',
+                 'updated_at', 'default_billing', 'default_shipping', 'addresses'],
+}
 
 
 def req(instance, path, method='GET', data=None, params=None, is_raise=False):
@@ -21,39 +37,108 @@ def req(instance, path, method='GET', data=None, params=None, is_raise=False):
     verify_ssl = instance.magento_verify_ssl
     api_url = '{}{}'.format(location_url, path)
     headers = get_headers(instance.access_token)
+    cassette = get_api_cassette(instance)
+    limiter = get_api_rate_limiter(instance, cassette)
     method = method.lower()
     if hasattr(requests, method):
+        start = time.time()
         try:
             if verify_ssl:
                 if data:
                     # We only pass the data variable as an argument for the GET request.
                     # If we all the data = '' as blank then also it gives an error from Magento end.
                     data = json.dumps(data)
-                    response = getattr(requests, method)(url=api_url, headers=headers,
-                                                         data=data, verify=True, params=params)
+                    response = send_rate_limited_request_ept(limiter, send_api_request_ept, cassette, method,
+                                                             url=api_url, headers=headers, data=data, verify=True,
+                                                             params=params, http_method=method)
                 else:
-                    response = getattr(requests, method)(url=api_url, headers=headers,
-                                                         verify=True, params=params)
+                    response = send_rate_limited_request_ept(limiter, send_api_request_ept, cassette, method,
+                                                             url=api_url, headers=headers, verify=True,
+                                                             params=params, http_method=method)
             else:
                 if data:
                     # We only pass the data variable as an argument for the GET request.
                     # If we all the data = '' as blank then also it gives an error from Magento end.
                     data = json.dumps(data)
-                    response = getattr(requests, method)(url=api_url, headers=headers,
-                                                         data=data, params=params)
+                    response = send_rate_limited_request_ept(limiter, send_api_request_ept, cassette, method,
+                                                             url=api_url, headers=headers, data=data,
+                                                             params=params, http_method=method)
                 else:
-                    response = getattr(requests, method)(url=api_url, headers=headers,
-                                                         params=params)
+                    response = send_rate_limited_request_ept(limiter, send_api_request_ept, cassette, method,
+                                                             url=api_url, headers=headers, params=params,
+                                                             http_method=method)
             _logger.info(api_url)
         except (socket.gaierror, socket.error, socket.timeout) as error:
+            record_api_call_ept('magento', instance.magento_url, path, method, error=error,
+                                duration=time.time() - start, bytes_out=len(data or ''))
             raise UserError(_('A network error caused the failure of the job: %s', error))
         except Exception as error:
+            record_api_call_ept('magento', instance.magento_url, path, method, error=error,
+                                duration=time.time() - start, bytes_out=len(data or ''))
             message = get_common_error_message(str(error))
             raise UserError(_(message))
+        record_api_call_ept('magento', instance.magento_url, path, method, status_code=response.status_code,
+                            duration=time.time() - start, bytes_in=len(response.content or b''),
+                            bytes_out=len(data or ''))
         return handle_response(response, is_raise)
     return dict()
 
 
+def req_concurrent(instance, requests_data, max_workers=1):
+    """
+    Send the API requests to Magento concurrently with a bounded pool of workers. Workers only send the HTTP
+    requests, the ORM must not be used in them, so requests are prepared and responses are processed by the caller.
+    :param instance: Magento instance
+    :param requests_data: dictionary like {key: (path, method, data)}
+    :param max_workers: maximum number of requests sent at the same time
+    :return: dictionary like {key: (response, error)}
+    """
+    if not requests_data:
+        return dict()
+    cassette = get_api_cassette(instance)
+    connection = SimpleNamespace(magento_url=instance.magento_url, magento_verify_ssl=instance.magento_verify_ssl,
+                                 access_token=instance.access_token, api_cassette=cassette,
+                                 api_rate_limiter=get_api_rate_limiter(instance, cassette))
+    results = dict()
+    max_workers = max(1, min(max_workers or 1, len(requests_data)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(req, connection, path, method, data): key
+                   for key, (path, method, data) in requests_data.items()}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = (future.result(), False)
+            except Exception as error:
+                _logger.error(error)
+                results[futures[future]] = (False, error)
+    return results
+
+
+def get_api_cassette(instance):
+    """
+    Get the cassette which records or replays the API requests of the instance.
+    :param instance: Magento instance, or the connection prepared by req_concurrent
+    :return: cassette, None if the requests are sent live
+    """
+    if isinstance(instance, SimpleNamespace):
+        return getattr(instance, 'api_cassette', None)
+    return instance.get_api_cassette_ept()
+
+
+def get_api_rate_limiter(instance, cassette=None):
+    """
+    Get the rate limiter shared by all workers sending API requests to the store of the instance. Replayed
+    requests are not sent to the store, so they are not limited.
+    :param instance: Magento instance, or the connection prepared by req_concurrent
+    :param cassette: cassette of the instance
+    :return: rate limiter, None if the requests are not limited
+    """
+    if cassette and cassette.mode == 'replay':
+        return None
+    if isinstance(instance, SimpleNamespace):
+        return getattr(instance, 'api_rate_limiter', None)
+    return instance.get_api_rate_limiter_ept()
+
+
 def check_location_url(location_url):
     """
     Set Magento rest API URL
@@ -132,6 +217,16 @@ def get_common_error_message(error=''):
     """.format(error)
 
 
+def get_search_fields(*use_cases):
+    """
+    Get the fields of the search request needed by the use cases.
+    :param use_cases: keys of SEARCH_ITEM_FIELDS, like 'product' and 'product_images'
+    :return: list of fields for create_search_criteria, like ['items[id,sku]', 'total_count']
+    """
+    item_fields = [field for use_case in use_cases for field in SEARCH_ITEM_FIELDS.get(use_case)]
+    return ['items[{}]'.format(','.join(item_fields)), 'total_count']
+
+
 def create_filter(field, value, condition_type='eq'):
     """
     Create dictionary for filter.
@@ -6,7 +6,7 @@ Describes methods for Magento import customer data queue.
 import math
 from datetime import datetime
 from odoo import models, fields, api
-from .api_request import req, create_search_criteria
+from .api_request import req, create_search_criteria, get_search_fields
 from ..python_library.php import Php
 
 MAGENTO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
@@ -17,7 +17,7 @@ class MagentoCustomerQueueEpt(models.Model):
     Describes Magento Customer Data Queue
     """
     _name = "magento.customer.data.queue.ept"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'queue.lease.mixin.ept']
     _description = "Magento Customer Data Queue EPT"
 
     name = fields.Char(help="Sequential name of imported customer.", copy=False)
@@ -136,9 +136,8 @@ class MagentoCustomerQueueEpt(models.Model):
             req_path = f'/V1/customers/search?{query_string}'
             customers = req(instance=instance, path=req_path, is_raise=True)
             page = math.ceil(customers.get('total_count', 1) / page_size)
-            kwargs.pop('fields')
             for page in range(1, page + 1):
-                kwargs.update({'page': page, 'page_size': page_size})
+                kwargs.update({'page': page, 'page_size': page_size, 'fields': get_search_fields('customer')})
                 filters = self._prepare_customer_filter(**kwargs)
                 query_string = Php.http_build_query(filters)
                 req_path = f'/V1/customers/search?{query_string}'
@@ -186,6 +185,9 @@ class MagentoCustomerQueueEpt(models.Model):
 
     def process_customer_queues(self, is_manual=False):
         for queue in self.filtered(lambda q: q.state not in ['completed', 'failed']):
+            # Skip the queue if another worker is processing it.
+            if not queue.claim_queue_lease_ept():
+                continue
             # To maintain that current queue has started to process.
             queue.write({'is_process_queue': True})
             self._cr.commit()
@@ -196,13 +198,20 @@ class MagentoCustomerQueueEpt(models.Model):
                        f"You need to process it manually"
                 queue.instance_id.create_schedule_activity(queue=queue, note=note)
                 queue.write({'is_process_queue': False})
-            for line in lines:
-                line.process_queue_line()
-                line.write({'state': 'done'})
+            with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(
+                    timestamp_field='processed_at', lease_records=queue) as batch:
+                for line in lines:
+                    _, error = batch.process_line(line.process_queue_line)
+                    if error:
+                        batch.add_log_line({'message': f"Customer {line.magento_id} could not be processed. {error}",
+                                            'magento_customer_data_queue_line_id': line.id})
+                    batch.write_line_values(line, {'state': 'failed' if error else 'done'})
+                    batch.commit_if_needed()
             message = "Customer Queue #{} Processed!!".format(queue.name)
             queue.instance_id.show_popup_notification(message)
             # To maintain that current queue process are completed and new queue will be executed.
             queue.write({'is_process_queue': False})
+            queue.release_queue_lease_ept()
             self._cr.commit()
         return True
 
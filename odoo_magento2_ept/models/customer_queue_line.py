@@ -4,6 +4,7 @@
 Describes methods to store Customer Data queue line
 """
 import json
+import time
 from odoo import models, fields
 
 
@@ -14,6 +15,8 @@ class MagentoCustomerQueueLineEpt(models.Model):
     _name = "magento.customer.data.queue.line.ept"
     _description = "Magento Customer Data Queue Line EPT"
     _rec_name = "magento_id"
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_entity_field = "magento_id"
 
     queue_id = fields.Many2one(comodel_name='magento.customer.data.queue.ept', ondelete="cascade")
     instance_id = fields.Many2one(comodel_name='magento.instance',
@@ -32,6 +35,13 @@ class MagentoCustomerQueueLineEpt(models.Model):
     log_lines_ids = fields.One2many("common.log.lines.ept", "magento_customer_data_queue_line_id",
                                     help="Log lines created against which line.")
 
+    def init(self):
+        """
+        Creates the partial index to select the queues having draft lines.
+        """
+        self._cr.execute(f"""CREATE INDEX IF NOT EXISTS {self._table}_draft_queue_id_index
+                             ON {self._table} (queue_id) WHERE state = 'draft'""")
+
     def create_queue_line(self, instance, customer, queue):
         self.create({
             'magento_id': customer.get('id'),
@@ -43,9 +53,12 @@ class MagentoCustomerQueueLineEpt(models.Model):
         return True
 
     def auto_process_customer_queues(self):
-        queues = self.instance_id.get_draft_queues(model='magento_customer_data_queue_line_ept',
-                                                   name=self.queue_id._name)
+        instance = self.env['magento.instance']
+        start = time.time()
+        queues = instance.get_queues_to_process(
+            self._name, 'odoo_magento2_ept.magento_ir_cron_to_process_customer_queue_data')
         queues.process_customer_queues()
+        instance.update_queue_line_seconds(queues, start)
         return True
 
     def process_queue_line(self):
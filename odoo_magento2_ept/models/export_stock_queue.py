@@ -6,7 +6,7 @@ class MagentoExportStockQueueEpt(models.Model):
     Describes Magento Export Stock Queue
     """
     _name = "magento.export.stock.queue.ept"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'queue.lease.mixin.ept']
     _description = "Magento Export Stock Queue"
 
     name = fields.Char(help="Sequential name of Export Stock.", copy=False)
@@ -70,8 +70,9 @@ class MagentoExportStockQueueEpt(models.Model):
 
     def process_export_stock_queues(self, is_manual=False):
         for queue in self.filtered(lambda q: q.state not in ['completed', 'failed']):
-            # To maintain that current queue has started to process.
-            self._cr.commit()
+            # Skip the queue if another worker is processing it.
+            if not queue.claim_queue_lease_ept():
+                continue
             log = queue.log_book_id
             if not log:
                 log = queue.instance_id.create_log_book(model=queue._name)
@@ -98,6 +99,7 @@ class MagentoExportStockQueueEpt(models.Model):
             queue.instance_id.show_popup_notification(message)
             # To maintain that current queue process are completed and new queue will be executed.
             queue.write({'is_process_queue': False})
+            queue.release_queue_lease_ept()
             self._cr.commit()
         return True
 
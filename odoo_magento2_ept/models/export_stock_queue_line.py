@@ -1,5 +1,5 @@
 import json
-from datetime import datetime
+import time
 from odoo import models, fields
 
 
@@ -9,6 +9,7 @@ class MagentoExportStockLineEpt(models.Model):
     """
     _name = "magento.export.stock.queue.line.ept"
     _description = "Magento Export Stock Queue Line"
+    _inherit = "queue.payload.archive.mixin.ept"
 
     queue_id = fields.Many2one(comodel_name='magento.export.stock.queue.ept', ondelete="cascade")
     instance_id = fields.Many2one(comodel_name='magento.instance',
@@ -24,6 +25,13 @@ class MagentoExportStockLineEpt(models.Model):
     log_lines_ids = fields.One2many("common.log.lines.ept", "magento_export_stock_queue_line_id",
                                     help="Log lines created against which line.")
 
+    def init(self):
+        """
+        Creates the partial index to select the queues having draft lines.
+        """
+        self._cr.execute(f"""CREATE INDEX IF NOT EXISTS {self._table}_draft_queue_id_index
+                             ON {self._table} (queue_id) WHERE state = 'draft'""")
+
     def create_export_stock_queue_line(self, instance, data, queue):
         """
         :param instance: Instance object
@@ -43,9 +51,12 @@ class MagentoExportStockLineEpt(models.Model):
         Cron execute time run this method.
         :return: True
         """
-        queues = self.instance_id.get_draft_queues(model='magento_export_stock_queue_line_ept',
-                                                   name=self.queue_id._name)
+        instance = self.env['magento.instance']
+        start = time.time()
+        queues = instance.get_queues_to_process(
+            self._name, 'odoo_magento2_ept.magento_ir_cron_to_process_export_stock_queue_data')
         queues.process_export_stock_queues()
+        instance.update_queue_line_seconds(queues, start)
         return True
 
     def process_export_stock_queue_line(self, api_url, log):
@@ -55,11 +66,20 @@ class MagentoExportStockLineEpt(models.Model):
         :return: True
         """
         magento_product = self.env['magento.product.product']
-        for line in self:
-            is_processed = magento_product.export_magento_stock(line, api_url, log)
-            if is_processed:
-                line.write({'state': 'done', 'processed_at': datetime.now()})
-            else:
-                line.write({'state': 'failed', 'processed_at': datetime.now()})
-            self._cr.commit()
+        observations = []
+        with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(
+                timestamp_field='processed_at', lease_records=self.queue_id) as batch:
+            for line in self:
+                start = time.time()
+                is_processed, error = batch.process_line(magento_product.export_magento_stock, line, api_url, log)
+                item_count = sum(len(values) for values in json.loads(line.data or '{}').values())
+                observations.append((item_count, time.time() - start, not is_processed))
+                if error:
+                    batch.add_log_line({'message': f"Stock could not be exported. {error}", 'log_book_id': log.id,
+                                        'magento_export_stock_queue_line_id': line.id})
+                batch.write_line_values(line, {'state': 'done' if is_processed else 'failed'})
+                batch.commit_if_needed()
+            batch.commit()
+        if self:
+            self.instance_id[:1].update_export_stock_batch_size(observations)
         return True
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Describes asynchronous bulk requests submitted to Magento.
+"""
+import json
+import logging
+from odoo import models, fields
+from .api_request import req
+
+_logger = logging.getLogger("MagentoEPT")
+
+# Number of operations submitted in one bulk request.
+BULK_CHUNK_SIZE = 100
+# Magento bulk operation statuses.
+OPERATION_COMPLETE = 1
+OPERATION_OPEN = 4
+
+
+class MagentoAsyncBulkEpt(models.Model):
+    """
+    Describes a bulk request submitted to the Magento asynchronous bulk API. Operations accepted by Magento are kept
+    with their position in the request, which is the id of the operation in the bulk status, so the status returned by
+    Magento can be mapped back to the layer records.
+    """
+    _name = "magento.async.bulk.ept"
+    _description = "Magento Asynchronous Bulk Request"
+    _order = "id desc"
+
+    name = fields.Char(string="Bulk UUID", readonly=True, help="Bulk UUID returned by Magento.")
+    instance_id = fields.Many2one(comodel_name='magento.instance', string='Magento Instance', ondelete="cascade")
+    api_url = fields.Char(string="API URL", readonly=True)
+    method = fields.Char(readonly=True)
+    state = fields.Selection([('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending',
+                             readonly=True, help="Pending till Magento has processed all operations of the bulk.")
+    operation_count = fields.Integer(readonly=True)
+    failed_count = fields.Integer(readonly=True, help="Number of operations failed in Magento.")
+    operation_data = fields.Text(readonly=True, help="Operations of the bulk accepted by Magento.")
+    export_options = fields.Text(readonly=True, help="Options of the product export, used to process the "
+                                                     "operations which depend on the result of this bulk.")
+    log_book_id = fields.Many2one(comodel_name="common.log.book.ept", string="Log Book")
+
+    @staticmethod
+    def prepare_bulk_api_url(api_url, by_sku=False):
+        """
+        Convert the synchronous API URL to the asynchronous bulk API URL. Route parameter is passed in the body of
+        bulk operations, so the SKU of the URL is replaced by its placeholder, like /V1/products/bySku.
+        :param api_url: API URL, like /default/V1/products/sku
+        :param by_sku: True if the API URL contains the SKU
+        :return: bulk API URL, like /default/async/bulk/V1/products/bySku
+        """
+        if by_sku:
+            prefix, route = api_url.split('/V1/', 1)
+            route = route.split('/')
+            route[1] = 'bySku'
+            api_url = '%s/V1/%s' % (prefix, '/'.join(route))
+        return api_url.replace('/V1/', '/async/bulk/V1/', 1)
+
+    def submit_bulk_operations(self, instance, bulk_operations, log, export_options=False):
+        """
+        Submit the collected operations to the Magento asynchronous bulk API in chunks and keep the returned bulk
+        UUIDs to check the status of the operations later.
+        :param instance: Magento instance
+        :param bulk_operations: dictionary like {(bulk API URL, method): [(payload, operation), ...]}
+        :param log: log book record
+        :param export_options: dictionary of product export options
+        :return: bulk records
+        """
+        bulks = self
+        for (api_url, method), items in bulk_operations.items():
+            for index in range(0, len(items), BULK_CHUNK_SIZE):
+                chunk = items[index:index + BULK_CHUNK_SIZE]
+                payloads = [payload for payload, operation in chunk]
+                operations = [operation for payload, operation in chunk]
+                try:
+                    response = req(instance, api_url, method, payloads, is_raise=True)
+                except Exception as error:
+                    response = {'errors': True, 'message': str(error)}
+                if not isinstance(response, dict) or not response.get('bulk_uuid'):
+                    message = response.get('message') if isinstance(response, dict) else response
+                    self._log_failed_operations(log, operations, "Bulk request is not accepted by Magento. %s"
+                                                % message)
+                    continue
+                rejected_keys = {item.get('id') for item in response.get('request_items', [])
+                                 if item.get('status') == 'rejected'}
+                accepted, rejected = [], []
+                for operation_key, operation in enumerate(operations):
+                    operation.update({'operation_key': operation_key})
+                    (rejected if operation_key in rejected_keys else accepted).append(operation)
+                if rejected:
+                    self._log_failed_operations(log, rejected, "Operation is rejected by Magento.")
+                if not accepted:
+                    continue
+                bulks += self.create({
+                    'name': response.get('bulk_uuid'),
+                    'instance_id': instance.id,
+                    'api_url': api_url,
+                    'method': method,
+                    'operation_count': len(accepted),
+                    'operation_data': json.dumps(accepted),
+                    'export_options': json.dumps(export_options) if export_options else False,
+                    'log_book_id': log.id
+                })
+                _logger.info("Bulk %s submitted to Magento with %s operations.", response.get('bulk_uuid'),
+                             len(accepted))
+        return bulks
+
+    def process_async_bulk_status(self):
+        """
+        Called by cron to check the status of pending bulks in Magento and process the results of the bulks
+        which are completed.
+        """
+        bulks = self.search([('state', '=', 'pending')], order='id')
+        for bulk in bulks:
+            try:
+                bulk.check_bulk_status()
+            except Exception as error:
+                self._cr.rollback()
+                _logger.error("Unable to check the status of bulk %s. %s", bulk.name, error)
+                continue
+            self._cr.commit()
+        return True
+
+    def check_bulk_status(self):
+        """
+        Check the status of the bulk in Magento, results are processed once no operation is open.
+        :return: True if the bulk is processed
+        """
+        self.ensure_one()
+        response = req(self.instance_id, '/V1/bulk/%s/status' % self.name, is_raise=True)
+        if not isinstance(response, dict) or 'operations_list' not in response:
+            self.write({'state': 'failed'})
+            self._log_failed_operations(self.log_book_id, json.loads(self.operation_data or '[]'),
+                                        "Bulk %s is not found in Magento." % self.name)
+            return True
+        results = response.get('operations_list')
+        if any(result.get('status') == OPERATION_OPEN for result in results):
+            return False
+        self._process_bulk_results(results)
+        return True
+
+    def _process_bulk_results(self, results):
+        """
+        Map the result of each operation to its layer record, failed operations are added in the log book and
+        successful ones are processed further by the product export.
+        :param results: operation list of bulk status, the id of an operation is its position in the request
+        """
+        operations = json.loads(self.operation_data or '[]')
+        results = {result.get('id'): result for result in results}
+        failed_operations = []
+        for operation in operations:
+            result = results.get(operation.get('operation_key'))
+            if not result:
+                operation.update({'message': 'Operation is not found in the bulk status.'})
+                failed_operations.append(operation)
+            elif result.get('status') != OPERATION_COMPLETE:
+                operation.update({'message': result.get('result_message') or ''})
+                failed_operations.append(operation)
+        if failed_operations:
+            self._log_failed_operations(self.log_book_id, failed_operations, "Operation is failed in Magento.")
+        failed_records = {(operation.get('res_model'), operation.get('res_id')) for operation in failed_operations}
+        succeeded_operations = [operation for operation in operations
+                                if (operation.get('res_model'), operation.get('res_id')) not in failed_records]
+        self.write({'state': 'done', 'failed_count': len(failed_operations)})
+        if self.export_options and succeeded_operations:
+            export_options = json.loads(self.export_options)
+            wizard = self.env['magento.export.product.ept'].create(export_options)
+            wizard.process_async_bulk_operations(self, succeeded_operations)
+        return True
+
+    @staticmethod
+    def _log_failed_operations(log, operations, message):
+        """
+        Create log lines for the failed operations.
+        :param log: log book record
+        :param operations: list of operations
+        :param message: message of the log line
+        """
+        if not log:
+            return False
+        log_lines = []
+        for operation in operations:
+            log_lines.append((0, 0, {
+                'message': "%s\nSKU : %s\n%s" % (message, operation.get('sku'), operation.get('message', '')),
+                'default_code': operation.get('sku')
+            }))
+        log.write({'log_lines': log_lines})
+        return True
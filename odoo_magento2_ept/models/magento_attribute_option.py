@@ -23,28 +23,47 @@ class MagentoAttributeOption(models.Model):
     instance_id = fields.Many2one('magento.instance', string="Instance", ondelete="cascade")
     active = fields.Boolean(string="Status", default=True)
 
-    def create_attribute_option(self, attribute, m_attribute, o_attribute):
-        for option in attribute.get('options', []):
-            option.update({'label': option.get('label').strip()})
-            if option.get('label'):
-                o_option = self._get_odoo_attribute_value(o_attribute.id, option.get('label'))
-                m_option = self.search([('instance_id', '=', m_attribute.instance_id.id),
-                                        ('magento_attribute_id', '=', m_attribute.id),
-                                        ('odoo_option_id', '=', o_option.id),
-                                        ('odoo_attribute_id', '=', o_attribute.id)])
-                if not m_option:
-                    values = self._prepare_option_value(option, o_option, o_attribute, m_attribute)
-                    self.create(values)
+    def create_attribute_options(self, attributes, m_attributes, o_attributes):
+        """
+        Create the missing Odoo attribute values and layer options of the attributes in bulk, existing values
+        and options are loaded with one search each.
+        :param attributes: dictionary like {(Magento attribute ID, attribute code): attribute}
+        :param m_attributes: dictionary like {(Magento attribute ID, attribute code): layer attribute}
+        :param o_attributes: dictionary like {(Magento attribute ID, attribute code): Odoo attribute}
+        :return: True
+        """
+        value_obj = self.env['product.attribute.value']
+        options = []
+        for key, attribute in attributes.items():
+            for option in attribute.get('options', []):
+                label = (option.get('label') or '').strip()
+                if label:
+                    options.append((key, dict(option, label=label)))
+        o_options = {}
+        for o_option in value_obj.search([('attribute_id', 'in', list({o_attribute.id for o_attribute
+                                                                         in o_attributes.values()}))]):
+            o_options.setdefault((o_option.attribute_id.id, o_option.name), o_option)
+        missing_values = list(dict.fromkeys(
+            (o_attributes.get(key).id, option.get('label')) for key, option in options
+            if (o_attributes.get(key).id, option.get('label')) not in o_options))
+        if missing_values:
+            o_options.update(zip(missing_values, value_obj.create([
+                {'name': label, 'attribute_id': attribute_id} for attribute_id, label in missing_values])))
+        m_options = self.search([('magento_attribute_id', 'in', [m_attribute.id for m_attribute
+                                                                 in m_attributes.values()])])
+        existing_keys = {(m_option.magento_attribute_id.id, m_option.odoo_option_id.id,
+                          m_option.odoo_attribute_id.id) for m_option in m_options}
+        vals_list = []
+        for key, option in options:
+            m_attribute, o_attribute = m_attributes.get(key), o_attributes.get(key)
+            o_option = o_options.get((o_attribute.id, option.get('label')))
+            option_key = (m_attribute.id, o_option.id, o_attribute.id)
+            if option_key not in existing_keys:
+                existing_keys.add(option_key)
+                vals_list.append(self._prepare_option_value(option, o_option, o_attribute, m_attribute))
+        self.create(vals_list)
         return True
 
-    def _get_odoo_attribute_value(self, attribute_id, label):
-        o_option = self.env['product.attribute.value']
-        o_option = o_option.search([('name', '=', label),
-                                    ('attribute_id', '=', attribute_id)], limit=1)
-        if not o_option:
-            o_option = o_option.create({'name': label, 'attribute_id': attribute_id})
-        return o_option
-
     @staticmethod
     def _prepare_option_value(option, o_option, o_attribute, m_attribute):
         return {
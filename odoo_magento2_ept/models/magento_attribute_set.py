@@ -52,21 +52,29 @@ class MagentoAttributeSet(models.Model):
 
     def create_attribute_set(self, instance, attr_sets):
         """
-        Check Attributes if not found then create new attributes.
+        Check Attributes if not found then create new attributes, existing sets are loaded with one search and
+        the missing sets are created in bulk.
         :param instance: Magento Instance
         :param attr_sets: single import attributes set (type = dict)
         :return: attributes set object
         """
-        for attr_set in attr_sets.get('items', []):
-            set_id = attr_set.get('attribute_set_id', 0)
-            m_attr_set = self.search([('attribute_set_id', '=', set_id),
-                                      ('instance_id', '=', instance.id)], limit=1)
-            if not m_attr_set:
-                m_attr_set = self.create({
+        m_attr_sets = {}
+        for m_attr_set in self.search([('instance_id', '=', instance.id)]):
+            m_attr_sets.setdefault(m_attr_set.attribute_set_id, m_attr_set)
+        items = attr_sets.get('items', [])
+        vals_list, missing_set_ids = [], []
+        for attr_set in items:
+            set_id = str(attr_set.get('attribute_set_id', 0))
+            if set_id not in m_attr_sets and set_id not in missing_set_ids:
+                missing_set_ids.append(set_id)
+                vals_list.append({
                     'attribute_set_name': attr_set.get('attribute_set_name', ''),
-                    'attribute_set_id': set_id,
+                    'attribute_set_id': attr_set.get('attribute_set_id', 0),
                     'instance_id': instance.id,
                     'sort_order': attr_set.get('sort_order', 0)
                 })
-            attr_set.update({'set_id': m_attr_set.id})
+        if vals_list:
+            m_attr_sets.update(zip(missing_set_ids, self.create(vals_list)))
+        for attr_set in items:
+            attr_set.update({'set_id': m_attr_sets.get(str(attr_set.get('attribute_set_id', 0))).id})
         return attr_sets
@@ -5,12 +5,13 @@ Describes methods for Magento Instance
 """
 import json
 import logging
+import time
 from calendar import monthrange
-from datetime import date, datetime, timedelta
+from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 from odoo.tools import ustr
-from .api_request import req
+from .api_request import req, req_concurrent
 
 _secondsConverter = {
     'days': lambda interval: interval * 24 * 60 * 60,
@@ -19,6 +20,15 @@ _secondsConverter = {
     'minutes': lambda interval: interval * 60,
 }
 _logger = logging.getLogger('MagentoInstance')
+# Maximum number of queues selected for one run and estimated seconds to process a queue line.
+QUEUE_SELECTION_LIMIT = 200
+QUEUE_LINE_SECONDS = 2.0
+# Bounds of the export stock batch size learned from the Magento responses, Magento accepts 300 products at most.
+STOCK_BATCH_MIN_SIZE = 10
+STOCK_BATCH_MAX_SIZE = 300
+# Learned batch size aims at this response time, and it is halved if more lines than the rate fail.
+STOCK_BATCH_TARGET_SECONDS = 10.0
+STOCK_BATCH_MAX_FAILURE_RATE = 0.1
 
 
 class MagentoInstance(models.Model):
@@ -26,6 +36,7 @@ class MagentoInstance(models.Model):
     Describes methods for Magento Instance
     """
     _name = 'magento.instance'
+    _inherit = ['api.cassette.mixin.ept', 'api.rate.limit.mixin.ept']
     _description = 'Magento Instance'
 
     @api.model
@@ -116,6 +127,9 @@ class MagentoInstance(models.Model):
                                    help="Product Price is set in selected Pricelist")
     cost_pricelist_id = fields.Many2one(comodel_name='product.pricelist', string="Cost Pricelist",
                                         help="Product Cost Price is set in selected Pricelist")
+    special_pricelist_id = fields.Many2one(comodel_name='product.pricelist', string="Special Pricelist",
+                                           help="Product Special Price is set from the rules of selected "
+                                                "Pricelist if Catalog Price Scope is Global")
     access_token = fields.Char(string="Magento Access Token", help="Magento Access Token")
     auto_create_product = fields.Boolean(string="Auto Create Magento Product", default=False,
                                          help="Checked True, if you want to create new product in "
@@ -255,7 +269,16 @@ class MagentoInstance(models.Model):
                                         help="Activity will be created after this days.")
     # Export Product
     batch_size = fields.Integer(string="Export Stock Batch Size", default=200,
-                                help="Export product batch size.")
+                                help="Export product batch size. It is the initial batch size if the batch size is "
+                                     "adaptive.")
+    is_adaptive_stock_batch_size = fields.Boolean(string="Adaptive Export Stock Batch Size", default=True,
+                                                  help="Batch size is learned from the response times and the "
+                                                       "failures of the stock export requests.")
+    learned_stock_batch_size = fields.Integer(string="Learned Batch Size", compute="_compute_learned_stock_batch_size",
+                                              help="Batch size used for the next stock export.")
+    export_document_workers = fields.Integer(string="Export Document Workers", default=4,
+                                             help="Number of shipments, invoices and credit memos exported to "
+                                                  "Magento at the same time.")
     magento_analytic_account_id = fields.Many2one('account.analytic.account',
                                                   string='Analytic Account')
     magento_analytic_tag_ids = fields.Many2many('account.analytic.tag', string='Analytic Tag')
@@ -274,6 +297,55 @@ class MagentoInstance(models.Model):
         if self.batch_size < 0 or self.batch_size > 300:
             raise UserError("Export stock batch size will only allow the 0-300 batch size value.")
 
+    def _compute_learned_stock_batch_size(self):
+        for instance in self:
+            instance.learned_stock_batch_size = instance.get_export_stock_batch_size() if instance.id else 0
+
+    def _get_stock_batch_size_param(self):
+        return f"{self._module}.export_stock_batch_size_{self.id}"
+
+    def get_export_stock_batch_size(self):
+        """
+        Get the number of products of which the stock is exported in one request, learned by the previous exports
+        if the batch size is adaptive.
+        :return: Batch size
+        """
+        self.ensure_one()
+        batch_size = self.batch_size or STOCK_BATCH_MAX_SIZE
+        if self.is_adaptive_stock_batch_size:
+            batch_size = int(self.env['ir.config_parameter'].sudo().get_param(
+                self._get_stock_batch_size_param()) or batch_size)
+        return max(1, min(batch_size, STOCK_BATCH_MAX_SIZE))
+
+    def update_export_stock_batch_size(self, observations):
+        """
+        Learn the batch size of the stock export from the requests of this run. The batch size is halved if too many
+        requests failed, otherwise it moves toward the size answered in STOCK_BATCH_TARGET_SECONDS, at most by half
+        of the current size.
+        :param observations: list of tuples (number of products, seconds, is failed) of the requests
+        :return: Batch size
+        """
+        self.ensure_one()
+        batch_size = self.get_export_stock_batch_size()
+        if not self.is_adaptive_stock_batch_size or not observations:
+            return batch_size
+        failed_count = len([is_failed for item_count, seconds, is_failed in observations if is_failed])
+        item_count = sum(item_count for item_count, seconds, is_failed in observations if not is_failed)
+        seconds = sum(seconds for item_count, seconds, is_failed in observations if not is_failed)
+        if failed_count > len(observations) * STOCK_BATCH_MAX_FAILURE_RATE:
+            new_batch_size = batch_size // 2
+        elif item_count and seconds:
+            target_size = STOCK_BATCH_TARGET_SECONDS * item_count / seconds
+            new_batch_size = int(min(max(target_size, batch_size / 2), batch_size * 1.5))
+        else:
+            return batch_size
+        new_batch_size = max(STOCK_BATCH_MIN_SIZE, min(new_batch_size, STOCK_BATCH_MAX_SIZE))
+        if new_batch_size != batch_size:
+            _logger.info("Export stock batch size of %s is changed from %s to %s.", self.name, batch_size,
+                         new_batch_size)
+            self.env['ir.config_parameter'].sudo().set_param(self._get_stock_batch_size_param(), new_batch_size)
+        return new_batch_size
+
     def check_dashboard_view(self):
         """
         It will display dashboard based on configuration either by instance wise or website wise.
@@ -976,23 +1048,23 @@ class MagentoInstance(models.Model):
             context = dict(self.env.context)
             context.update({'sort': 'week'})
             self.env.context = context
+        rollup = self.env['sale.dashboard.rollup.ept']
         for record in self:
-            # Prepare values for Graph
-            values = record.get_graph_data(record)
-            data_type, comparison_value = record.get_compare_data(record)
-            # Total sales
-            total_sales = round(sum([key['y'] for key in values]), 2)
+            # Prepare values for Graph, comparison and counts from the daily rollup
+            dashboard_data = rollup.get_dashboard_rollup_data(self._context.get('sort'),
+                                                              magento_instance_id=record.id)
+            values = dashboard_data.get('values')
             # Product count query
             exported = 'All'
             product_data = record.get_total_products(record, exported)
             # Customer count query
             customer_data = record.get_customers(record)
-            # Order count query
-            order_data = record.get_total_orders(record)
-            # Order shipped count query
-            order_shipped = record.get_shipped_orders(record)
-            # # refund count query
-            refund_data = record.get_refund(record)
+            # Order count
+            order_data = record.get_total_orders(record, count=dashboard_data.get('order_count'))
+            # Order shipped count
+            order_shipped = record.get_shipped_orders(record, count=dashboard_data.get('shipped_order_count'))
+            # refund count
+            refund_data = record.get_refund(record, count=dashboard_data.get('refund_count'))
             record.magento_order_data = json.dumps({
                 "values": values,
                 "title": "",
@@ -1000,7 +1072,7 @@ class MagentoInstance(models.Model):
                 "area": True,
                 "color": "#875A7B",
                 "is_sample_data": False,
-                "total_sales": total_sales,
+                "total_sales": dashboard_data.get('total_sales'),
                 "order_data": order_data,
                 "product_date": product_data,
                 "customer_data": customer_data,
@@ -1009,79 +1081,46 @@ class MagentoInstance(models.Model):
                 "sort_on": self._context.get('sort'),
                 "currency_symbol": '',  # record.magento_base_currency.symbol or '',
                 # remove currency symbol and make it same as odoo
-                "graph_sale_percentage": {'type': data_type, 'value': comparison_value}
+                "graph_sale_percentage": dashboard_data.get('graph_sale_percentage')
             })
 
     def get_draft_refund(self):
         context = self.env.context
-        state = f"('{context.get('state')}')"
-        website = context.get('website')
-        result = self.get_refund(self, website, state)
+        result = self.get_refund(self, context.get('website') or 0, (context.get('state'),))
         return result.get('refund_action')
 
     def get_posted_refund(self):
         context = self.env.context
-        state = f"('{context.get('state')}')"
-        website = context.get('website')
-        result = self.get_refund(self, website, state)
+        result = self.get_refund(self, context.get('website') or 0, (context.get('state'),))
         return result.get('refund_action')
 
     def get_cancelled_refund(self):
         context = self.env.context
-        state = f"('{context.get('state')}')"
-        website = context.get('website')
-        result = self.get_refund(self, website, state)
+        result = self.get_refund(self, context.get('website') or 0, (context.get('state'),))
         return result.get('refund_action')
 
-    def get_refund(self, instance, website_id=0, state=('draft', 'posted', 'cancel')):
-        action = self.sudo().env.ref('odoo_magento2_ept.action_magento_refund_invoice_tree_ept')
-        action = action.read()[0]
+    def get_refund(self, instance, website_id=0, state=('draft', 'posted', 'cancel'), count=None):
+        """
+        Use: To get the refunds of the current week, month, year or all time of the Magento instance
+        :param instance: magento instance object
+        :param website_id: magento website id to get website wise refunds
+        :param state: states of the refund
+        :param count: refund count when it is already known from the dashboard rollup
+        :return: total number of refunds and action for refunds
+        """
+        domain = [('move_type', '=', 'out_refund'), ('magento_instance_id', '=', instance.id),
+                  ('state', 'in', list(state))]
         if website_id:
-            query = self._prepare_website_refund_query(website_id, instance, state)
-        else:
-            query = self._prepare_refund_query(instance, state)
-        self._cr.execute(query)
-        refunds = self._cr.dictfetchall()
-        refund_ids = [refund.get('id') for refund in refunds]
-        action = self.prepare_action(action, domain=[('id', 'in', refund_ids)])
+            domain.append(('invoice_line_ids.sale_line_ids.order_id.magento_website_id', '=', website_id))
+        domain = self._get_order_period_domain(domain, 'date')
+        action = self.sudo().env.ref('odoo_magento2_ept.action_magento_refund_invoice_tree_ept').read()[0]
+        if count is None:
+            count = self.env['account.move'].search_count(domain)
         return {
-            'refund_count': len(refund_ids),
-            'refund_action': action
+            'refund_count': count,
+            'refund_action': self.prepare_action(action, domain=domain)
         }
 
-    @staticmethod
-    def _prepare_website_refund_query(website_id, instance, state):
-        return f"""
-        SELECT r.id 
-            FROM account_move AS r
-                JOIN account_move_line AS rl
-                    ON r.id = rl.move_id
-                JOIN sale_order_line_invoice_rel AS rel
-                    ON rel.invoice_line_id = rl.id
-                JOIN sale_order_line AS sl
-                    ON rel.order_line_id = sl.id
-                JOIN sale_order AS so
-                    ON so.id = sl.order_id
-                JOIN magento_instance AS mi
-                    ON mi.id = so.magento_instance_id
-                JOIN magento_website AS mw
-                    ON mw.magento_instance_id = mi.id
-            WHERE r.move_type = 'out_refund'
-                AND mi.id = {website_id}
-                AND mw.id = {instance.id}
-                AND r.state in {state}
-        """
-
-    @staticmethod
-    def _prepare_refund_query(instance, state=('draft', 'posted', 'cancel')):
-        return f"""
-        SELECT DISTINCT(id) 
-            FROM account_move
-            WHERE move_type = 'out_refund' 
-                AND magento_instance_id = {instance.id}
-                AND state in {state}
-        """
-
     @staticmethod
     def prepare_action(view, domain):
         """
@@ -1143,135 +1182,54 @@ class MagentoInstance(models.Model):
     def get_customers(self, record):
         """
         Use: To get the list of customers with Magento instance for current Magento instance
-        :return: total number of customer ids and action for customers
+        :return: total number of customers and action for customers
         """
-        customer_data = {}
-        main_sql = """select DISTINCT(rp.id) as partner_id from res_partner as rp
-                    inner join magento_res_partner_ept mp on mp.partner_id = rp.id
-                    where mp.magento_instance_id = %s""" % (record.id)
+        domain = [('magento_res_partner_ids.magento_instance_id', '=', record.id)]
         view = self.env.ref('base.action_partner_form').sudo().read()[0]
-        self._cr.execute(main_sql)
-        result = self._cr.dictfetchall()
-        magento_customer_ids = []
-        if result:
-            for data in result:
-                magento_customer_ids.append(data.get('partner_id'))
-        action = record.prepare_action(view, [('id', 'in', magento_customer_ids)])
-        customer_data.update(
-            {'customer_count': len(magento_customer_ids), 'customer_action': action})
-        return customer_data
+        action = record.prepare_action(view, domain)
+        return {'customer_count': self.env['res.partner'].search_count(domain), 'customer_action': action}
+
+    def _get_order_period_domain(self, domain, date_field='date_order'):
+        """
+        Use: To add the current week, month or year of the dashboard in the domain
+        :param domain: domain of the dashboard action
+        :param date_field: date field on which period is applied
+        :return: domain
+        """
+        period_start = self.env['sale.dashboard.rollup.ept'].get_dashboard_period_start(self._context.get('sort'))
+        if period_start:
+            domain.append((date_field, '>=', period_start))
+        return domain
 
-    def get_total_orders(self, record, state=False):
+    def get_total_orders(self, record, state=False, count=None):
         """
-        Use: To get the list of Magento sale orders month wise or year wise
-        :return: total number of Magento sale orders ids and action for sale orders of current instance
+        Use: To get the Magento sale orders of the current week, month, year or all time
+        :param count: order count when it is already known from the dashboard rollup
+        :return: total number of Magento sale orders and action for sale orders of current instance
         """
         if not state:
             state = ('sale', 'done')
-
-        def orders_of_current_week(record):
-            self._cr.execute("""select id from sale_order where date(date_order)
-                                    >= (select date_trunc('week', date(current_date)))
-                                    and magento_instance_id= %s and state in %s  
-                                    order by date(date_order)
-                            """ % (record.id, state))
-            return self._cr.dictfetchall()
-
-        def orders_of_current_month(record):
-            self._cr.execute("""select id from sale_order where date(date_order) >=
-                                    (select date_trunc('month', date(current_date)))
-                                    and magento_instance_id= %s and state in %s
-                                    order by date(date_order)
-                            """ % (record.id, state))
-            return self._cr.dictfetchall()
-
-        def orders_of_current_year(record):
-            self._cr.execute("""select id from sale_order where date(date_order) >=
-                                    (select date_trunc('year', date(current_date))) 
-                                    and magento_instance_id= %s and state in %s  
-                                    order by date(date_order)
-                                 """ % (record.id, state))
-            return self._cr.dictfetchall()
-
-        def orders_of_all_time(record):
-            self._cr.execute(
-                """select id from sale_order where magento_instance_id = %s
-                and state in %s""" % (record.id, state))
-            return self._cr.dictfetchall()
-
-        order_data = {}
-        order_ids = []
-        if self._context.get('sort') == "week":
-            result = orders_of_current_week(record)
-        elif self._context.get('sort') == "month":
-            result = orders_of_current_month(record)
-        elif self._context.get('sort') == "year":
-            result = orders_of_current_year(record)
-        else:
-            result = orders_of_all_time(record)
-        if result:
-            for data in result:
-                order_ids.append(data.get('id'))
+        domain = self._get_order_period_domain([('magento_instance_id', '=', record.id),
+                                                ('state', 'in', list(state))])
         view = self.env.ref('odoo_magento2_ept.magento_action_sales_order_ept').sudo().read()[0]
-        action = record.prepare_action(view, [('id', 'in', order_ids)])
-        order_data.update({'order_count': len(order_ids), 'order_action': action})
-        return order_data
-
-    def get_shipped_orders(self, record):
-        """
-        Use: To get the list of Magento shipped orders month wise or year wise
-        :return: total number of Magento shipped orders ids and action for shipped orders of current instance
-        """
-        shipped_query = """
-           SELECT distinct(so.id) 
-           FROM stock_picking AS sp
-           JOIN sale_order AS so
-               ON sp.sale_id = so.id
-           JOIN stock_location AS sl 
-               ON sl.id = sp.location_dest_id 
-           WHERE 
-               sp.is_magento_picking = True AND 
-               sp.state = 'done' AND
-               so.magento_instance_id = {} AND
-               sl.usage='customer'
-       """.format(record.id)
-
-        def shipped_order_of_current_week(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('week', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_current_month(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('month', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_current_year(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('year', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_all_time(shipped_query):
-            self._cr.execute(shipped_query)
-            return self._cr.dictfetchall()
-
-        order_data = {}
-        order_ids = []
-        if self._context.get('sort') == "week":
-            result = shipped_order_of_current_week(shipped_query)
-        elif self._context.get('sort') == "month":
-            result = shipped_order_of_current_month(shipped_query)
-        elif self._context.get('sort') == "year":
-            result = shipped_order_of_current_year(shipped_query)
-        else:
-            result = shipped_order_of_all_time(shipped_query)
-        if result:
-            for data in result:
-                order_ids.append(data.get('id'))
+        action = record.prepare_action(view, domain)
+        if count is None:
+            count = self.env['sale.order'].search_count(domain)
+        return {'order_count': count, 'order_action': action}
+
+    def get_shipped_orders(self, record, count=None):
+        """
+        Use: To get the Magento shipped orders of the current week, month, year or all time
+        :param count: shipped order count when it is already known from the dashboard rollup
+        :return: total number of Magento shipped orders and action for shipped orders of current instance
+        """
+        domain = self._get_order_period_domain([('magento_instance_id', '=', record.id),
+                                                ('magento_is_shipped', '=', True)])
         view = self.env.ref('odoo_magento2_ept.magento_action_sales_order_ept').sudo().read()[0]
-        action = record.prepare_action(view, [('id', 'in', order_ids)])
-        order_data.update({'order_count': len(order_ids), 'order_action': action})
-        return order_data
+        action = record.prepare_action(view, domain)
+        if count is None:
+            count = self.env['sale.order'].search_count(domain)
+        return {'order_count': count, 'order_action': action}
 
     def magento_product_exported_ept(self):
         """
@@ -1326,27 +1284,11 @@ class MagentoInstance(models.Model):
         :param state: state of the invoice
         :return: invoice_data dict with total count and action
         """
-        invoice_data = {}
-        invoice_ids = []
-        invoice_query = """select account_move.id
-            from sale_order_line_invoice_rel
-            inner join sale_order_line on sale_order_line.id=sale_order_line_invoice_rel.order_line_id 
-            inner join sale_order on sale_order.id=sale_order_line.order_id
-            inner join account_move_line on account_move_line.id=sale_order_line_invoice_rel.invoice_line_id 
-            inner join account_move on account_move.id=account_move_line.move_id
-            where sale_order.magento_instance_id=%s
-            and account_move.state in ('%s')
-            and account_move.move_type in ('out_invoice','out_refund')""" % \
-                        (self.id, state)
-        self._cr.execute(invoice_query)
-        result = self._cr.dictfetchall()
+        domain = [('invoice_line_ids.sale_line_ids.order_id.magento_instance_id', '=', self.id),
+                  ('state', '=', state), ('move_type', 'in', ('out_invoice', 'out_refund'))]
         view = self.env.ref('odoo_magento2_ept.action_magento_invoice_tree1_ept').sudo().read()[0]
-        if result:
-            for data in result:
-                invoice_ids.append(data.get('id'))
-        action = self.prepare_action(view, [('id', 'in', invoice_ids)])
-        invoice_data.update({'order_count': len(invoice_ids), 'order_action': action})
-        return invoice_data
+        action = self.prepare_action(view, domain)
+        return {'order_count': self.env['account.move'].search_count(domain), 'order_action': action}
 
     def get_magento_picking_records(self, state):
         """
@@ -1354,25 +1296,12 @@ class MagentoInstance(models.Model):
         :param state: state of the picking
         :return: picking_data dict with total count and action
         """
-        picking_data = {}
-        picking_ids = []
-        invoice_query = """SELECT SP.id FROM stock_picking as SP
-            inner join sale_order as SO on SP.sale_id = SO.id
-            inner join stock_location as SL on SL.id = SP.location_dest_id 
-            WHERE SP.magento_instance_id = %s
-            and SL.usage = 'customer'
-            and SP.state in ('%s')
-            """ % (self.id, state)
-        self._cr.execute(invoice_query)
-        result = self._cr.dictfetchall()
+        domain = [('magento_instance_id', '=', self.id), ('sale_id', '!=', False),
+                  ('location_dest_id.usage', '=', 'customer'), ('state', '=', state)]
         view = \
             self.env.ref('odoo_magento2_ept.action_magento_stock_picking_tree_ept').sudo().read()[0]
-        if result:
-            for data in result:
-                picking_ids.append(data.get('id'))
-        action = self.prepare_action(view, [('id', 'in', picking_ids)])
-        picking_data.update({'order_count': len(picking_ids), 'order_action': action})
-        return picking_data
+        action = self.prepare_action(view, domain)
+        return {'order_count': self.env['stock.picking'].search_count(domain), 'order_action': action}
 
     def magento_invoice_invoices_open(self):
         """
@@ -1464,195 +1393,6 @@ class MagentoInstance(models.Model):
                          'search_default_filter_date': 1}})
         return action
 
-    def get_graph_data(self, record):
-        """
-        Use: To get the details of Magento sale orders and total amount month wise or year wise to prepare the graph
-        :return: Magento sale order date or month and sum of sale orders amount of current instance
-        """
-
-        def get_current_week_date(record):
-            self._cr.execute("""SELECT to_char(date(d.day),'DAY'), t.amount_untaxed as sum
-                                    FROM  (
-                                       SELECT day
-                                       FROM generate_series(date(date_trunc('week', (current_date)))
-                                        , date(date_trunc('week', (current_date)) + interval '6 days')
-                                        , interval  '1 day') day
-                                       ) d
-                                    LEFT   JOIN 
-                                    (SELECT date(date_order)::date AS day, sum(amount_untaxed) as amount_untaxed
-                                       FROM   sale_order
-                                       WHERE  date(date_order) >= (select date_trunc('week', date(current_date)))
-                                       AND    date(date_order) <= (select date_trunc('week', date(current_date)) 
-                                       + interval '6 days')
-                                       AND magento_instance_id=%s and state in ('sale','done')  
-                                       GROUP  BY 1
-                                       ) t USING (day)
-                                    ORDER  BY day""" % (record.id))
-            return self._cr.dictfetchall()
-
-        def graph_of_current_month(record):
-            self._cr.execute("""select EXTRACT(DAY from date(date_day)) :: integer,sum(amount_untaxed) from (
-                            SELECT 
-                              day::date as date_day,
-                              0 as amount_untaxed
-                            FROM generate_series(date(date_trunc('month', (current_date)))
-                                , date(date_trunc('month', (current_date)) + interval '1 MONTH - 1 day')
-                                , interval  '1 day') day
-                            union all
-                            SELECT date(date_order)::date AS date_day,
-                            sum(amount_untaxed) as amount_untaxed
-                              FROM   sale_order
-                            WHERE  date(date_order) >= (select date_trunc('month', date(current_date)))
-                            AND date(date_order)::date <= (select date_trunc('month', date(current_date)) 
-                            + '1 MONTH - 1 day')
-                            and magento_instance_id = %s and state in ('sale','done')
-                            group by 1
-                            )foo 
-                            GROUP  BY 1
-                            ORDER  BY 1""" % (record.id))
-            return self._cr.dictfetchall()
-
-        def graph_of_current_year(record):
-            self._cr.execute("""select TRIM(TO_CHAR(DATE_TRUNC('month',month),'MONTH')),sum(amount_untaxed) from
-                                    (SELECT DATE_TRUNC('month',date(day)) as month,
-                                      0 as amount_untaxed
-                                    FROM generate_series(date(date_trunc('year', (current_date)))
-                                    , date(date_trunc('year', (current_date)) + interval '1 YEAR - 1 day')
-                                    , interval  '1 MONTH') day
-                                    union all
-                                    SELECT DATE_TRUNC('month',date(date_order)) as month,
-                                    sum(amount_untaxed) as amount_untaxed
-                                      FROM   sale_order
-                                    WHERE  date(date_order) >= (select date_trunc('year', date(current_date))) AND 
-                                    date(date_order)::date <= (select date_trunc('year', date(current_date)) 
-                                    + '1 YEAR - 1 day')
-                                    and magento_instance_id = %s and state in ('sale','done') 
-                                    group by DATE_TRUNC('month',date(date_order))
-                                    order by month
-                                    )foo 
-                                    GROUP  BY foo.month
-                                    order by foo.month""" % (record.id))
-            return self._cr.dictfetchall()
-
-        def graph_of_all_time(record):
-            self._cr.execute("""select TRIM(TO_CHAR(DATE_TRUNC('month',date_order),'YYYY-MM')),sum(amount_untaxed)
-                                    from sale_order where magento_instance_id = %s and state in ('sale','done')  
-                                    group by DATE_TRUNC('month',date_order) 
-                                    order by DATE_TRUNC('month',date_order)""" % (record.id))
-            return self._cr.dictfetchall()
-
-        # Prepare values for Graph
-        values = []
-        if self._context.get('sort') == 'week':
-            result = get_current_week_date(record)
-        elif self._context.get('sort') == "month":
-            result = graph_of_current_month(record)
-        elif self._context.get('sort') == "year":
-            result = graph_of_current_year(record)
-        else:
-            result = graph_of_all_time(record)
-        if result:
-            for data in result:
-                values.append({"x": ("{}".format(data.get(list(data.keys())[0]))),
-                               "y": data.get('sum') or 0.0})
-        return values
-
-    def get_compare_data(self, record):
-        """
-        :param record: Magento instance
-        :return: Comparison ratio of orders (weekly,monthly and yearly based on selection)
-        """
-        data_type = False
-        total_percentage = 0.0
-
-        if self._context.get('sort') == 'week':
-            current_total, previous_total = self.get_compared_week_data(record)
-        elif self._context.get('sort') == "month":
-            current_total, previous_total = self.get_compared_month_data(record)
-        elif self._context.get('sort') == "year":
-            current_total, previous_total = self.get_compared_year_data(record)
-        else:
-            current_total, previous_total = 0.0, 0.0
-        if current_total > 0.0:
-            if current_total >= previous_total:
-                data_type = 'positive'
-                total_percentage = (current_total - previous_total) * 100 / current_total
-            if previous_total > current_total:
-                data_type = 'negative'
-                total_percentage = (previous_total - current_total) * 100 / current_total
-        return data_type, round(total_percentage, 2)
-
-    def get_compared_week_data(self, record):
-        current_total = 0.0
-        previous_total = 0.0
-        day_of_week = date.weekday(date.today())
-        self._cr.execute("""select sum(amount_untaxed) as current_week from sale_order
-                                where date(date_order) >= (select date_trunc('week', date(current_date))) and
-                                magento_instance_id=%s and state in ('sale','done')""" %
-                         (record.id))
-        current_week_data = self._cr.dictfetchone()
-        if current_week_data and current_week_data.get('current_week'):
-            current_total = current_week_data.get('current_week')
-        # Previous week data
-        self._cr.execute("""select sum(amount_untaxed) as previous_week from sale_order
-                            where date(date_order) between (select date_trunc('week', current_date) - interval '7 day') 
-                            and (select date_trunc('week', (select date_trunc('week', current_date) - interval '7
-                            day')) + interval '%s day')
-                            and magento_instance_id=%s and state in ('sale','done')
-                            """ % (day_of_week, record.id))
-        previous_week_data = self._cr.dictfetchone()
-        if previous_week_data and previous_week_data.get(
-                'previous_week'):
-            previous_total = previous_week_data.get('previous_week')
-        return current_total, previous_total
-
-    def get_compared_month_data(self, record):
-        current_total = 0.0
-        previous_total = 0.0
-        day_of_month = date.today().day - 1
-        self._cr.execute("""select sum(amount_untaxed) as current_month from sale_order
-                                where date(date_order) >= (select date_trunc('month', date(current_date)))
-                                and magento_instance_id=%s and state in ('sale','done')""" %
-                         (record.id))
-        current_data = self._cr.dictfetchone()
-        if current_data and current_data.get('current_month'):
-            current_total = current_data.get('current_month')
-        # Previous week data
-        self._cr.execute("""select sum(amount_untaxed) as previous_month from sale_order where date(date_order)
-                            between (select date_trunc('month', current_date) - interval '1 month') and
-                            (select date_trunc('month', (select date_trunc('month', current_date) - interval
-                            '1 month')) + interval '%s days')
-                            and magento_instance_id=%s and state in ('sale','done')
-                            """ % (day_of_month, record.id))
-        previous_data = self._cr.dictfetchone()
-        if previous_data and previous_data.get('previous_month'):
-            previous_total = previous_data.get('previous_month')
-        return current_total, previous_total
-
-    def get_compared_year_data(self, record):
-        current_total = 0.0
-        previous_total = 0.0
-        year_begin = date.today().replace(month=1, day=1)
-        year_end = date.today()
-        delta = (year_end - year_begin).days - 1
-        self._cr.execute("""select sum(amount_untaxed) as current_year from sale_order
-                                where date(date_order) >= (select date_trunc('year', date(current_date)))
-                                and magento_instance_id=%s and state in ('sale','done')""" %
-                         (record.id))
-        current_data = self._cr.dictfetchone()
-        if current_data and current_data.get('current_year'):
-            current_total = current_data.get('current_year')
-        # Previous week data
-        self._cr.execute("""select sum(amount_untaxed) as previous_year from sale_order where date(date_order)
-                            between (select date_trunc('year', date(current_date) - interval '1 year')) and 
-                            (select date_trunc('year', date(current_date) - interval '1 year') + interval '%s days') 
-                            and magento_instance_id=%s and state in ('sale','done')
-                            """ % (delta, record.id))
-        previous_data = self._cr.dictfetchone()
-        if previous_data and previous_data.get('previous_year'):
-            previous_total = previous_data.get('previous_year')
-        return current_total, previous_total
-
     def create_common_log_book(self, process_type, module_name):
         """ This method used to create a log book record.
             @param process_type: Generally, the process type value is 'import' or 'export'.
@@ -1681,10 +1421,7 @@ class MagentoInstance(models.Model):
         return True
 
     def _get_model_id(self, model_name):
-        model_id = self.env['ir.model'].search([('model', '=', model_name)], limit=1)
-        if model_id:
-            model_id = model_id.id
-        return model_id
+        return self.env['common.log.lines.ept'].get_model_id(model_name)
 
     def _prepare_activity_values(self, **kwargs):
         instance = kwargs.get('instance')
@@ -1703,6 +1440,42 @@ class MagentoInstance(models.Model):
             })
         return values
 
+    def export_documents(self, requests_data):
+        """
+        Export the documents like shipments, invoices and credit memos to Magento with the worker pool of the
+        instance.
+        :param requests_data: dictionary like {record ID: (API path, method, data)}
+        :return: dictionary like {record ID: (response, error)}
+        """
+        self.ensure_one()
+        _logger.info("Exporting %s documents to Magento instance %s with %s workers.", len(requests_data),
+                     self.name, self.export_document_workers)
+        return req_concurrent(self, requests_data, self.export_document_workers)
+
+    def write_exported_documents(self, records, magento_ids=None, id_field=False):
+        """
+        Mark the documents as exported to Magento and write their Magento IDs with one query.
+        :param records: exported stock.picking or account.move records
+        :param magento_ids: dictionary like {record ID: Magento ID}
+        :param id_field: field of the Magento ID, like magento_shipping_id
+        :return: True
+        """
+        if not records:
+            return True
+        if not id_field:
+            records.write({'is_exported_to_magento': True})
+            return True
+        magento_ids = magento_ids or dict()
+        query = """UPDATE {table} AS document
+                    SET is_exported_to_magento = true, {id_field} = data.magento_id, write_uid = %s,
+                    write_date = (now() at time zone 'UTC')
+                    FROM unnest(%s::int[], %s::varchar[]) AS data(id, magento_id)
+                    WHERE document.id = data.id""".format(table=records._table, id_field=id_field)
+        self._cr.execute(query, (self.env.uid, records.ids, [str(magento_ids.get(record_id) or '')
+                                                              for record_id in records.ids]))
+        records.invalidate_cache(['is_exported_to_magento', id_field, 'write_uid', 'write_date'], records.ids)
+        return True
+
     def show_popup_notification(self, message):
         self.env["bus.bus"]._sendone(self.env.user.partner_id, 'simple_notification', {
             "title": "Magento Connector",
@@ -1712,22 +1485,84 @@ class MagentoInstance(models.Model):
         })
         return True
 
-    def get_draft_queues(self, model='', name=''):
-        if not model:
-            return False
+    def get_queues_to_process(self, line_model, cron_name=False, limit=QUEUE_SELECTION_LIMIT):
+        """
+        Select the next queues to process with one indexed query. Queues of higher priority are selected first
+        and queues of each priority are selected round-robin across instances, so a big backfill of one instance
+        does not starve the fresh orders of other instances. Queues leased by other workers and queues which need
+        manual action are skipped.
+        :param line_model: Name of the queue line model, like magento.order.data.queue.line.ept
+        :param cron_name: External ID of the cron, only the queues which can be processed in its interval
+        are selected
+        :param limit: Maximum number of queues to select
+        :return: Queue records in the processing order
+        """
+        line_obj = self.env[line_model]
+        queue_obj = self.env[line_obj._fields['queue_id'].comodel_name]
+        priority = "queue.priority" if 'priority' in queue_obj._fields else "'1'"
         query = f"""
-            SELECT queue_id 
-                FROM {model} 
-                WHERE 
-                    state = 'draft'
-                GROUP BY queue_id, create_date
-                ORDER BY create_date ASC
-            """
-        self._cr.execute(query)
-        queue_ids = [queue.get('queue_id') for queue in self._cr.dictfetchall()]
-        # model = model.replace('_', '.')
-        queues = self.env[name].browse(queue_ids)
-        return queues.filtered(lambda q: not q.is_action_require)
+            WITH draft_queues AS (
+                SELECT queue.id, queue.instance_id, queue.create_date, {priority} AS priority,
+                    count(line.id) AS line_count
+                FROM {queue_obj._table} AS queue
+                INNER JOIN {line_obj._table} AS line ON line.queue_id = queue.id AND line.state = 'draft'
+                WHERE queue.is_action_require IS NOT TRUE
+                    AND (queue.lease_expire_at IS NULL OR queue.lease_expire_at < (now() at time zone 'UTC'))
+                GROUP BY queue.id
+            )
+            SELECT id, line_count FROM (
+                SELECT id, line_count, priority, create_date,
+                    row_number() OVER (PARTITION BY instance_id, priority ORDER BY create_date, id) AS lane_position
+                FROM draft_queues
+            ) AS lanes
+            ORDER BY priority DESC, lane_position, create_date, id
+            LIMIT %s
+        """
+        self._cr.execute(query, (limit,))
+        rows = self._cr.fetchall()
+        queue_ids = [queue_id for queue_id, line_count in rows]
+        if cron_name and rows:
+            # Return only the queues which can be processed in the interval of the cron, at least one queue.
+            time_budget = self.get_magento_cron_execution_time(cron_name) - 60
+            line_seconds = self._get_queue_line_seconds(queue_obj)
+            queue_ids, total_seconds = list(), 0.0
+            for queue_id, line_count in rows:
+                total_seconds += line_count * line_seconds
+                if queue_ids and total_seconds > time_budget:
+                    break
+                queue_ids.append(queue_id)
+        return queue_obj.browse(queue_ids)
+
+    def _get_queue_line_seconds(self, queue_obj):
+        """
+        Get the average time to process one line of the queue, measured by the previous runs.
+        :param queue_obj: Queue model
+        :return: Seconds
+        """
+        param = self.env['ir.config_parameter'].sudo().get_param(f"{self._module}.{queue_obj._table}_line_seconds")
+        return float(param or QUEUE_LINE_SECONDS)
+
+    def update_queue_line_seconds(self, queues, start):
+        """
+        Update the average time to process one line of the queue with the lines processed in this run.
+        :param queues: Queue records selected for this run
+        :param start: Start time of the run
+        :return: True
+        """
+        if not queues:
+            return True
+        line_obj = self.env[queues._fields['line_ids'].comodel_name]
+        self._cr.execute(f"""SELECT count(*) FROM {line_obj._table} WHERE queue_id = ANY(%s) AND state != 'draft'
+                             AND write_date >= %s""", (queues.ids, datetime.utcfromtimestamp(start)))
+        line_count = self._cr.fetchone()[0]
+        if not line_count:
+            return True
+        line_seconds = (time.time() - start) / line_count
+        # Moving average, so one slow run does not change the estimation too much.
+        line_seconds = 0.7 * self._get_queue_line_seconds(queues) + 0.3 * line_seconds
+        self.env['ir.config_parameter'].sudo().set_param(f"{self._module}.{queues._table}_line_seconds",
+                                                         round(line_seconds, 3))
+        return True
 
     def get_queue_action(self, ids, **kwargs):
         """
@@ -44,39 +44,51 @@ class MagentoProductAttribute(models.Model):
 
     def import_magento_attributes(self, instance, attr_sets, is_raise=False):
         """
-        Import Attributes from Magento to Odoo.
+        Import Attributes from Magento to Odoo. Attributes of all the sets are fetched first, an attribute of many
+        sets is imported once. Layer attributes, Odoo attributes and their options are then compared with the
+        existing records in memory, and the missing records are created in bulk.
         :param instance: Magento Instance object
         :param attr_sets:  magento attribute set dictionary
         :param is_raise: To raise the error message while importing attribute sets
         :return:
         """
-        option = self.env['magento.attribute.option']
+        attributes = {}
         for attr_set in attr_sets.get('items', []):
             url = f"/V1/products/attribute-sets/{attr_set.get('attribute_set_id')}/attributes"
-            attributes = req(instance, url, method='GET', is_raise=is_raise)
-            for attribute in attributes:
+            response = req(instance, url, method='GET', is_raise=is_raise)
+            for attribute in response if isinstance(response, list) else []:
+                # We have added this condition for identify only those attributes which have
+                # any attribute value set. Because, we can not create variant product without
+                # attribute options.
                 if attribute.get('options', []):
-                    # We have added this condition for identify only those attributes which have
-                    # any attribute value set. Because, we can not create variant product without
-                    # attribute options.
-                    self.__update_attribute_type(attribute)
-                    m_attribute = self._search_layer_attribute(attribute, instance)
-                    o_attribute = self._search_odoo_attribute(attribute, m_attribute)
-                    m_attribute.write({'odoo_attribute_id': o_attribute.id})
-                    option.create_attribute_option(attribute, m_attribute, o_attribute)
+                    key = (str(attribute.get('attribute_id')), attribute.get('attribute_code'))
+                    attributes.setdefault(key, attribute)
+        if not attributes:
+            return True
+        for attribute in attributes.values():
+            self.__update_attribute_type(attribute)
+        m_attributes = self._get_layer_attributes(instance, attributes)
+        o_attributes = self._get_odoo_attributes(attributes, m_attributes)
+        self.env['magento.attribute.option'].create_attribute_options(attributes, m_attributes, o_attributes)
         return True
 
-    def _search_layer_attribute(self, attribute, instance):
-        m_attribute = self.search([('magento_attribute_id', '=', attribute.get('attribute_id')),
-                                   ('magento_attribute_code', '=', attribute.get('attribute_code')),
-                                   ('instance_id', '=', instance.id)], limit=1)
-        if not m_attribute:
-            m_attribute = self.create_layer_attribute(attribute, instance)
-        return m_attribute
-
-    def create_layer_attribute(self, attribute, instance):
-        values = self._prepare_layer_attribute_values(attribute, instance)
-        return self.create(values)
+    def _get_layer_attributes(self, instance, attributes):
+        """
+        Get the layer attributes of the Magento attributes, missing layer attributes are created in bulk.
+        :param instance: Magento Instance object
+        :param attributes: dictionary like {(Magento attribute ID, attribute code): attribute}
+        :return: dictionary like {(Magento attribute ID, attribute code): layer attribute}
+        """
+        m_attributes = {}
+        for m_attribute in self.search([('instance_id', '=', instance.id),
+                                        ('magento_attribute_code', 'in', [code for _, code in attributes])]):
+            m_attributes.setdefault((m_attribute.magento_attribute_id, m_attribute.magento_attribute_code),
+                                    m_attribute)
+        missing_keys = [key for key in attributes if key not in m_attributes]
+        if missing_keys:
+            m_attributes.update(zip(missing_keys, self.create([
+                self._prepare_layer_attribute_values(attributes.get(key), instance) for key in missing_keys])))
+        return {key: m_attributes.get(key) for key in attributes}
 
     @staticmethod
     def _prepare_layer_attribute_values(attribute, instance):
@@ -91,21 +103,46 @@ class MagentoProductAttribute(models.Model):
             'default_value': attribute.get('default_value')
         }
 
-    def _search_odoo_attribute(self, attribute, m_attribute):
-        p_attribute = self.env['product.attribute']
-        p_attribute = p_attribute.search([('magento_attribute_id', '=', m_attribute.id)])
-        if not p_attribute:
-            p_attribute = p_attribute.search([
-                ('name', '=', attribute.get('default_frontend_label')),
-                ('magento_attribute_id', '=', False)], limit=1)
-            if not p_attribute:
-                p_attribute = self.create_attribute(attribute, m_attribute.id)
-        return p_attribute
-
-    def create_attribute(self, attribute, magento_id):
+    def _get_odoo_attributes(self, attributes, m_attributes):
+        """
+        Get the Odoo attributes of the layer attributes: the attribute linked to the layer attribute, else an
+        attribute of the same name not linked to any layer attribute, else a new attribute. New attributes are
+        created in bulk and layer attributes are linked to their Odoo attribute.
+        :param attributes: dictionary like {(Magento attribute ID, attribute code): attribute}
+        :param m_attributes: dictionary like {(Magento attribute ID, attribute code): layer attribute}
+        :return: dictionary like {(Magento attribute ID, attribute code): Odoo attribute}
+        """
         p_attribute = self.env['product.attribute']
-        values = self._prepare_attribute_value(attribute, magento_id)
-        return p_attribute.create(values)
+        linked_attributes = {}
+        for o_attribute in p_attribute.search([('magento_attribute_id', 'in',
+                                                [m_attribute.id for m_attribute in m_attributes.values()])]):
+            linked_attributes.setdefault(o_attribute.magento_attribute_id.id, o_attribute)
+        labels = [attributes.get(key).get('default_frontend_label') for key, m_attribute in m_attributes.items()
+                  if m_attribute.id not in linked_attributes]
+        named_attributes = {}
+        if labels:
+            for o_attribute in p_attribute.search([('name', 'in', labels), ('magento_attribute_id', '=', False)]):
+                named_attributes.setdefault(o_attribute.name, o_attribute)
+        o_attributes, missing_keys = {}, []
+        for key, m_attribute in m_attributes.items():
+            o_attribute = linked_attributes.get(m_attribute.id) or \
+                named_attributes.get(attributes.get(key).get('default_frontend_label'))
+            if o_attribute:
+                o_attributes[key] = o_attribute
+            else:
+                missing_keys.append(key)
+        if missing_keys:
+            o_attributes.update(zip(missing_keys, p_attribute.create([
+                self._prepare_attribute_value(attributes.get(key), m_attributes.get(key).id)
+                for key in missing_keys])))
+        m_attributes_by_odoo_attribute = {}
+        for key, m_attribute in m_attributes.items():
+            if m_attribute.odoo_attribute_id != o_attributes.get(key):
+                m_attributes_by_odoo_attribute.setdefault(o_attributes.get(key).id, self.browse())
+                m_attributes_by_odoo_attribute[o_attributes.get(key).id] |= m_attribute
+        for o_attribute_id, m_attribute in m_attributes_by_odoo_attribute.items():
+            m_attribute.write({'odoo_attribute_id': o_attribute_id})
+        return o_attributes
 
     @staticmethod
     def _prepare_attribute_value(attribute, magento_id):
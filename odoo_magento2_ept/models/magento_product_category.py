@@ -5,7 +5,8 @@ Describes methods for importing magento customers into Odoo.
 """
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-from .api_request import req
+from .api_request import req, create_search_criteria
+from ..python_library.php import Php
 
 
 class MagentoProductCategory(models.Model):
@@ -57,49 +58,78 @@ class MagentoProductCategory(models.Model):
         categories = self.get_magento_product_category(instance)
         self.create_magento_category(instance, categories)
 
-    def _get_parent_category(self, instance, category):
-        parent_id = category.get('parent_id', 0)
-        if parent_id:
-            # Search the parent category in magento.product.category
-            category = self.search([('category_id', '=', parent_id),
-                                    ('instance_id', '=', instance.id)], limit=1)
-            if not category:
-                # If the parent category are not available at Odoo we are sending that
-                # specific category response from Magento.
-                # Magento are providing the settings to set the root category by website wise.
-                # So, when we call the /V1/Categories api we will not get the root category
-                # in the response.
-                response = self.get_magento_product_category(instance, parent_id)
-                values = self.prepare_category_values(instance, response)
-                category = self.create(values)
-        return category
-
     def create_magento_category(self, instance, category):
         """
-        Create the category list in odoo
+        Create or update the categories of the tree in bulk. Existing categories of the instance are loaded once,
+        parents which are neither in the tree nor in Odoo are fetched in one request, and categories are created
+        level by level so the parent of each category exists before it.
+        Root categories of the websites are not in the response of /V1/categories, they are fetched as missing
+        parents.
         :param instance: magento.instance object
         :param category: dict categories, If we get multiple categories in the response then
         response will be in list
         :return:
         """
-        parent_category = self._get_parent_category(instance, category)
-        m_category = self.search([('category_id', '=', category.get('id', 0)),
-                                  ('instance_id', '=', instance.id)], limit=1)
-        if not m_category:
-            if parent_category:
-                category.update({'parent_id': parent_category.id})
-            values = self.prepare_category_values(instance, category)
-            self.create(values)
-        else:
-            if parent_category:
-                category.update({'parent_id': parent_category.id})
-            values = self.prepare_category_values(instance, category)
-            m_category.write(values)
-        if category.get('children_data', []):
-            for categ in category.get('children_data'):
-                self.create_magento_category(instance, categ)
+        nodes = self._flatten_category_tree(category)
+        categories = {m_category.category_id: m_category
+                      for m_category in self.search([('instance_id', '=', instance.id)])}
+        missing_parent_ids = {str(node.get('parent_id')) for node in nodes if node.get('parent_id')}
+        missing_parent_ids -= {str(node.get('id')) for node in nodes} | set(categories)
+        if missing_parent_ids:
+            nodes = self._get_magento_categories_by_ids(instance, missing_parent_ids) + nodes
+        while nodes:
+            pending_ids = {str(node.get('id')) for node in nodes}
+            ready = [node for node in nodes if str(node.get('parent_id') or '') not in pending_ids
+                     or str(node.get('parent_id')) == str(node.get('id'))] or nodes
+            vals_list = []
+            for node in ready:
+                parent = categories.get(str(node.get('parent_id') or ''))
+                values = self.prepare_category_values(instance, dict(node, parent_id=parent.id if parent else False))
+                m_category = categories.get(str(node.get('id', 0)))
+                if not m_category:
+                    vals_list.append(values)
+                elif (m_category.name, m_category.is_active, m_category.magento_parent_id.id) != \
+                        (values.get('name'), values.get('is_active'), values.get('magento_parent_id')):
+                    m_category.write(values)
+            for m_category in self.create(vals_list):
+                categories[m_category.category_id] = m_category
+            ready_ids = {str(node.get('id')) for node in ready}
+            nodes = [node for node in nodes if str(node.get('id')) not in ready_ids]
         return True
 
+    @staticmethod
+    def _flatten_category_tree(category):
+        """
+        Flatten the category tree of Magento, parents are listed before their children.
+        :param category: Category dictionary having the children in children_data
+        :return: list of category dictionaries without children
+        """
+        nodes, node_ids, stack = [], set(), [category]
+        while stack:
+            node = stack.pop()
+            if not node or str(node.get('id')) in node_ids:
+                continue
+            node_ids.add(str(node.get('id')))
+            nodes.append({key: value for key, value in node.items() if key != 'children_data'})
+            stack.extend(reversed(node.get('children_data') or []))
+        return nodes
+
+    @staticmethod
+    def _get_magento_categories_by_ids(instance, category_ids):
+        """
+        Get the Magento categories of the IDs with one request.
+        :param instance: Instance record
+        :param category_ids: Magento IDs of the categories
+        :return: list of category dictionaries
+        """
+        filters = {'entity_id': {'in': [int(category_id) for category_id in category_ids]}}
+        search_criteria = create_search_criteria(filters, page_size=len(category_ids))
+        try:
+            response = req(instance, f"/V1/categories/list?{Php.http_build_query(search_criteria)}")
+        except Exception as error:
+            raise UserError(_("Error while requesting Product Category" + str(error)))
+        return response.get('items', []) if isinstance(response, dict) else []
+
     @staticmethod
     def prepare_category_values(instance, category):
         """
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Describes the product prices exported to Magento.
+"""
+import logging
+import re
+from odoo import models, fields
+from odoo.tools import float_compare
+from .api_request import req
+
+_logger = logging.getLogger("MagentoEPT")
+
+# Number of prices sent to Magento in one request.
+PRICE_BATCH_SIZE = 500
+MAGENTO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+PRICE_API_URLS = {
+    'base': '/V1/products/base-prices',
+    'special': '/V1/products/special-price',
+    'special_delete': '/V1/products/special-price-delete',
+}
+
+
+class MagentoProductPriceEpt(models.Model):
+    """
+    Describes the last price exported to Magento for each product, store view and price type. It is used to export
+    only the changed prices.
+    """
+    _name = "magento.product.price.ept"
+    _description = "Magento Exported Product Price"
+
+    magento_instance_id = fields.Many2one(comodel_name='magento.instance', string='Magento Instance',
+                                          required=True, ondelete="cascade", index=True)
+    magento_product_id = fields.Many2one(comodel_name='magento.product.product', string='Magento Product',
+                                         required=True, ondelete="cascade", index=True)
+    store_id = fields.Integer(string="Magento Store View ID", help="0 if price scope is global.")
+    price_type = fields.Selection([('base', 'Base Price'), ('special', 'Special Price')], default='base',
+                                  required=True)
+    price = fields.Float(digits='Product Price')
+    price_from = fields.Datetime(help="Special price is applied from this date.")
+    price_to = fields.Datetime(help="Special price is applied till this date.")
+
+    _sql_constraints = [('unique_magento_product_price', 'unique(magento_product_id,store_id,price_type)',
+                         "Exported price must be unique per product, store view and price type.")]
+
+    def auto_export_product_prices(self):
+        """
+        Called by cron to export the changed prices of all active instances.
+        """
+        for instance in self.env['magento.instance'].search([]):
+            log = instance.create_log_book('magento.product.product', 'export')
+            self.export_product_prices(instance, log=log)
+            if log and not log.log_lines:
+                log.unlink()
+        return True
+
+    def export_product_prices(self, instance, m_products=False, log=False, force=False):
+        """
+        Compute the prices of products for all price scopes of the instance with one pricelist pass, compare it
+        with the last exported prices and export the changed prices to Magento in batches.
+        :param instance: Magento instance
+        :param m_products: Magento products, all synced products of the instance if not passed
+        :param log: log book record
+        :param force: export the prices even if not changed
+        :return: True
+        """
+        if m_products is False:
+            m_products = self.env['magento.product.product'].search([
+                ('magento_instance_id', '=', instance.id), ('sync_product_with_magento', '=', True)])
+        m_products = m_products.filtered(lambda m_product: m_product.magento_sku and m_product.odoo_product_id)
+        if not m_products:
+            return True
+        prices = self._prepare_product_prices(instance, m_products, log)
+        last_prices = self._get_last_exported_prices(instance, m_products)
+        precision = self.env['decimal.precision'].precision_get('Product Price')
+        changed_prices = {'base': [], 'special': []}
+        for key, values in prices.items():
+            last_price = last_prices.get(key)
+            if force or not last_price or float_compare(values.get('price'), last_price.get('price'),
+                                                        precision_digits=precision) or \
+                    values.get('price_from') != last_price.get('price_from') or \
+                    values.get('price_to') != last_price.get('price_to'):
+                changed_prices[values.get('price_type')].append(values)
+        removed_prices = [values for key, values in last_prices.items()
+                          if values.get('price_type') == 'special' and key not in prices]
+        _logger.info("Instance %s has %s changed base prices, %s changed and %s removed special prices "
+                     "out of %s prices.", instance.name, len(changed_prices.get('base')),
+                     len(changed_prices.get('special')), len(removed_prices), len(prices))
+        exported_prices = self._export_prices(instance, 'base', changed_prices.get('base'), log)
+        exported_prices += self._export_prices(instance, 'special', changed_prices.get('special'), log)
+        removed_prices = self._export_prices(instance, 'special_delete', removed_prices, log)
+        self._save_exported_prices(instance, exported_prices, last_prices)
+        self.browse([values.get('id') for values in removed_prices]).unlink()
+        return True
+
+    def _prepare_product_prices(self, instance, m_products, log):
+        """
+        Compute the base and special prices of products for each price scope of the instance. Price of a pricelist
+        is computed once for all products, even if the pricelist is used by many store views.
+        :return: dictionary like {(price type, store ID, Magento product ID): values of price}
+        """
+        prices = {}
+        pricelist_prices = {}
+        products = m_products.mapped('odoo_product_id')
+        for pricelist, special_pricelist, store_id in self._get_price_scopes(instance, log):
+            if pricelist not in pricelist_prices:
+                pricelist_prices[pricelist] = pricelist.get_products_price(
+                    products, [1.0] * len(products), [False] * len(products))
+            if special_pricelist and special_pricelist not in pricelist_prices:
+                pricelist_prices[special_pricelist] = special_pricelist._compute_price_rule(
+                    [(product, 1.0, False) for product in products])
+            for m_product in m_products:
+                product = m_product.odoo_product_id
+                key = (m_product.id, store_id)
+                price = pricelist_prices[pricelist].get(product.id)
+                if price is None:
+                    price = product.list_price
+                prices[('base',) + key] = {'price_type': 'base', 'magento_product_id': m_product.id,
+                                           'sku': m_product.magento_sku, 'store_id': store_id, 'price': price,
+                                           'price_from': False, 'price_to': False}
+                special_price, rule_id = pricelist_prices.get(special_pricelist, {}).get(product.id, (0.0, False))
+                if rule_id:
+                    rule = self.env['product.pricelist.item'].browse(rule_id)
+                    prices[('special',) + key] = {
+                        'price_type': 'special', 'magento_product_id': m_product.id, 'sku': m_product.magento_sku,
+                        'store_id': store_id, 'price': special_price, 'price_from': rule.date_start or False,
+                        'price_to': rule.date_end or False}
+        return prices
+
+    @staticmethod
+    def _get_price_scopes(instance, log):
+        """
+        Find the pricelists and store views of the price scope of the instance.
+        :return: list of tuples (pricelist, special pricelist, Magento store view ID)
+        """
+        scopes = []
+        if instance.catalog_price_scope == 'global':
+            if instance.pricelist_id:
+                scopes.append((instance.pricelist_id, instance.special_pricelist_id, 0))
+            elif log:
+                log.write({
+                    'log_lines': [(0, 0, {
+                        'message': "Price scope is Global, "
+                                   "But still pricelist not set for the Instance : %s" % instance.name
+                    })]
+                })
+            return scopes
+        for website in instance.magento_website_ids:
+            currency = website.magento_base_currency
+            pricelist = website.pricelist_ids.filtered(lambda x: x.currency_id.id == currency.id)[:1]
+            if not pricelist:
+                continue
+            for store_view in website.store_view_ids:
+                scopes.append((pricelist, website.special_pricelist_id, int(store_view.magento_storeview_id)))
+        return scopes
+
+    def _get_last_exported_prices(self, instance, m_products):
+        """
+        Read the last exported prices of the products.
+        :return: dictionary like {(price type, store ID, Magento product ID): values of price}
+        """
+        query = """SELECT id, price_type, magento_product_id, store_id, price, price_from, price_to
+                    FROM magento_product_price_ept
+                    WHERE magento_instance_id = %s AND magento_product_id = ANY(%s)"""
+        self._cr.execute(query, (instance.id, m_products.ids))
+        last_prices = {}
+        sku_dict = {m_product.id: m_product.magento_sku for m_product in m_products}
+        for row in self._cr.dictfetchall():
+            row.update({'sku': sku_dict.get(row.get('magento_product_id')),
+                        'price_from': row.get('price_from') or False, 'price_to': row.get('price_to') or False})
+            last_prices[(row.get('price_type'), row.get('magento_product_id'), row.get('store_id'))] = row
+        return last_prices
+
+    def _export_prices(self, instance, operation, prices, log):
+        """
+        Export the prices to Magento in batches.
+        :param operation: base, special or special_delete
+        :param prices: list of values of price
+        :return: list of values of prices which are exported
+        """
+        exported_prices = []
+        for index in range(0, len(prices), PRICE_BATCH_SIZE):
+            batch = prices[index:index + PRICE_BATCH_SIZE]
+            payload = {'prices': [self._prepare_price_payload(operation, values) for values in batch]}
+            try:
+                response = req(instance, PRICE_API_URLS.get(operation), 'POST', payload, is_raise=True)
+            except Exception as error:
+                if log:
+                    log.write({
+                        'log_lines': [(0, 0, {
+                            'message': f"Not able to update product price. Error : {error}",
+                        })]
+                    })
+                continue
+            failed_skus = self._get_failed_price_skus(response, log)
+            exported_prices += [values for values in batch if values.get('sku') not in failed_skus]
+        return exported_prices
+
+    @staticmethod
+    def _prepare_price_payload(operation, values):
+        price_payload = {'sku': values.get('sku'), 'price': values.get('price'), 'store_id': values.get('store_id')}
+        if operation != 'base':
+            price_payload.update({
+                'price_from': values.get('price_from').strftime(MAGENTO_DATETIME_FORMAT)
+                if values.get('price_from') else '',
+                'price_to': values.get('price_to').strftime(MAGENTO_DATETIME_FORMAT) if values.get('price_to') else ''
+            })
+        return price_payload
+
+    @staticmethod
+    def _get_failed_price_skus(response, log):
+        """
+        Magento returns the list of errors for the prices which are not updated. Placeholders of the error message,
+        like %SKU or %fieldName, name the parameters of the error, which are given as a list in the order of the
+        placeholders or as a dictionary. SKU is read from the SKU parameter, or from the field value when the
+        invalid field is the SKU.
+        :return: set of failed SKUs
+        """
+        failed_skus = set()
+        if not isinstance(response, list):
+            return failed_skus
+        log_lines = []
+        for error in response:
+            message = error.get('message', '')
+            parameters = error.get('parameters') or []
+            if not isinstance(parameters, dict):
+                parameters = dict(zip(re.findall(r'%(\w+)', message), parameters))
+            named_parameters = {str(name).lower(): value for name, value in parameters.items()}
+            sku = named_parameters.get('sku')
+            if not sku and str(named_parameters.get('fieldname', '')).lower() == 'sku':
+                sku = named_parameters.get('fieldvalue')
+            if sku:
+                failed_skus.add(str(sku))
+            for name, value in sorted(parameters.items(), key=lambda item: len(str(item[0])), reverse=True):
+                message = message.replace('%%%s' % name, str(value))
+            log_lines.append((0, 0, {'message': "Not able to update product price. Error : %s" % message}))
+        if log and log_lines:
+            log.write({'log_lines': log_lines})
+        return failed_skus
+
+    def _save_exported_prices(self, instance, exported_prices, last_prices):
+        """
+        Save the exported prices to compare them in the next export. Existing prices with the same values are
+        written together.
+        """
+        vals_list = []
+        write_dict = {}
+        for values in exported_prices:
+            key = (values.get('price_type'), values.get('magento_product_id'), values.get('store_id'))
+            price_vals = {'price': values.get('price'), 'price_from': values.get('price_from'),
+                          'price_to': values.get('price_to')}
+            if key in last_prices:
+                write_dict.setdefault(tuple(price_vals.items()), []).append(last_prices.get(key).get('id'))
+            else:
+                price_vals.update({'magento_instance_id': instance.id, 'price_type': values.get('price_type'),
+                                   'magento_product_id': values.get('magento_product_id'),
+                                   'store_id': values.get('store_id')})
+                vals_list.append(price_vals)
+        for price_vals, price_ids in write_dict.items():
+            self.browse(price_ids).write(dict(price_vals))
+        if vals_list:
+            self.create(vals_list)
+        return True
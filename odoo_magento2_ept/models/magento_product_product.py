@@ -9,10 +9,15 @@ import json
 from datetime import datetime
 from odoo import fields, models, _
 from odoo.exceptions import UserError
+from odoo.addons.common_connector_library.models.data_queue_mixin_ept import commit_queue_line_ept
 from .api_request import req, create_search_criteria
 from ..python_library.php import Php
 
 _logger = logging.getLogger('MagentoEPT')
+# Number of stock items fetched by one request when the product stock is imported.
+STOCK_IMPORT_PAGE_SIZE = 1000
+# Number of products fetched by one request when the products of the queue lines are fetched together.
+PRODUCT_FETCH_PAGE_SIZE = 50
 
 
 class MagentoProductProduct(models.Model):
@@ -370,7 +375,7 @@ class MagentoProductProduct(models.Model):
                 key: line.id
             })]})
             line.queue_id.write({'is_process_queue': False})
-            self._cr.commit()
+            commit_queue_line_ept(self._cr)
             return False
         return True
 
@@ -408,6 +413,32 @@ class MagentoProductProduct(models.Model):
             return self.__verify_product_response(response, ids, line)
         return response
 
+    def get_products_by_ids(self, instance, ids):
+        """
+        Fetch the Magento products of the IDs, PRODUCT_FETCH_PAGE_SIZE products by one request.
+        Products which could not be fetched are missing in the result, so the caller can fall
+        back to get_products, which logs them against the queue line.
+        :param instance: Instance of Magento
+        :param ids: list of Magento product IDs
+        :return: dictionary like {Magento product ID: Magento product}
+        """
+        ids = list(dict.fromkeys(int(product_id) for product_id in ids if product_id))
+        products = {}
+        for index in range(0, len(ids), PRODUCT_FETCH_PAGE_SIZE):
+            page_ids = ids[index:index + PRODUCT_FETCH_PAGE_SIZE]
+            url = f"/V1/products?searchCriteria[filterGroups][0][filters][0][field]=entity_id" \
+                  f"&searchCriteria[filterGroups][0][filters][0][condition_type]=in" \
+                  f"&searchCriteria[filterGroups][0][filters][0][value]={','.join(map(str, page_ids))}" \
+                  f"&searchCriteria[pageSize]={len(page_ids)}"
+            try:
+                response = req(instance, url, is_raise=True)
+            except Exception as error:
+                _logger.error("Products of %s could not be fetched. %s", instance.name, error)
+                continue
+            for item in response.get('items', []) if isinstance(response, dict) else []:
+                products[item.get('id')] = item
+        return products
+
     def __verify_product_response(self, response, ids, line):
         log = line.queue_id.log_book_id
         response_ids = [item.get('id') for item in response]
@@ -529,7 +560,7 @@ class MagentoProductProduct(models.Model):
         """
         This method is used to import product stock from magento,
         when Multi inventory sources is not available.
-        It will create a product inventory.
+        It will create a product inventory, page by page of the stock items.
         :param instance: Instance of Magento
         :param validate_stock: Stock Validation confirmation
         :return: True
@@ -539,15 +570,16 @@ class MagentoProductProduct(models.Model):
         warehouse = instance.import_stock_warehouse
         location = warehouse and warehouse.lot_stock_id
         if location:
-            api_url = '/V1/stockItems/lowStock?scopeId=0&qty=10000000000&pageSize=100000'
-            response = req(instance, api_url)
-            stock_data = self.prepare_import_stock_dict(response, instance)
-            product_qty = stock_data.get('product_qty')
-            consumable = stock_data.get('consumable')
-            if product_qty:
-                name = f'Inventory For Instance "{instance.name}" And Magento Location ' \
-                       f'"{warehouse.name}"'
-                quant.create_inventory_adjustment_ept(product_qty, location, auto_apply, name)
+            name = f'Inventory For Instance "{instance.name}" And Magento Location ' \
+                   f'"{warehouse.name}"'
+            consumable = []
+            for items in self._get_stock_item_pages(instance):
+                stock_data = self.prepare_import_stock_dict({'items': items}, instance)
+                product_qty = stock_data.get('product_qty')
+                if product_qty:
+                    quant.create_inventory_adjustment_ept(product_qty, location, auto_apply, name)
+                consumable += stock_data.get('consumable')
+                self._release_stock_page_cache()
             if consumable:
                 model_id = self.env['common.log.lines.ept'].get_model_id('stock.quant')
                 log = log.create_common_log_book('import', 'magento_instance_id',
@@ -561,7 +593,7 @@ class MagentoProductProduct(models.Model):
         """
         This method is used to import product stock from magento,
         when Multi inventory sources is available.
-        It will create a product inventory.
+        It will create a product inventory, page by page of the source items.
         :param instance: Instance of Magento
         :param auto_apply: Stock Validation confirmation
         :param m_locations: Magento products object
@@ -575,17 +607,14 @@ class MagentoProductProduct(models.Model):
                 warehouse = m_location.import_stock_warehouse
                 location = warehouse and warehouse.lot_stock_id
                 if location:
-                    search_criteria = create_search_criteria(
-                        {'source_code': m_location.magento_location_code})
-                    query_string = Php.http_build_query(search_criteria)
-                    api_url = f'/V1/inventory/source-items?{query_string}'
-                    response = req(instance, api_url)
-                    stock_data = self.prepare_import_stock_dict(response, instance)
                     name = f'Inventory For Instance "{instance.name}" And Magento Location ' \
                            f'"{warehouse.name}"'
-                    quant.create_inventory_adjustment_ept(stock_data.get('product_qty'), location,
-                                                          auto_apply, name)
-                    consumable += stock_data.get('consumable')
+                    for items in self._get_stock_item_pages(instance, m_location.magento_location_code):
+                        stock_data = self.prepare_import_stock_dict({'items': items}, instance)
+                        quant.create_inventory_adjustment_ept(stock_data.get('product_qty'), location,
+                                                              auto_apply, name)
+                        consumable += stock_data.get('consumable')
+                        self._release_stock_page_cache()
                 else:
                     raise UserError(
                         _("Please Choose Import product stock location for {m_location.name}"))
@@ -596,9 +625,47 @@ class MagentoProductProduct(models.Model):
                 self.create_consumable_products_log(consumable, log)
         return log
 
+    @staticmethod
+    def _get_stock_item_pages(instance, source_code=False):
+        """
+        Fetch the stock items from Magento page by page, so the stock of a big catalogue is never loaded in
+        one response.
+        :param instance: Instance of Magento
+        :param source_code: Code of the Magento source, source items of it are fetched with MSI
+        :return: generator of the lists of stock items
+        """
+        page = 1
+        while True:
+            if source_code:
+                search_criteria = create_search_criteria({'source_code': source_code},
+                                                         page_size=STOCK_IMPORT_PAGE_SIZE, page=page)
+                api_url = f'/V1/inventory/source-items?{Php.http_build_query(search_criteria)}'
+            else:
+                api_url = f'/V1/stockItems/lowStock?scopeId=0&qty=10000000000&pageSize={STOCK_IMPORT_PAGE_SIZE}' \
+                          f'&currentPage={page}'
+            response = req(instance, api_url)
+            response = response if isinstance(response, dict) else {}
+            items = response.get('items') or []
+            if items:
+                yield items
+            total_count = response.get('total_count') or 0
+            # Magento returns the last page again for a page after it, so the total count is checked too.
+            if len(items) < STOCK_IMPORT_PAGE_SIZE or page * STOCK_IMPORT_PAGE_SIZE >= int(total_count):
+                break
+            page += 1
+
+    def _release_stock_page_cache(self):
+        """
+        Write the pending changes of a page of stock items and clear the cache, so records of the previous
+        pages do not stay in memory.
+        """
+        self.flush()
+        self.invalidate_cache()
+
     def prepare_import_stock_dict(self, response, instance):
         """
         Prepare dictionary for import product stock from response.
+        Magento products of the stock items are searched with one query.
         :param response: response received from Magento
         :param instance: Magento Instance object
         :param consumable: Dictionary of consumable products
@@ -607,8 +674,12 @@ class MagentoProductProduct(models.Model):
         """
         consumable, product_qty = [], {}
         items = response.get('items', [])
+        m_products = self.search_magento_products(instance, items)
         for item in items:
-            m_product = self.search_magento_product(instance, item)
+            if instance.is_multi_warehouse_in_magento:
+                m_product = m_products.get(item.get('sku', '') or '')
+            else:
+                m_product = m_products.get(str(item.get('product_id', 0) or 0))
             if m_product:
                 if instance.is_multi_warehouse_in_magento:
                     qty = item.get('quantity', 0) or 0
@@ -623,6 +694,27 @@ class MagentoProductProduct(models.Model):
             'product_qty': product_qty
         }
 
+    def search_magento_products(self, instance, items):
+        """
+        Search the Magento products of the stock items.
+        :param instance: Instance of Magento
+        :param items: list of stock items
+        :return: dictionary like {SKU or Magento product ID: Magento product}
+        """
+        if instance.is_multi_warehouse_in_magento:
+            field = 'magento_sku'
+            keys = list({item.get('sku', '') or '' for item in items})
+        else:
+            field = 'magento_product_id'
+            keys = list({str(item.get('product_id', 0) or 0) for item in items})
+        m_products = self.search([('magento_instance_id', '=', instance.id), ('magento_website_ids', '!=', False),
+                                  (field, 'in', keys)])
+        m_products_by_key = {}
+        for m_product in m_products:
+            # Same as the search of one product, the first product of the order is used for a key.
+            m_products_by_key.setdefault(m_product[field], m_product)
+        return m_products_by_key
+
     def search_magento_product(self, instance, item):
         """Create product search domain and search magento product
         :param: instance : instance object
@@ -674,8 +766,8 @@ class MagentoProductProduct(models.Model):
 
     def exp_prd_stock_in_batches(self, stock_data, instance, api_url, data_key, method, job):
         """
-        Export product stock in a bunch of 100 items.
-        :param stock_data: dictionary for stock data
+        Export product stock in batches of the export stock batch size of the instance.
+        :param stock_data: list of stock data
         :param instance: magento instance object
         :param api_url: export stock API url
         :param data_key: API dictionary key
@@ -684,12 +776,10 @@ class MagentoProductProduct(models.Model):
         :return: common log book object
         """
         stock_queue_obj = self.env['magento.export.stock.queue.ept']
-        batch_size = 0
-        for batch in range(0, len(stock_data) + 1, instance.batch_size):
-            batch_size += instance.batch_size
-            data = {data_key: stock_data[batch: batch_size]}
-            if data:
-                stock_queue_obj.create_export_stock_queues(instance, data)
+        batch_size = instance.get_export_stock_batch_size()
+        for start in range(0, len(stock_data), batch_size):
+            data = {data_key: stock_data[start:start + batch_size]}
+            stock_queue_obj.create_export_stock_queues(instance, data)
         return True
 
     @staticmethod
@@ -707,6 +797,9 @@ class MagentoProductProduct(models.Model):
             responses = req(instance=instance, path=api_url, method=method, data=data)
         except Exception as error:
             raise UserError(_("Error while Export product stock " + str(error)))
+        if isinstance(responses, str):
+            # Internal server error of Magento is returned as text.
+            raise UserError(_("Error while Export product stock " + responses))
         if responses:
             messages = []
             for response in responses:
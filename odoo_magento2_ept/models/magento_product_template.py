@@ -251,9 +251,11 @@ class MagentoProductTemplate(models.Model):
     def _update_variant_sku(self, line, m_template, item, child_products, data):
         o_template = m_template.odoo_product_template_id
         variants = self.env['product.product'].search([('product_tmpl_id', '=', o_template.id)])
+        children = self.__get_child_index(child_products)
+        pricelist_prices = {}
         for variant in variants:
             value_ids = variant.product_template_variant_value_ids
-            child = self.__find_child(value_ids, child_products)
+            child = children.get(frozenset(value_ids.mapped('product_attribute_value_id').ids), dict())
             if child:
                 variant.write({
                     'default_code': child.get('simple_product_sku', '')
@@ -262,21 +264,23 @@ class MagentoProductTemplate(models.Model):
                 prices = child.get('website_wise_product_price_data', list())
                 if 'is_order' not in list(self.env.context.keys()):
                     if not line.do_not_update_existing_product and variant:
-                        self.update_price_list(line, variant, prices)
+                        self.prepare_price_list_prices(line, variant, prices, pricelist_prices)
+        self.set_price_list_prices(pricelist_prices)
         return True
 
     @staticmethod
-    def __find_child(value_ids, child_products):
-        value_ids = value_ids.mapped('product_attribute_value_id').ids
+    def __get_child_index(child_products):
+        """
+        Index the child products by the attribute values, so each variant finds its child at once.
+        :param child_products: list of child products of the configurable product
+        :return: dictionary like {frozenset(attribute value IDs): child product}
+        """
+        children = dict()
         for child in child_products:
-            child_values = list()
-            for attribute in child.get('simple_product_attribute'):
-                child_values.append(attribute.get('value_id'))
-            child_values.sort()
-            value_ids.sort()
-            if len(child_values) == len(value_ids) and child_values == value_ids:
-                return child
-        return dict()
+            value_ids = [attribute.get('value_id') for attribute in child.get('simple_product_attribute')]
+            # Same as the search of the child, the first child having the values is used.
+            children.setdefault(frozenset(value_ids), child)
+        return children
 
     def __add_variant(self, template, data):
         line = self.env['product.template.attribute.line']
@@ -485,32 +489,55 @@ class MagentoProductTemplate(models.Model):
         return values
 
     def update_price_list(self, line, product, prices):
-        website = self.env['magento.website']
-        instance = line.instance_id
         # If customer has not selected the "do_not_update_existing_product"
         # It means that we have to update the product price list.
-        # for price in item.get('website_wise_product_price_data'):
+        pricelist_prices = self.prepare_price_list_prices(line, product, prices)
+        return self.set_price_list_prices(pricelist_prices)
+
+    def prepare_price_list_prices(self, line, product, prices, pricelist_prices=None):
+        """
+        Collect the prices of the product by price list, so the prices of many products are set
+        in the price lists together.
+        :param line: product or order queue line
+        :param product: product.product()
+        :param prices: website wise prices of the product received from Magento
+        :param pricelist_prices: dictionary like {price list: {product ID: price}} to update
+        :return: dictionary like {price list: {product ID: price}}
+        """
+        website = self.env['magento.website']
+        instance = line.instance_id
+        pricelist_prices = {} if pricelist_prices is None else pricelist_prices
         for price in prices:
             if instance.catalog_price_scope == 'global':
-                instance.pricelist_id.set_product_price_ept(product.id, price.get('price'),
-                                                            min_qty=1)
+                pricelist_prices.setdefault(instance.pricelist_id, {})[product.id] = price.get('price')
             else:
                 website = website.search([('magento_instance_id', '=', instance.id),
                                           ('magento_website_id', '=', price.get('website_id'))],
                                          limit=1)
-                self.__set_price_list_item(product, price, website)
+                self.__prepare_price_list_item(product, price, website, pricelist_prices)
+        return pricelist_prices
+
+    @staticmethod
+    def set_price_list_prices(pricelist_prices):
+        """
+        Set the collected prices in the price lists, one bulk update for each price list.
+        :param pricelist_prices: dictionary like {price list: {product ID: price}}
+        :return: True
+        """
+        for pricelist, product_prices in pricelist_prices.items():
+            pricelist.set_product_prices_ept(product_prices, min_qty=1)
         return True
 
     @staticmethod
-    def __set_price_list_item(product, price, website):
+    def __prepare_price_list_item(product, price, website, pricelist_prices):
         price_lists = website.pricelist_ids.filtered(
             lambda p: p.currency_id.name == price.get('default_store_currency'))
         cost_price_list = website.cost_pricelist_id.filtered(
             lambda p: p.currency_id.name == price.get('default_store_currency'))
         for price_list in price_lists:
-            price_list.set_product_price_ept(product.id, price.get('price'), min_qty=1)
+            pricelist_prices.setdefault(price_list, {})[product.id] = price.get('price')
         if cost_price_list and price.get('cost_price'):
-            cost_price_list.set_product_price_ept(product.id, price.get('cost_price'), min_qty=1)
+            pricelist_prices.setdefault(cost_price_list, {})[product.id] = price.get('cost_price')
         return True
 
     def prepare_attribute_line_data(self, configurable_options):
@@ -1207,26 +1234,6 @@ class MagentoProductTemplate(models.Model):
         req(instance, api_url, 'PUT', data, is_raise=True)
         return True
 
-    @staticmethod
-    def update_product_base_price(instance, url, common_log_id, price_payload):
-        """
-        Update product basic price in magento
-        :param instance: Magento Instance
-        :param url: API URL
-        :param common_log_id: Common log book record
-        :param price_payload: price body
-        :return:
-        """
-        try:
-            req(instance, url, 'POST', price_payload, is_raise=True)
-        except Exception as error:
-            common_log_id.write({
-                'log_lines': [(0, 0, {
-                    'message': f"Not able to update product price. Error : {error}",
-                })]
-            })
-        return True
-
     def prepare_export_stock_data(self, product_stock, instance, log, layer_ids, source_code=False,
                                   msi=False):
         """
@@ -8,7 +8,7 @@ import time
 from datetime import datetime
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-from .api_request import req, create_search_criteria
+from .api_request import req, create_search_criteria, get_search_fields
 from ..python_library.php import Php
 
 MAGENTO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
@@ -19,7 +19,7 @@ class MagentoOrderDataQueueEpt(models.Model):
     Describes Magento Order Data Queue
     """
     _name = "magento.order.data.queue.ept"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'queue.lease.mixin.ept']
     _description = "Magento Order Data Queue EPT"
 
     name = fields.Char(help="Sequential name of imported order.", copy=False)
@@ -55,6 +55,9 @@ class MagentoOrderDataQueueEpt(models.Model):
     is_action_require = fields.Boolean(default=False)
     process_count = fields.Integer(string="Queue Process Times", default=0,
                                    help="It is used know queue how many time processed")
+    priority = fields.Selection([('0', 'Backfill'), ('1', 'Normal'), ('2', 'High')], default='1', copy=False,
+                                help="Queues of higher priority are processed first, like orders imported by "
+                                     "webhook or specific orders are processed before the historical orders.")
 
     @api.depends('line_ids.state')
     def _compute_queue_state(self):
@@ -105,16 +108,17 @@ class MagentoOrderDataQueueEpt(models.Model):
         vals.update({'name': record_name or ''})
         return super(MagentoOrderDataQueueEpt, self).create(vals)
 
-    def _create_order_queue(self, instance):
+    def _create_order_queue(self, instance, priority='1'):
         """
         Creates Imported Magento orders queue
         :param instance: Instance of Magento
+        :param priority: Priority of the queue
         :return: Magento order Data queue object
         """
-        queue = self.search([('instance_id', '=', instance.id), ('state', '=', 'draft')])
+        queue = self.search([('instance_id', '=', instance.id), ('state', '=', 'draft'), ('priority', '=', priority)])
         queue = queue.filtered(lambda q: len(q.line_ids) < 50)
         if not queue:
-            queue = self.create({'instance_id': instance.id})
+            queue = self.create({'instance_id': instance.id, 'priority': priority})
             message = "Order Queue #{} Created!!".format(queue.name)
             instance.show_popup_notification(message)
         return queue[0]
@@ -122,6 +126,7 @@ class MagentoOrderDataQueueEpt(models.Model):
     def create_order_queues(self, **kwargs):
         queue_line = self.env['magento.order.data.queue.line.ept']
         instance = kwargs.get('instance')
+        priority = kwargs.pop('priority', '1')
         page_size = 200
         queue_ids = list()
         orders = self._get_order_response(instance, kwargs, True)
@@ -138,17 +143,18 @@ class MagentoOrderDataQueueEpt(models.Model):
                 instance.show_popup_notification(message)
         page = page if kwargs.get('is_manual') else instance.magento_import_order_page_count
         for page in range(1, page + 1):
-            kwargs.update({'page': page, 'page_size': page_size})
+            # Only the fields of the queue line are fetched, full orders are fetched when the lines are processed.
+            kwargs.update({'page': page, 'page_size': page_size, 'fields': get_search_fields('order_queue')})
             orders = self._get_order_response(instance, kwargs)
             if orders.get('items'):
-                queue = self._create_order_queue(instance)
+                queue = self._create_order_queue(instance, priority)
                 queue_ids.append(queue.id)
                 for order in orders.get('items'):
                     if len(queue.line_ids) == 50:
                         self._cr.commit()
-                        queue = self._create_order_queue(instance)
+                        queue = self._create_order_queue(instance, priority)
                         queue_ids.append(queue.id)
-                    queue_line.create_order_queue_line(instance, order, queue)
+                    queue_line.create_order_queue_line(instance, order, queue, is_partial_data=True)
             instance.write({'magento_import_order_page_count': page})
         if not kwargs.get('is_manual'):
             instance.write({'magento_import_order_page_count': 1})
@@ -200,11 +206,11 @@ class MagentoOrderDataQueueEpt(models.Model):
             except Exception as error:
                 raise UserError(_("Error while requesting Orders - %s", str(error)))
             for order in order.get('items'):
-                queue = self._create_order_queue(instance)
+                queue = self._create_order_queue(instance, '2')
                 queue_ids.append(queue.id)
                 if len(queue.line_ids) == 50:
                     self._cr.commit()
-                    queue = self._create_order_queue(instance)
+                    queue = self._create_order_queue(instance, '2')
                     queue_ids.append(queue.id)
                 queue_line.create_order_queue_line(instance, order, queue)
         return queue_ids
@@ -220,6 +226,9 @@ class MagentoOrderDataQueueEpt(models.Model):
         for queue in self.filtered(lambda q: q.state not in ['completed']):
             cron_name = f"{queue._module}.magento_ir_cron_parent_to_process_order_queue_data"
             process_cron_time = queue.instance_id.get_magento_cron_execution_time(cron_name)
+            # Skip the queue if another worker is processing it.
+            if not queue.claim_queue_lease_ept(lease_duration=process_cron_time):
+                continue
             # To maintain that current queue has started to process.
             queue.write({'is_process_queue': True})
             self._cr.commit()
@@ -235,21 +244,27 @@ class MagentoOrderDataQueueEpt(models.Model):
                 queue.instance_id.create_schedule_activity(queue=queue, note=note)
                 domain.remove('failed')
                 queue.write({'is_process_queue': False})
+                queue.release_queue_lease_ept()
                 return True
             lines = queue.line_ids.filtered(lambda l: l.state in domain)
-            for line in lines:
-                is_processed = line.process_order_queue_line(line, log)
-                if is_processed:
-                    line.write({'state': 'done', 'processed_at': datetime.now()})
-                else:
-                    line.write({'state': 'failed', 'processed_at': datetime.now()})
-                self._cr.commit()
+            lines.fetch_full_order_data()
+            with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(
+                    timestamp_field='processed_at', lease_records=queue) as batch:
+                for line in lines:
+                    is_processed, error = batch.process_line(line.process_order_queue_line, line, log)
+                    if error:
+                        batch.add_log_line({'message': f"Order {line.magento_id} could not be processed. {error}",
+                                            'order_ref': line.magento_id, 'log_book_id': log.id,
+                                            'magento_order_data_queue_line_id': line.id})
+                    batch.write_line_values(line, {'state': 'done' if is_processed else 'failed'})
+                    batch.commit_if_needed()
             message = "Order Queue #{} Processed!!".format(queue.name)
             queue.instance_id.show_popup_notification(message)
             if not log.log_lines:
                 log.sudo().unlink()
             # To maintain that current queue process are completed and new queue will be executed.
             queue.write({'is_process_queue': False})
+            queue.release_queue_lease_ept()
             self._cr.commit()
             if time.time() - start > process_cron_time - 60:
                 return True
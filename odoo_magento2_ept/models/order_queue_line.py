@@ -6,10 +6,18 @@ Describes methods to store Order Data queue line
 import json
 import pytz
 import time
+import logging
 from odoo import models, fields, _
+from odoo.addons.common_connector_library.models.queue_stage_timing_ept import time_queue_line_ept, \
+    queue_stage_ept
 from dateutil import parser
+from .api_request import req, create_search_criteria
+from ..python_library.php import Php
 
 utc = pytz.utc
+_logger = logging.getLogger("MagentoOrderQueueLine")
+# Number of full orders fetched by one request when the queue lines are processed.
+ORDER_FETCH_PAGE_SIZE = 50
 
 
 class MagentoOrderDataQueueLineEpt(models.Model):
@@ -19,6 +27,8 @@ class MagentoOrderDataQueueLineEpt(models.Model):
     _name = "magento.order.data.queue.line.ept"
     _description = "Magento Order Data Queue Line EPT"
     _rec_name = "magento_id"
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_entity_field = "magento_id"
 
     queue_id = fields.Many2one(comodel_name="magento.order.data.queue.ept", ondelete="cascade")
     instance_id = fields.Many2one(comodel_name='magento.instance', string='Magento Instance',
@@ -29,11 +39,21 @@ class MagentoOrderDataQueueLineEpt(models.Model):
     sale_order_id = fields.Many2one(comodel_name="sale.order", copy=False,
                                     help="Order created in Odoo.")
     data = fields.Text(help="Data imported from Magento of current order.", copy=False)
+    is_partial_data = fields.Boolean(string="Partial Data", copy=False,
+                                     help="Only the fields of the queue are stored, the full order is fetched from "
+                                          "Magento when the line is processed.")
     processed_at = fields.Datetime(string="Processed At", copy=False,
                                    help="Shows Date and Time, When the data is processed")
     log_lines_ids = fields.One2many("common.log.lines.ept", "magento_order_data_queue_line_id",
                                     help="Log lines created against which line.")
 
+    def init(self):
+        """
+        Creates the partial index to select the queues having draft lines.
+        """
+        self._cr.execute(f"""CREATE INDEX IF NOT EXISTS {self._table}_draft_queue_id_index
+                             ON {self._table} (queue_id) WHERE state = 'draft'""")
+
     def open_sale_order(self):
         """
         call this method while click on > Order Data Queue line > Sale Order smart button
@@ -48,25 +68,70 @@ class MagentoOrderDataQueueLineEpt(models.Model):
             'domain': [('id', '=', self.sale_order_id.id)]
         }
 
-    def create_order_queue_line(self, instance, order, queue):
+    def create_order_queue_line(self, instance, order, queue, is_partial_data=False):
         self.create({
             'magento_id': order.get('increment_id'),
             'instance_id': instance.id,
             'data': json.dumps(order),
+            'is_partial_data': is_partial_data,
             'queue_id': queue.id
         })
         return True
 
+    def fetch_full_order_data(self):
+        """
+        Fetch the full orders of the lines having partial data, ORDER_FETCH_PAGE_SIZE orders by one request.
+        Lines of which the order could not be fetched keep the partial data and fail when they are processed.
+        :return: True
+        """
+        lines = self.filtered(lambda l: l.is_partial_data)
+        for instance in lines.instance_id:
+            instance_lines = lines.filtered(lambda l: l.instance_id == instance)
+            for index in range(0, len(instance_lines), ORDER_FETCH_PAGE_SIZE):
+                page_lines = instance_lines[index:index + ORDER_FETCH_PAGE_SIZE]
+                lines_by_id = {json.loads(line.data).get('entity_id'): line for line in page_lines}
+                filters = {'entity_id': {'in': list(lines_by_id.keys())}}
+                search_criteria = create_search_criteria(filters, page_size=len(lines_by_id))
+                try:
+                    response = req(instance, f"/V1/orders?{Php.http_build_query(search_criteria)}", is_raise=True)
+                except Exception as error:
+                    _logger.error("Orders of %s could not be fetched. %s", instance.name, error)
+                    continue
+                for order in response.get('items', []) if isinstance(response, dict) else []:
+                    line = lines_by_id.get(order.get('entity_id'))
+                    if line:
+                        line.write({'data': json.dumps(order), 'is_partial_data': False})
+        return True
+
     def auto_import_order_queue_data(self):
         """
         This method used to process synced magento order data in batch of 50 queue lines.
         This method is called from cron job.
         """
-        queues = self.instance_id.get_draft_queues(model='magento_order_data_queue_line_ept',
-                                                   name=self.queue_id._name)
+        instance = self.env['magento.instance']
+        start = time.time()
+        queues = instance.get_queues_to_process(
+            self._name, 'odoo_magento2_ept.magento_ir_cron_parent_to_process_order_queue_data')
         queues.process_order_queues()
+        instance.update_queue_line_seconds(queues, start)
 
     def process_order_queue_line(self, line, log):
+        """
+        Create the sale order of the queue line, time of each stage is recorded if stage timing is enabled.
+        :param line: order queue line
+        :param log: log book record
+        :return: True if the order is processed
+        """
+        with time_queue_line_ept(line, line.instance_id):
+            return self._process_order_queue_line(line, log)
+
+    def _process_order_queue_line(self, line, log):
+        if line.is_partial_data:
+            log.write({'log_lines': [(0, 0, {
+                'message': _(f"Order #{line.magento_id} could not be fetched from Magento."),
+                'order_ref': line.magento_id, 'magento_order_data_queue_line_id': line.id
+            })]})
+            return False
         item = json.loads(line.data)
         order_ref = item.get('increment_id')
         order = self.env['sale.order']
@@ -90,27 +155,30 @@ class MagentoOrderDataQueueLineEpt(models.Model):
                 'magento_order_data_queue_line_id': line.id
             })]})
             return False
-        is_processed = self.financial_status_config(item, instance, log, line)
+        with queue_stage_ept(self.env, 'financial_status'):
+            is_processed = self.financial_status_config(item, instance, log, line)
         if is_processed:
             carrier = self.env['delivery.carrier']
-            is_processed = carrier.find_delivery_carrier(item, instance, log, line)
+            with queue_stage_ept(self.env, 'carrier'):
+                is_processed = carrier.find_delivery_carrier(item, instance, log, line)
             if is_processed:
                 # add create product method
                 item_ids = self.__prepare_product_dict(item.get('items'))
                 m_product = self.env['magento.product.product']
-                p_items = m_product.with_context(is_order=True).get_products(instance, item_ids, line)
-
-                order_item = self.env['sale.order.line'].find_order_item(item, instance, log, line.id)
-                if not order_item:
-                    if p_items:
-                        p_queue = self.env['sync.import.magento.product.queue.line']
-                        self._update_product_type(p_items, item)
-                        for p_item in p_items:
-                            is_processed = p_queue.with_context(is_order=True).import_products(p_item, line)
-                            if not is_processed:
-                                break
-                    else:
-                        is_processed = False
+                with queue_stage_ept(self.env, 'product_sync'):
+                    p_items = m_product.with_context(is_order=True).get_products(instance, item_ids, line)
+
+                    order_item = self.env['sale.order.line'].find_order_item(item, instance, log, line.id)
+                    if not order_item:
+                        if p_items:
+                            p_queue = self.env['sync.import.magento.product.queue.line']
+                            self._update_product_type(p_items, item)
+                            for p_item in p_items:
+                                is_processed = p_queue.with_context(is_order=True).import_products(p_item, line)
+                                if not is_processed:
+                                    break
+                        else:
+                            is_processed = False
                 if is_processed:
                     is_processed = order.create_sale_order_ept(item, instance, log, line.id)
                     if is_processed:
@@ -8,7 +8,7 @@ import logging
 import time
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-from .api_request import req, create_search_criteria
+from .api_request import req, create_search_criteria, get_search_fields
 from ..python_library.php import Php
 
 _logger = logging.getLogger('MagentoProductQueue')
@@ -19,7 +19,7 @@ class MagentoProductQueue(models.Model):
     Describes sync/ Import product queues.
     """
     _name = "sync.import.magento.product.queue"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'queue.lease.mixin.ept']
     _description = "Sync/ Import Product Queue"
 
     name = fields.Char(help="Sequential name of imported/ Synced products.", copy=False)
@@ -192,10 +192,13 @@ class MagentoProductQueue(models.Model):
 
     @staticmethod
     def _get_product_response(instance, filters, page=1, get_pages=False):
-        s_fields = []
         if get_pages:
             page = 1
-            s_fields.append('total_count')
+            s_fields = ['total_count']
+        elif instance.allow_import_image_of_products:
+            s_fields = get_search_fields('product', 'product_images')
+        else:
+            s_fields = get_search_fields('product')
         search_criteria = create_search_criteria(filters, page_size=50, page=page, fields=s_fields)
         query_string = Php.http_build_query(search_criteria)
         api_url = f'/V1/products?{query_string}'
@@ -269,8 +272,9 @@ class MagentoProductQueue(models.Model):
         for queue in self.filtered(lambda q: q.state not in ['completed']):
             cron_name = f"{queue._module}.ir_cron_parent_to_process_product_queue_data"
             process_cron_time = queue.instance_id.get_magento_cron_execution_time(cron_name)
-            # To maintain that current queue has started to process.
-            self._cr.commit()
+            # Skip the queue if another worker is processing it.
+            if not queue.claim_queue_lease_ept(lease_duration=process_cron_time):
+                continue
             log = queue.log_book_id
             if not log:
                 log = queue.instance_id.create_log_book(model=queue._name)
@@ -294,6 +298,7 @@ class MagentoProductQueue(models.Model):
                 log.sudo().unlink()
             # To maintain that current queue process are completed and new queue will be executed.
             queue.write({'is_process_queue': False})
+            queue.release_queue_lease_ept()
             self._cr.commit()
             if time.time() - start > process_cron_time - 60:
                 return True
@@ -3,9 +3,12 @@
 """
 Describes methods to store sync/ Import product queue line
 """
+import copy
 import json
+import time
 from datetime import datetime
 from odoo import models, fields, _
+from odoo.addons.common_connector_library.models.data_queue_mixin_ept import commit_queue_line_ept
 
 
 class MagentoProductQueueLine(models.Model):
@@ -15,6 +18,8 @@ class MagentoProductQueueLine(models.Model):
     _name = "sync.import.magento.product.queue.line"
     _description = "Sync/ Import Product Queue Line"
     _rec_name = "product_sku"
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_entity_field = "product_sku"
     queue_id = fields.Many2one(comodel_name="sync.import.magento.product.queue", ondelete="cascade")
     instance_id = fields.Many2one(comodel_name='magento.instance',
                                   string='Instance',
@@ -32,6 +37,13 @@ class MagentoProductQueueLine(models.Model):
                                                          "odoo/magento layer, then not "
                                                          "update the Product(s)")
 
+    def init(self):
+        """
+        Creates the partial index to select the queues having draft lines.
+        """
+        self._cr.execute(f"""CREATE INDEX IF NOT EXISTS {self._table}_draft_queue_id_index
+                             ON {self._table} (queue_id) WHERE state = 'draft'""")
+
     def create_product_queue_line(self, **kwargs):
         values = self.__prepare_product_queue_line_values(**kwargs)
         return self.create(values)
@@ -66,23 +78,51 @@ class MagentoProductQueueLine(models.Model):
         This method used to process synced magento product data in batch of 50 queue lines.
         This method is called from cron job.
         """
-        queues = self.instance_id.get_draft_queues(model='sync_import_magento_product_queue_line',
-                                                   name=self.queue_id._name)
+        instance = self.env['magento.instance']
+        start = time.time()
+        queues = instance.get_queues_to_process(
+            self._name, 'odoo_magento2_ept.ir_cron_parent_to_process_product_queue_data')
         queues.process_product_queues()
+        instance.update_queue_line_seconds(queues, start)
         return True
 
     def process_queue_line(self):
+        parents = self._get_parent_products()
         for line in self:
             item = json.loads(line.data)
-            is_processed = self.import_products(item, line)
+            is_processed = self.import_products(item, line, parents)
             if is_processed:
                 line.write({'state': 'done', 'processed_at': datetime.now()})
             else:
                 line.write({'state': 'failed', 'processed_at': datetime.now()})
+            # Lease of the queue is renewed, so another worker does not claim it while it is processed.
+            line.queue_id.renew_queue_lease_ept()
             self._cr.commit()
         return True
 
-    def import_products(self, item, line):
+    def _get_parent_products(self):
+        """
+        Fetch the configurable products of the child products of the lines by one request for
+        each instance, instead of one request for each line.
+        :return: dictionary like {Magento product ID: Magento product}
+        """
+        m_product = self.env['magento.product.product']
+        parents = {}
+        items = {line: json.loads(line.data) for line in self}
+        for instance in self.instance_id:
+            child_items = {line: item for line, item in items.items() if line.instance_id == instance
+                           and item.get('type_id') == 'simple'
+                           and item.get('extension_attributes', {}).get('simple_parent_id')}
+            child_ids = [str(item.get('id')) for item in child_items.values()]
+            synced_ids = set(m_product.search([('magento_product_id', 'in', child_ids)]).mapped('magento_product_id'))
+            parent_ids = [item.get('extension_attributes').get('simple_parent_id')
+                          for line, item in child_items.items()
+                          if str(item.get('id')) not in synced_ids or line.do_not_update_existing_product]
+            if parent_ids:
+                parents.update(m_product.get_products_by_ids(instance, parent_ids))
+        return parents
+
+    def import_products(self, item, line, parents=None):
         instance = line.instance_id
         m_product = self.env['magento.product.product']
         attribute = item.get('extension_attributes', {})
@@ -92,7 +132,12 @@ class MagentoProductQueueLine(models.Model):
                 if not m_product or 'is_order' in list(self.env.context.keys()) or line.do_not_update_existing_product:
                     # This case only runs when we get the simple product which are used as an
                     # Child product of any configurable product in Magento.
-                    items = m_product.get_products(instance, [attribute.get('simple_parent_id')], line)
+                    parent_id = int(attribute.get('simple_parent_id'))
+                    if parents and parent_id in parents:
+                        # The import updates the response, so each line imports its own copy.
+                        items = [copy.deepcopy(parents.get(parent_id))]
+                    else:
+                        items = m_product.get_products(instance, [parent_id], line)
                     for item in items:
                         return m_product.import_configurable_product(line, item)
             else:
@@ -127,6 +172,6 @@ class MagentoProductQueueLine(models.Model):
                                              log_id=line.queue_id.log_book_id.id,
                                              order_ref=item.get('increment_id', ''))
             line.queue_id.write({'is_process_queue': False})
-            self._cr.commit()
+            commit_queue_line_ept(self._cr)
             return False
         return True
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Describes Magento fields and methods of the sale dashboard rollup.
+"""
+from odoo import models, fields
+
+MAGENTO_ROLLUP_QUERIES = [
+    ('so.date_order', """
+        SELECT so.magento_instance_id AS instance_id, so.magento_website_id AS website_id,
+            date(so.date_order) AS rollup_date, count(so.id) AS order_count,
+            sum(so.amount_untaxed) AS amount_untaxed
+            FROM sale_order AS so
+            WHERE so.magento_instance_id IS NOT NULL AND so.state in ('sale', 'done') {day_clause}
+            GROUP BY 1, 2, 3
+    """),
+    ('so.date_order', """
+        SELECT so.magento_instance_id AS instance_id, so.magento_website_id AS website_id,
+            date(so.date_order) AS rollup_date, count(DISTINCT so.id) AS shipped_order_count
+            FROM stock_picking AS sp
+                JOIN sale_order AS so
+                    ON sp.sale_id = so.id
+                JOIN stock_location AS sl
+                    ON sl.id = sp.location_dest_id
+            WHERE sp.is_magento_picking = True AND sp.state = 'done' AND sl.usage = 'customer'
+                AND so.magento_instance_id IS NOT NULL {day_clause}
+            GROUP BY 1, 2, 3
+    """),
+    ('am.date', """
+        SELECT am.magento_instance_id AS instance_id, so_website.magento_website_id AS website_id,
+            am.date AS rollup_date, count(am.id) AS refund_count
+            FROM account_move AS am
+                LEFT JOIN LATERAL (
+                    SELECT so.magento_website_id
+                        FROM account_move_line AS aml
+                            JOIN sale_order_line_invoice_rel AS rel
+                                ON rel.invoice_line_id = aml.id
+                            JOIN sale_order_line AS sol
+                                ON rel.order_line_id = sol.id
+                            JOIN sale_order AS so
+                                ON so.id = sol.order_id
+                        WHERE aml.move_id = am.id
+                        LIMIT 1
+                ) AS so_website ON TRUE
+            WHERE am.move_type = 'out_refund' AND am.magento_instance_id IS NOT NULL {day_clause}
+            GROUP BY 1, 2, 3
+    """),
+]
+
+MAGENTO_ROLLUP_DIRTY_DAY_QUERY = """
+    SELECT date(date_order) FROM sale_order
+        WHERE magento_instance_id IS NOT NULL AND write_date >= %(last_sync)s
+    UNION
+    SELECT date(so.date_order) FROM stock_picking AS sp
+        JOIN sale_order AS so ON so.id = sp.sale_id
+        WHERE sp.is_magento_picking = True AND sp.write_date >= %(last_sync)s
+    UNION
+    SELECT date FROM account_move
+        WHERE move_type = 'out_refund' AND magento_instance_id IS NOT NULL AND write_date >= %(last_sync)s
+"""
+
+
+class SaleDashboardRollupEpt(models.Model):
+    """
+    Describes Magento fields of the sale dashboard rollup.
+    """
+    _inherit = "sale.dashboard.rollup.ept"
+
+    magento_instance_id = fields.Many2one(comodel_name='magento.instance', string='Magento Instance',
+                                          ondelete="cascade", index=True)
+    magento_website_id = fields.Many2one(comodel_name='magento.website', string='Magento Website',
+                                         ondelete="cascade", index=True)
+
+    def update_magento_dashboard_rollup(self):
+        """
+        Called by cron to recompute the Magento dashboard rollup of the days changed since the last run.
+        """
+        return self.update_dashboard_rollup('magento_instance_id', MAGENTO_ROLLUP_QUERIES,
+                                            MAGENTO_ROLLUP_DIRTY_DAY_QUERY, website_field='magento_website_id')
+
+    def rebuild_magento_dashboard_rollup(self):
+        """
+        Recompute the whole Magento dashboard rollup.
+        """
+        return self.rebuild_dashboard_rollup('magento_instance_id', MAGENTO_ROLLUP_QUERIES,
+                                             website_field='magento_website_id')
@@ -9,6 +9,7 @@ import time
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.addons.common_connector_library.models.queue_stage_timing_ept import queue_stage_ept
 from .api_request import req
 from dateutil import parser
 
@@ -66,6 +67,26 @@ class SaleOrder(models.Model):
         order_ids = list(set(order_ids))
         return [('id', 'in', order_ids)]
 
+    def _compute_magento_is_shipped(self):
+        """
+        Compute magento_is_shipped of order, it is shipped when a done Magento picking is delivered to the customer.
+        """
+        for order in self:
+            order.magento_is_shipped = bool(order.picking_ids.filtered(
+                lambda x: x.is_magento_picking and x.state == 'done' and x.location_dest_id.usage == 'customer'))
+
+    def _search_magento_is_shipped(self, operator, value):
+        """
+        Search the shipped orders like the dashboard rollup, the pickings are matched by a sub query, so a single
+        picking must match all conditions and the ids of the orders are not kept in the domain.
+        """
+        query = """SELECT sp.sale_id FROM stock_picking AS sp
+                        JOIN stock_location AS sl ON sl.id = sp.location_dest_id
+                    WHERE sp.is_magento_picking = True AND sp.state = 'done' AND sl.usage = 'customer'
+                        AND sp.sale_id IS NOT NULL"""
+        is_shipped = (operator == '=') == bool(value)
+        return [('id', 'inselect' if is_shipped else 'not inselect', (query, []))]
+
     magento_instance_id = fields.Many2one(
         'magento.instance',
         string="Instance",
@@ -109,6 +130,11 @@ class SaleOrder(models.Model):
         search="_search_magento_order_ids",
         copy=False
     )
+    magento_is_shipped = fields.Boolean(
+        string="Shipped in Magento", compute="_compute_magento_is_shipped",
+        search="_search_magento_is_shipped",
+        help="Order has a done Magento picking delivered to the customer."
+    )
 
     _sql_constraints = [('_magento_sale_order_unique_constraint',
                          'unique(magento_order_id,magento_instance_id,magento_order_reference)',
@@ -131,26 +157,40 @@ class SaleOrder(models.Model):
                                                 compute='_cancel_order_exportable',
                                                 store=False)
 
+    def unlink(self):
+        """
+        Mark the days of the deleted Magento orders to recompute them in the dashboard rollup.
+        """
+        days = [order.date_order.date() for order in self if order.magento_instance_id and order.date_order]
+        self.env['sale.dashboard.rollup.ept'].mark_dashboard_rollup_days_ept('magento_instance_id', days)
+        return super(SaleOrder, self).unlink()
+
     def create_sale_order_ept(self, item, instance, log, line_id):
-        is_processed = self._find_price_list(item, log, line_id, instance)
+        with queue_stage_ept(self.env, 'pricelist'):
+            is_processed = self._find_price_list(item, log, line_id, instance)
         order_line = self.env['sale.order.line']
         if is_processed:
-            customers = self.__update_partner_dict(item, instance)
-            data = self.env['magento.res.partner.ept'].create_magento_customer(customers, True)
+            with queue_stage_ept(self.env, 'partner'):
+                customers = self.__update_partner_dict(item, instance)
+                data = self.env['magento.res.partner.ept'].create_magento_customer(customers, True)
             item.update(data)
             is_processed = self.__find_order_warehouse(item, log, line_id)
             if is_processed:
                 is_processed = order_line.find_order_item(item, instance, log, line_id)
                 if is_processed:
-                    is_processed = self.__find_order_tax(item, instance, log, line_id)
+                    with queue_stage_ept(self.env, 'tax'):
+                        is_processed = self.__find_order_tax(item, instance, log, line_id)
                     if is_processed:
-                        vals = self._prepare_order_dict(item, instance)
-                        magento_order = self.create(vals)
+                        with queue_stage_ept(self.env, 'order_create'):
+                            vals = self._prepare_order_dict(item, instance)
+                            magento_order = self.create(vals)
                         item.update({'sale_order_id': magento_order})
-                        order_line.create_order_line(item, instance, log, line_id)
-                        self.__create_discount_order_line(item, instance)
-                        self.__create_shipping_order_line(item, instance)
-                        self.__process_order_workflow(item, log)
+                        with queue_stage_ept(self.env, 'order_lines'):
+                            order_line.create_order_line(item, instance, log, line_id)
+                            self.__create_discount_order_line(item, instance)
+                            self.__create_shipping_order_line(item, instance)
+                        with queue_stage_ept(self.env, 'workflow'):
+                            self.__process_order_workflow(item, log)
         return is_processed
 
     @staticmethod
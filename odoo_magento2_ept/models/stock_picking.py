@@ -6,7 +6,6 @@ Describes methods for Export shipment information.
 import logging
 from odoo import models, fields, _
 from odoo.exceptions import UserError
-from .api_request import req
 
 _logger = logging.getLogger("MagentoEPT")
 
@@ -50,6 +49,15 @@ class StockPicking(models.Model):
                                             compute='_compute_shipment_exportable',
                                             store=False)
 
+    def unlink(self):
+        """
+        Mark the order days of the deleted Magento pickings to recompute them in the dashboard rollup.
+        """
+        days = [picking.sale_id.date_order.date() for picking in self
+                if picking.is_magento_picking and picking.sale_id.date_order]
+        self.env['sale.dashboard.rollup.ept'].mark_dashboard_rollup_days_ept('magento_instance_id', days)
+        return super(StockPicking, self).unlink()
+
     def _compute_shipment_exportable(self):
         """
         set is_shipment_exportable true or false based on some condition
@@ -125,34 +133,35 @@ class StockPicking(models.Model):
     def magento_send_shipment(self, raise_error=False):
         """
         This method are used to send the shipment to Magento. This is an base method and it calls
-        from wizard, manual operation as well as cronjob.
+        from wizard, manual operation as well as cronjob. Shipments of an instance are sent
+        concurrently with the worker pool of the instance and the results are written together.
         :param raise_error: If calls from manual operation then raise_error=True
         :return: Always True
         """
-        for picking in self:
-            values = picking.get_export_ship_values(raise_error=raise_error)
-            if not values:
-                return False
-            instance = picking.magento_instance_id
-            try:
+        for instance in self.mapped('magento_instance_id'):
+            pickings = self.filtered(lambda picking: picking.magento_instance_id == instance)
+            requests_data = dict()
+            for picking in pickings:
+                values = picking.get_export_ship_values(raise_error=raise_error)
+                if not values:
+                    continue
                 api_url = f'/V1/order/{picking.sale_id.magento_order_id}/ship/'
-                response = req(instance, api_url, 'POST', values)
-            except Exception as error:
-                _logger.error(error)
-                return picking._handle_magento_shipment_exception(instance, picking)
-            if response:
-                picking.write({
-                    'magento_shipping_id': int(response),
-                    'is_exported_to_magento': True
-                })
+                requests_data[picking.id] = (api_url, 'POST', values)
+            results = instance.export_documents(requests_data)
+            magento_ids = {picking_id: int(response) for picking_id, (response, error) in results.items()
+                           if not error and str(response).isdigit()}
+            failed_ids = [picking_id for picking_id, (response, error) in results.items()
+                          if error or (response and picking_id not in magento_ids)]
+            instance.write_exported_documents(self.browse(list(magento_ids)), magento_ids, 'magento_shipping_id')
+            if failed_ids:
+                self.browse(failed_ids)._handle_magento_shipment_exception(instance)
         return True
 
-    def _handle_magento_shipment_exception(self, instance, picking):
+    def _handle_magento_shipment_exception(self, instance):
         """
-        This method used to handle shipment response. Based on the response we will update the
-        attempts and shipment id in picking record.
+        This method used to handle the failed shipments. All failures of an export are added in
+        one log book and the attempts are updated in the picking records.
         :param instance: magento.instance object
-        :param picking: stock.picking object
         :return: Always False due to this method calls from exception
         """
         model_id = self.env['common.log.lines.ept'].get_model_id(self._inherit)
@@ -161,49 +170,48 @@ class StockPicking(models.Model):
                                                                      instance,
                                                                      model_id,
                                                                      'magento_ept')
-        order_name = picking.sale_id.name
-        if picking.max_no_of_attempts == 2:
-            note = f"""
-            Attention {self.name} Export Shipment is processed 3 times and it failed. \n
-            You need to process it manually.
-            """
-            self.env['magento.instance'].create_activity(model_name=self._name,
-                                                         res_id=picking.id,
-                                                         message=note,
-                                                         summary=picking.name,
-                                                         instance=instance)
-        picking.write({
-            "max_no_of_attempts": picking.max_no_of_attempts + 1,
-            "magento_message": _(
-                "The request could not be satisfied while export this Shipment."
-                "\nPlease check Process log {}").format(log.name)
-        })
-        message = _("The request could not be satisfied and shipment couldn't be "
-                    "created in Magento for "
-                    "Sale Order : {} & Picking : {} due to any of the following reasons.\n"
-                    "1. A picking can't be created when an order has a status of "
-                    "'On Hold/Canceled/Closed'\n"
-                    "2. A picking can't be created without products. "
-                    "Add products and try again.\n"
-                    "3. The shipment information has not been exported due "
-                    "to either missing carrier or"
-                    " tracking number details.\n"
-                    "4. In case you are using Magento multi-inventory sources, "
-                    "ensure that you have selected the appropriate warehouse location for "
-                    "the shipment in Odoo. "
-                    "The warehouse location must be listed as one of the inventory sources "
-                    "set up in Magento for the product. "
-                    "Please go to Magento2 Odoo Connector > Configuration > "
-                    "Magento Inventory location > Select Magento location name > "
-                    "set Export Shipment location\n"
-                    "The order does not allow an shipment to be created"). \
-            format(order_name, picking.name)
-        log.write({
-            'log_lines': [(0, 0, {
-                'message': message,
-                'order_ref': order_name,
-            })]
-        })
+        log_lines = []
+        for picking in self:
+            order_name = picking.sale_id.name
+            if picking.max_no_of_attempts == 2:
+                note = f"""
+                Attention {picking.name} Export Shipment is processed 3 times and it failed. \n
+                You need to process it manually.
+                """
+                self.env['magento.instance'].create_activity(model_name=self._name,
+                                                             res_id=picking.id,
+                                                             message=note,
+                                                             summary=picking.name,
+                                                             instance=instance)
+            message = _("The request could not be satisfied and shipment couldn't be "
+                        "created in Magento for "
+                        "Sale Order : {} & Picking : {} due to any of the following reasons.\n"
+                        "1. A picking can't be created when an order has a status of "
+                        "'On Hold/Canceled/Closed'\n"
+                        "2. A picking can't be created without products. "
+                        "Add products and try again.\n"
+                        "3. The shipment information has not been exported due "
+                        "to either missing carrier or"
+                        " tracking number details.\n"
+                        "4. In case you are using Magento multi-inventory sources, "
+                        "ensure that you have selected the appropriate warehouse location for "
+                        "the shipment in Odoo. "
+                        "The warehouse location must be listed as one of the inventory sources "
+                        "set up in Magento for the product. "
+                        "Please go to Magento2 Odoo Connector > Configuration > "
+                        "Magento Inventory location > Select Magento location name > "
+                        "set Export Shipment location\n"
+                        "The order does not allow an shipment to be created"). \
+                format(order_name, picking.name)
+            log_lines.append((0, 0, {'message': message, 'order_ref': order_name}))
+        magento_message = _("The request could not be satisfied while export this Shipment."
+                            "\nPlease check Process log {}").format(log.name)
+        for attempts in set(self.mapped('max_no_of_attempts')):
+            self.filtered(lambda picking: picking.max_no_of_attempts == attempts).write({
+                "max_no_of_attempts": attempts + 1,
+                "magento_message": magento_message
+            })
+        log.write({'log_lines': log_lines})
         return False
 
     def search_magento_pickings(self, instance):
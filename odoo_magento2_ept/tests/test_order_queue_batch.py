@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+"""
+Tests of the order queue lines processed in the commit batch of the queue.
+"""
+import json
+from unittest.mock import patch
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestOrderQueueBatch(TransactionCase):
+    """
+    Order queue lines are processed in the savepoint of a commit batch, the processing must not commit.
+    """
+
+    def setUp(self):
+        super(TestOrderQueueBatch, self).setUp()
+        self.instance = self.env['magento.instance'].create({
+            'name': 'Test Magento Instance',
+            'magento_version': '2.3',
+            'warehouse_ids': [(6, 0, self.env.ref('stock.warehouse0').ids)],
+            'auto_create_product': False
+        })
+        self.queue = self.env['magento.order.data.queue.ept'].create({'instance_id': self.instance.id})
+        self.queue.write({'log_book_id': self.instance.create_log_book(model=self.queue._name).id})
+        self.item = {'increment_id': '000000001', 'sku': 'TEST-MISSING-SKU'}
+        self.line = self.env['magento.order.data.queue.line.ept'].create({
+            'magento_id': self.item.get('increment_id'),
+            'instance_id': self.instance.id,
+            'queue_id': self.queue.id,
+            'data': json.dumps(self.item)
+        })
+
+    def _get_missing_product_log_lines(self):
+        return self.queue.log_book_id.log_lines.filtered(lambda log_line: log_line.default_code == 'TEST-MISSING-SKU')
+
+    def test_missing_product_in_commit_batch(self):
+        """
+        Order line of which the product is missing is logged in the savepoint of the batch without commit, so the
+        values of the lines kept by the batch are written.
+        """
+        product_obj = self.env['magento.product.product'].with_context(is_order=True)
+        with patch.object(self.env.cr, 'commit') as commit:
+            with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(
+                    timestamp_field='processed_at', lease_records=self.queue) as batch:
+                result, error = batch.process_line(product_obj.verify_configuration, self.line, self.item)
+                batch.write_line_values(self.line, {'state': 'failed'})
+        commit.assert_not_called()
+        self.assertFalse(result)
+        self.assertFalse(error)
+        self.assertEqual(self.line.state, 'failed')
+        self.assertTrue(self.line.processed_at)
+        self.assertTrue(self._get_missing_product_log_lines())
+
+    def test_missing_product_without_commit_batch(self):
+        """
+        Order line processed without commit batch is committed once the missing product is logged.
+        """
+        product_obj = self.env['magento.product.product'].with_context(is_order=True)
+        with patch.object(self.env.cr, 'commit') as commit:
+            result = product_obj.verify_configuration(self.line, self.item)
+        commit.assert_called_once()
+        self.assertFalse(result)
+        self.assertTrue(self._get_missing_product_log_lines())
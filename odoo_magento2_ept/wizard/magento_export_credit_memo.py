@@ -26,6 +26,7 @@ class MagentoExportCreditMemo(models.TransientModel):
         ----------------
         :return: True
         """
-        credit_note = self.env['account.move'].browse(self._context.get('active_id'))
-        credit_note.action_create_credit_memo(self.refund_type, self.is_return_stock)
+        credit_notes = self.env['account.move'].browse(self._context.get('active_ids',
+                                                                         self._context.get('active_id')))
+        credit_notes.action_create_credit_memo(self.refund_type, self.is_return_stock)
         return True
@@ -3,12 +3,13 @@
 """
 Describes product import export process.
 """
+import copy
 import time
 import logging
 from datetime import datetime, timedelta
 from odoo import fields, models, api, _
 from odoo.exceptions import UserError
-from ..models.api_request import req
+from ..models.api_request import req, create_search_criteria
 from ..python_library.php import Php
 
 _logger = logging.getLogger("MagentoEPT")
@@ -38,6 +39,11 @@ class MagentoExportProductEpt(models.TransientModel):
     m_update_description = fields.Boolean(
         string="Update Product Description/Short Description ?", default=False)
     description_config_value = fields.Boolean(string="Allow Product Description/Short Description?")
+    use_async_bulk_api = fields.Boolean(string="Use Asynchronous Bulk API ?", default=False,
+                                        help="If checked, products are submitted to the Magento asynchronous "
+                                             "bulk API in batches instead of one request per product and store "
+                                             "view. Results are processed by the cron once Magento has "
+                                             "processed the bulk.")
 
     @api.model
     def default_get(self, field_list):
@@ -83,13 +89,17 @@ class MagentoExportProductEpt(models.TransientModel):
             if not m_templates:
                 continue
             log = instance.create_log_book('magento.product.template', 'export')
+            bulk_operations = {}
+            wizard = self.with_context(magento_bulk_operations=bulk_operations) if self.use_async_bulk_api else self
             for m_template in m_templates:
                 attribute_set_id = self.attribute_set_id if self.attribute_set_id else m_template.attribute_set_id
                 if attribute_set_id:
-                    self.export_simple_product(instance, m_template, attribute_set_id, log)
-                    self.export_configurable_product(instance, m_template, attribute_set_id,
-                                                     log)
-            if log and not log.log_lines:
+                    wizard.export_simple_product(instance, m_template, attribute_set_id, log)
+                    wizard.export_configurable_product(instance, m_template, attribute_set_id,
+                                                       log)
+            bulks = self.env['magento.async.bulk.ept'].submit_bulk_operations(
+                instance, bulk_operations, log, self._prepare_async_bulk_export_options())
+            if log and not log.log_lines and not bulks:
                 log.unlink()
             else:
                 log_ids.append(log.id)
@@ -141,7 +151,6 @@ class MagentoExportProductEpt(models.TransientModel):
         :param common_log_id: log book ID
         :return:
         """
-        magento_product_obj = self.env['magento.product.template']
         product_tmpl = m_template.filtered(
             lambda x: x.product_type == 'configurable' and not x.sync_product_with_magento)
         if product_tmpl:
@@ -149,20 +158,36 @@ class MagentoExportProductEpt(models.TransientModel):
                 _logger.info("start create new configurable product name : %s ", product)
                 self.create_product_in_magento(instance, product, attribute_set_id, common_log_id,
                                                product_type='configurable')
-                if product.attribute_line_ids:
-                    conf_product_sku = product.magento_product_name
-                    configurable_opt_vals = magento_product_obj.prepare_configurable_option_vals(
-                        conf_product_sku, common_log_id, instance, product, attribute_set_id)
-                    if configurable_opt_vals:
-                        continue
-                    self.__find_attribute_for_product(product, instance, attribute_set_id,
-                                                      common_log_id)
-                    magento_product_obj.bind_simple_with_configurable_product(
-                        instance,
-                        product.magento_product_ids.mapped(
-                            'magento_sku'),
-                        conf_product_sku,
-                        common_log_id)
+                # In bulk mode, variants are exported once Magento has created the configurable product.
+                if product.attribute_line_ids and not self.__is_async_bulk_export():
+                    self.__export_configurable_variants(instance, product, attribute_set_id, common_log_id)
+        return True
+
+    def __export_configurable_variants(self, instance, product, attribute_set_id, common_log_id):
+        """
+        Export the configurable options and variants of the configurable product and bind the variants with it.
+        In bulk mode, variants are bound once Magento has created them.
+        :param instance: Instance record
+        :param product: Configurable product template
+        :param attribute_set_id: Under which attribute set create the product?
+        :param common_log_id: log book ID
+        :return: True if variants are exported
+        """
+        magento_product_obj = self.env['magento.product.template']
+        conf_product_sku = product.magento_product_name
+        configurable_opt_vals = magento_product_obj.prepare_configurable_option_vals(
+            conf_product_sku, common_log_id, instance, product, attribute_set_id)
+        if configurable_opt_vals:
+            return False
+        self.__find_attribute_for_product(product, instance, attribute_set_id,
+                                          common_log_id)
+        if not self.__is_async_bulk_export():
+            magento_product_obj.bind_simple_with_configurable_product(
+                instance,
+                product.magento_product_ids.mapped(
+                    'magento_sku'),
+                conf_product_sku,
+                common_log_id)
         return True
 
     def __find_attribute_for_product(self, product, instance, attribute_set_id, common_log_id):
@@ -190,7 +215,7 @@ class MagentoExportProductEpt(models.TransientModel):
         if not magento_template_ids:
             raise UserError(_("Please select some products to Export to Magento Store."))
 
-        if magento_template_ids and len(magento_template_ids) > 80:
+        if magento_template_ids and len(magento_template_ids) > 80 and not self.use_async_bulk_api:
             raise UserError(_("Error:\n- System will not export more then 80 Products at a "
                               "time.\n- Please select only 80 product for export."))
         return True
@@ -212,7 +237,7 @@ class MagentoExportProductEpt(models.TransientModel):
         if not update_ids:
             raise UserError(_("Please select some products to Update in Magento Store."))
 
-        if update_ids and len(update_ids) > 80:
+        if update_ids and len(update_ids) > 80 and not self.use_async_bulk_api:
             raise UserError(_("Error:\n- System will not update more then 80 Products at a "
                               "time.\n- Please select only 50 product for update."))
         return True
@@ -231,14 +256,21 @@ class MagentoExportProductEpt(models.TransientModel):
             common_log = instance.create_log_book('magento.product.template', 'export')
             self.__find_not_synced_m_templates(instance, update_ids, common_log)
             m_templates = self.__find_magento_templates(update_ids, instance)
+            bulk_operations = {}
+            wizard = self.with_context(magento_bulk_operations=bulk_operations) if self.use_async_bulk_api else self
             if m_templates:
                 start = time.time()
-                self.__update_simple_product(instance, m_templates, common_log)
-                self.__update_configurable_product(instance, m_templates, common_log)
+                wizard.__update_simple_product(instance, m_templates, common_log)
+                wizard.__update_configurable_product(instance, m_templates, common_log)
+                if self.update_price:
+                    self.env['magento.product.price.ept'].export_product_prices(
+                        instance, m_templates.mapped('magento_product_ids'), common_log, force=True)
                 end = time.time()
                 _logger.info("Updated total templates  %s  in %s seconds.", len(m_templates),
                              str(end - start))
-            if common_log and not common_log.log_lines:
+            bulks = self.env['magento.async.bulk.ept'].submit_bulk_operations(instance, bulk_operations,
+                                                                              common_log)
+            if common_log and not common_log.log_lines and not bulks:
                 common_log.unlink()
             else:
                 log.append(common_log.id)
@@ -292,8 +324,9 @@ class MagentoExportProductEpt(models.TransientModel):
                 for website_id in website_ids:
                     product_dict = self.__prepare_conf_product_dict(conf_product, log, website_id)
                     api_url = '/all/V1/products/%s' % Php.quote_sku(conf_product.magento_sku)
-                    self.env['magento.product.template'].update_product_request(instance, product_dict,
-                                                                                api_url)
+                    self.__send_product_request(instance, api_url, 'PUT', product_dict,
+                                                self.__prepare_operation('update', conf_product),
+                                                by_sku=True, is_raise=True)
                 for m_variant in conf_product.magento_product_ids:
                     self.__update_product(instance, m_variant, log, True)
         return True
@@ -329,11 +362,9 @@ class MagentoExportProductEpt(models.TransientModel):
                 product_dict.get('product').update({'name': m_template.magento_product_name})
                 product_dict = self.__prepare_images_dict(product_dict, m_template, is_child)
                 api_url = '/all/V1/products/%s' % Php.quote_sku(m_template.magento_sku)
-                self.env['magento.product.template'].update_product_request(instance, product_dict,
-                                                                            api_url)
-            price_dict = self.__update_product_website_vise(instance, website_ids, product,
-                                                            product_dict)
-            self.__update_product_price_in_magento(instance, m_template, price_dict, log)
+                self.__send_product_request(instance, api_url, 'PUT', product_dict,
+                                            self.__prepare_operation('update', m_template),
+                                            by_sku=True, is_raise=True)
         else:
             log.write({
                 'log_lines': [(0, 0, {
@@ -462,14 +493,6 @@ class MagentoExportProductEpt(models.TransientModel):
             update_product_dict.get('product').get('custom_attributes').append(tax_class)
         return update_product_dict
 
-    def __update_product_website_vise(self, instance, website_ids, product, product_dict):
-        price_dict = []
-        for website in website_ids:
-            m_store_view = self.__find_store_view(website)
-            price_dict = self.__prepare_update_website_price_dict(
-                instance, website, m_store_view, product, price_dict)
-        return price_dict
-
     def __update_product_in_magento(self, instance, product, m_store_view, custom_attrs,
                                     product_dict):
         if m_store_view:
@@ -482,57 +505,9 @@ class MagentoExportProductEpt(models.TransientModel):
                     store_view.magento_storeview_code,
                     Php.quote_sku(product.magento_sku))
                 _logger.info("Store code %s", store_view.lang_id.code)
-                self.env['magento.product.template'].update_product_request(
-                    instance, product_dict, api_url)
-
-    def __prepare_product_price_dict(self, price_list, m_template, store_view_id):
-        is_it_child = False
-        m_product = self.env['magento.product.template'].get_simple_product(is_it_child,
-                                                                            m_template)
-        product_price = price_list. \
-            get_product_price(m_product.odoo_product_id,
-                              price_list.id, False)
-        _logger.info("%s : in product.product price is : %s" % (
-            m_product.odoo_product_id.name, product_price))
-        price_vals = {"sku": m_template.magento_sku, "price": product_price,
-                      "store_id": store_view_id}
-        return price_vals
-
-    def __prepare_update_website_price_dict(self, instance, website, m_store_view, m_template,
-                                            price_dict):
-        if self.update_price and instance.catalog_price_scope == 'website' and m_store_view:
-            currency = website.magento_base_currency.id
-            for store_view in m_store_view:
-                pricelist = website.pricelist_ids.filtered(lambda x: x.currency_id.id == currency)
-                if pricelist:
-                    pricelist = pricelist[0]
-                    price_vals = self.__prepare_product_price_dict(
-                        pricelist, m_template, store_view.magento_storeview_id)
-                    price_dict.append(price_vals)
-        return price_dict
-
-    def __update_product_price_in_magento(self, instance, m_template, price_dict, log):
-        if self.update_price:
-            if instance.catalog_price_scope == 'global':
-                _logger.info("Instance %s price scope is Global. ", instance.name)
-                if instance.pricelist_id:
-                    price_vals = self.__prepare_product_price_dict(
-                        instance.pricelist_id, m_template, 0)
-                    price_dict.append(price_vals)
-                else:
-                    log.write({
-                        'log_lines': [(0, 0, {
-                            'message': "Price scope is Global, "
-                                       "But still pricelist not set for the Instance : %s" % instance.name
-                        })]
-                    })
-
-            if price_dict:
-                price_data = {"prices": price_dict}
-                price_url = '/V1/products/base-prices'
-                self.env['magento.product.template'].update_product_base_price(instance, price_url,
-                                                                               log, price_data)
-                _logger.info("Price Updated successfully.")
+                self.__send_product_request(instance, api_url, 'PUT', product_dict,
+                                            self.__prepare_operation('update', product),
+                                            by_sku=True, is_raise=True)
 
     def __prepare_images_dict(self, product_dict, m_template, is_child=False):
         if self.m_update_image:
@@ -812,11 +787,15 @@ class MagentoExportProductEpt(models.TransientModel):
                         configurable_opt.get('attribute_code') != 'short_description'):
                     data.get('product', dict()).get('custom_attributes').append(configurable_opt)
         if website_ids:
+            operation = self.__prepare_operation('create', product, product_type, is_it_child)
             response = self.__create_product_website_vise(instance,
                                                           conf_simple_product,
                                                           website_ids,
                                                           product, data,
-                                                          log, is_it_child)
+                                                          log, is_it_child, operation)
+            if self.__is_async_bulk_export():
+                # Magento ID, website and images are set once Magento has created the product.
+                return True
             website_vals = self.__prepare_website_vise_dict(product, website_ids, custom_attributes,
                                                             product_type, is_it_child)
             self.__set_websites_images_in_magento(instance, product, website_vals,
@@ -840,7 +819,7 @@ class MagentoExportProductEpt(models.TransientModel):
         return True
 
     def __create_product_website_vise(self, instance, conf_simple_product, website_ids, product,
-                                      data, log, is_it_child):
+                                      data, log, is_it_child, operation=False):
         m_template = self.env['magento.product.template']
         descriptions = self.__find_descriptions(product)
         magento_website_id = []
@@ -863,11 +842,11 @@ class MagentoExportProductEpt(models.TransientModel):
                 if is_it_child == False:
                     if export_all == 0 and product.export_product_to_all_website:
                         api_url = '/all/V1/products'
-                        req(instance, api_url, 'POST', data)
+                        self.__send_product_request(instance, api_url, 'POST', data, operation)
                         export_all = 1
                 try:
                     api_url = '/%s/V1/products' % store.magento_storeview_code
-                    response = req(instance, api_url, 'POST', data)
+                    response = self.__send_product_request(instance, api_url, 'POST', data, operation)
                 except Exception as error:
                     log.write({
                         'log_lines': [(0, 0, {
@@ -902,12 +881,11 @@ class MagentoExportProductEpt(models.TransientModel):
                 data.get('product', dict()).update({'media_gallery_entries': media_gallery})
         return data
 
-    @staticmethod
-    def __set_websites_images_in_magento(instance, product, data, log):
+    def __set_websites_images_in_magento(self, instance, product, data, log, operation=False):
         sku = product.magento_sku if product.magento_sku else product.magento_product_name
         try:
             api_url = '/all/V1/products/%s' % Php.quote_sku(sku)
-            req(instance, api_url, 'PUT', data)
+            self.__send_product_request(instance, api_url, 'PUT', data, operation, by_sku=True)
         except Exception:
             log.write({
                 'log_lines': [(0, 0, {
@@ -917,6 +895,144 @@ class MagentoExportProductEpt(models.TransientModel):
             })
         return True
 
+    def __is_async_bulk_export(self):
+        return self._context.get('magento_bulk_operations') is not None
+
+    @staticmethod
+    def __prepare_operation(action, product, product_type=False, is_it_child=False):
+        """
+        Prepare the operation of the asynchronous bulk, used to map the result of the operation with the product.
+        :param action: create, update, website or bind
+        :param product: Magento product template or product
+        :return: dictionary of operation
+        """
+        operation = {
+            'action': action,
+            'res_model': product._name,
+            'res_id': product.id,
+            'sku': product.magento_sku if product.magento_sku else product.magento_product_name,
+            'product_type': product_type,
+            'is_child': is_it_child
+        }
+        if is_it_child:
+            operation.update({'parent_sku': product.magento_tmpl_id.magento_product_name})
+        return operation
+
+    def __send_product_request(self, instance, api_url, method, data, operation, by_sku=False, is_raise=False):
+        """
+        Send the product request to Magento. In bulk mode, the request is collected to submit it with the
+        asynchronous bulk API.
+        :param instance: Magento Instance
+        :param api_url: API URL
+        :param method: API method
+        :param data: body data
+        :param operation: operation of the request, see __prepare_operation
+        :param by_sku: True if the API URL contains the SKU
+        :param is_raise: Raise the error of the request
+        :return: API response, empty dictionary in bulk mode
+        """
+        bulk_operations = self._context.get('magento_bulk_operations')
+        if bulk_operations is None:
+            return req(instance, api_url, method, data, is_raise=is_raise)
+        bulk_api_url = self.env['magento.async.bulk.ept'].prepare_bulk_api_url(api_url, by_sku)
+        # Data is changed for the next store view, so keep the copy of it.
+        payload = copy.deepcopy(data)
+        if by_sku:
+            payload.update({'sku': operation.get('sku')})
+        bulk_operations.setdefault((bulk_api_url, method), []).append((payload, operation))
+        return {}
+
+    def _prepare_async_bulk_export_options(self):
+        """
+        Prepare the export options, used to process the operations which depend on the result of the bulk.
+        :return: dictionary of export options
+        """
+        return {
+            'use_async_bulk_api': True,
+            'attribute_set_id': self.attribute_set_id.id,
+            'magento_publish': self.magento_publish,
+            'is_set_price': self.is_set_price,
+            'is_set_image': self.is_set_image
+        }
+
+    def process_async_bulk_operations(self, bulk, operations):
+        """
+        Process the successful operations of the asynchronous bulk. Magento ID is set in the created products and
+        the requests which depend on the created products are submitted as a new bulk, like website and images,
+        configurable options and variants and the binding of variants with the configurable product.
+        :param bulk: magento.async.bulk.ept record
+        :param operations: successful operations of the bulk
+        :return: True
+        """
+        m_template_obj = self.env['magento.product.template']
+        instance = bulk.instance_id
+        log = bulk.log_book_id
+        created_operations = {}
+        for operation in operations:
+            product = self.env[operation.get('res_model')].browse(operation.get('res_id')).exists()
+            if not product:
+                continue
+            if operation.get('action') == 'website':
+                magento_product_images = m_template_obj.get_magento_product_images(
+                    product, operation.get('product_type'), operation.get('is_child'))
+                self.set_magento_product_image(magento_product_images)
+            elif operation.get('action') == 'create' and not product.sync_product_with_magento:
+                created_operations.setdefault(product, operation)
+        if not created_operations:
+            return True
+        magento_product_ids = self.__find_magento_product_ids(
+            instance, [operation.get('sku') for operation in created_operations.values()])
+        bulk_operations = {}
+        wizard = self.with_context(magento_bulk_operations=bulk_operations)
+        for product, operation in created_operations.items():
+            sku = operation.get('sku')
+            product_type = operation.get('product_type')
+            is_it_child = operation.get('is_child')
+            if not magento_product_ids.get(sku):
+                log.write({
+                    'log_lines': [(0, 0, {
+                        'message': "Product is not found in Magento after the bulk is processed. SKU : %s" % sku,
+                        'default_code': sku
+                    })]
+                })
+                continue
+            m_template_obj.write_product_id_in_odoo({'id': magento_product_ids.get(sku), 'sku': sku},
+                                                    product_type, is_it_child, product)
+            m_product = product if not is_it_child else product.magento_tmpl_id
+            website_ids = m_template_obj.get_magento_website_ids(instance, m_product)
+            custom_attributes = m_template_obj.prepare_main_product_description_array([], product)
+            website_vals = wizard.__prepare_website_vise_dict(product, website_ids, custom_attributes,
+                                                              product_type, is_it_child)
+            wizard.__set_websites_images_in_magento(
+                instance, product, website_vals, log,
+                wizard.__prepare_operation('website', product, product_type, is_it_child))
+            if is_it_child:
+                api_url = '/V1/configurable-products/%s/child' % Php.quote_sku(operation.get('parent_sku'))
+                bind_operation = wizard.__prepare_operation('bind', product, product_type, is_it_child)
+                bind_operation.update({'sku': operation.get('parent_sku')})
+                wizard.__send_product_request(instance, api_url, 'POST', {"childSku": sku},
+                                              bind_operation, by_sku=True)
+            elif product_type == 'configurable' and product.attribute_line_ids:
+                attribute_set_id = self.attribute_set_id if self.attribute_set_id else product.attribute_set_id
+                wizard.__export_configurable_variants(instance, product, attribute_set_id, log)
+        bulk.submit_bulk_operations(instance, bulk_operations, log, self._prepare_async_bulk_export_options())
+        return True
+
+    @staticmethod
+    def __find_magento_product_ids(instance, skus):
+        """
+        Find the Magento product IDs of the given SKUs.
+        :param instance: Magento Instance
+        :param skus: list of SKUs
+        :return: dictionary like {sku: Magento product ID}
+        """
+        search_criteria = create_search_criteria({'sku': {'in': skus}}, page_size=len(skus),
+                                                 fields=['items[id,sku]'])
+        api_url = '/all/V1/products?%s' % Php.http_build_query(search_criteria)
+        response = req(instance, api_url, is_raise=True)
+        items = (response.get('items') or []) if isinstance(response, dict) else []
+        return {item.get('sku'): item.get('id') for item in items}
+
     def __get_product_price(self, instance, website, m_template, log):
         m_template_obj = self.env['magento.product.template']
         product_price = 0
@@ -209,7 +209,9 @@ class MagentoImportExportEpt(models.TransientModel):
         """
         queue_ids = list()
         queue = self.env['magento.order.data.queue.ept']
-        kwargs = {'from_date': self.start_date, 'to_date': self.end_date}
+        # Orders of the date range are imported as backfill, so the orders imported by the scheduler and
+        # webhooks are not waiting behind them.
+        kwargs = {'from_date': self.start_date, 'to_date': self.end_date, 'priority': '0'}
         if instance:
             if self.operations == 'import_ship_sale_order':
                 kwargs.update({'status': 'complete'})
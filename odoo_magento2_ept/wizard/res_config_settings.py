@@ -74,6 +74,11 @@ class ResConfigSettings(models.TransientModel):
         string="Pricelist",
         help="Product price will be taken/set from this pricelist if Catalog Price Scope is global"
     )
+    special_pricelist_id = fields.Many2one(
+        'product.pricelist',
+        string="Special Pricelist",
+        help="Product special price will be taken from the rules of this pricelist if Catalog Price Scope is global"
+    )
 
     allow_import_image_of_products = fields.Boolean(
         "Import Images of Products",
@@ -187,6 +192,10 @@ class ResConfigSettings(models.TransientModel):
         'product.pricelist',
         string="Magento Cost Pricelist",
         help="Product cost price will be taken/set from this cost pricelist if Catalog Price Scope is website")
+    magento_website_special_pricelist_id = fields.Many2one(
+        'product.pricelist',
+        string="Magento Special Pricelist",
+        help="Product special price will be taken from the rules of this pricelist if Catalog Price Scope is website")
 
     m_website_analytic_account_id = fields.Many2one('account.analytic.account',
                                                     string='Magento Website Analytic Account')
@@ -220,6 +229,7 @@ class ResConfigSettings(models.TransientModel):
                 'catalog_price_scope': magento_instance_id.catalog_price_scope,
                 'is_multi_warehouse_in_magento': magento_instance_id.is_multi_warehouse_in_magento,
                 'pricelist_id': magento_instance_id.pricelist_id.id if magento_instance_id.pricelist_id else False,
+                'special_pricelist_id': magento_instance_id.special_pricelist_id.id,
                 'is_import_product_stock': magento_instance_id.is_import_product_stock,
                 'import_stock_warehouse': magento_instance_id.import_stock_warehouse.id if magento_instance_id.import_stock_warehouse else False,
                 'invoice_done_notify_customer': magento_instance_id.invoice_done_notify_customer,
@@ -251,6 +261,12 @@ class ResConfigSettings(models.TransientModel):
             self.magento_website_id.write(
                 {'cost_pricelist_id': self.magento_website_cost_pricelist_id.id})
 
+    @api.onchange('magento_website_special_pricelist_id')
+    def onchange_magento_website_special_pricelist_id(self):
+        if self.magento_website_id:
+            self.magento_website_id.write(
+                {'special_pricelist_id': self.magento_website_special_pricelist_id.id})
+
     @api.onchange('magento_website_id')
     def onchange_magento_website_id(self):
         """
@@ -265,6 +281,7 @@ class ResConfigSettings(models.TransientModel):
                 self.magento_website_warehouse_id = magento_website_id.warehouse_id.id
             if magento_website_id.cost_pricelist_id:
                 self.magento_website_cost_pricelist_id = magento_website_id.cost_pricelist_id.id
+            self.magento_website_special_pricelist_id = magento_website_id.special_pricelist_id.id
             if magento_website_id.m_website_analytic_account_id:
                 self.m_website_analytic_account_id = magento_website_id.m_website_analytic_account_id.id
             else:
@@ -331,6 +348,7 @@ class ResConfigSettings(models.TransientModel):
             'catalog_price_scope': magento_instance_id.catalog_price_scope if magento_instance_id else False,
             'allow_import_image_of_products': self.allow_import_image_of_products,
             'pricelist_id': self.pricelist_id.id if self.pricelist_id else False,
+            'special_pricelist_id': self.special_pricelist_id.id,
             'is_import_product_stock': self.is_import_product_stock,
             'import_stock_warehouse': self.import_stock_warehouse.id if self.import_stock_warehouse else False,
             'invoice_done_notify_customer': self.invoice_done_notify_customer,
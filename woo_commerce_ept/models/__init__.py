@@ -39,3 +39,4 @@ from . import meta_field_mapping_ept
 from . import digest
 from . import export_stock_queue_ept
 from . import export_stock_queue_line_ept
+from . import sale_dashboard_rollup_ept
@@ -15,6 +15,14 @@ class AccountMove(models.Model):
     woo_instance_id = fields.Many2one("woo.instance.ept", "Woo Instance")
     is_refund_in_woo = fields.Boolean("Refund In Woo Commerce", default=False)
 
+    def unlink(self):
+        """
+        This method is used to mark the days of the deleted Woo refunds to recompute them in the dashboard rollup.
+        """
+        days = [move.date for move in self if move.move_type == "out_refund" and move.woo_instance_id]
+        self.env["sale.dashboard.rollup.ept"].mark_dashboard_rollup_days_ept("woo_instance_id", days)
+        return super(AccountMove, self).unlink()
+
     def refund_in_woo(self):
         """
         This method is used for refund process. It'll call order refund api for that process
@@ -5,8 +5,6 @@ import json
 import logging
 import time
 
-from datetime import datetime
-
 from odoo import models, fields
 
 _logger = logging.getLogger("WooCommerce")
@@ -16,6 +14,10 @@ class WooCustomerDataQueueLineEpt(models.Model):
     _name = "woo.customer.data.queue.line.ept"
     _description = 'WooCommerce Customer Data Queue Line'
     _rec_name = "woo_synced_data_id"
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_payload_field = "woo_synced_data"
+    _archive_entity_field = "woo_synced_data_id"
+    _archive_instance_field = "woo_instance_id"
 
     woo_instance_id = fields.Many2one('woo.instance.ept', string='Instance',
                                       help="Determines that queue line associated with particular instance")
@@ -31,55 +33,58 @@ class WooCustomerDataQueueLineEpt(models.Model):
 
     def process_woo_customer_queue_lines(self):
         """
-        This method process the queue lines and creates partner and addresses.
+        This method process the queue lines and creates partner and addresses. Each queue line is
+        processed in a savepoint and the lines are committed in batches.
         @author: Maulik Barad on Date 11-Nov-2020.
         Migrated by Maulik Barad on Date 07-Oct-2021.
         """
         common_log_line_obj = self.env["common.log.lines.ept"]
         model_id = common_log_line_obj.get_model_id("res.partner")
-        partner_obj = self.env['res.partner']
+        self.queue_id.is_process_queue = True
+
+        with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(timestamp_field='last_process_date') as batch:
+            for customer_queue_line in self:
+                is_processed, error = batch.process_line(self._process_woo_customer_queue_line, customer_queue_line)
+                batch.write_line_values(customer_queue_line, {'state': 'done' if is_processed else 'failed'})
+                if not is_processed:
+                    message = "Please check customer name or addresses in WooCommerce."
+                    if error:
+                        message = "Customer could not be processed. %s" % error
+                    batch.add_log_line({'model_id': model_id, 'message': message,
+                                        'woo_customer_data_queue_line_id': customer_queue_line.id})
+                batch.commit_if_needed()
+        self.queue_id.is_process_queue = False
+        return True
 
-        log_lines = []
-        commit_count = 0
+    @staticmethod
+    def _process_woo_customer_queue_line(customer_queue_line):
+        """
+        This method creates partner and addresses of the queue line.
+        @param customer_queue_line: Record of customer queue line.
+        @return: True if the partner is created.
+        """
+        partner_obj = customer_queue_line.env['res.partner']
+        instance = customer_queue_line.woo_instance_id
+        customer_val = json.loads(customer_queue_line.woo_synced_data)
+        _logger.info("Start processing Woo customer Id %s for instance %s.", customer_val.get('id', False),
+                     instance.name)
         parent_partner = False
-
-        for customer_queue_line in self:
-            commit_count += 1
-            if commit_count == 10:
-                customer_queue_line.queue_id.is_process_queue = True
-                self._cr.commit()
-                commit_count = 0
-            instance = customer_queue_line.woo_instance_id
-            customer_val = json.loads(customer_queue_line.woo_synced_data)
-            _logger.info("Start processing Woo customer Id %s for instance %s.", customer_val.get('id', False),
-                         instance.name)
-
-            if customer_val:
-                parent_partner = partner_obj.woo_create_contact_customer(customer_val, instance)
-            if parent_partner:
-                partner_obj.woo_create_or_update_customer(customer_val.get('billing'), instance,
-                                                          parent_partner, 'invoice')
-                partner_obj.woo_create_or_update_customer(customer_val.get('shipping'), instance, parent_partner,
-                                                          'delivery')
-                customer_queue_line.write({'state': 'done', 'last_process_date': datetime.now()})
-                # WooCommerce Meta Mapping for import Customers
-                woo_operation = 'import_customer'
-                if instance.meta_mapping_ids.filtered(
-                        lambda meta: meta.woo_operation == woo_operation):
-                    instance.with_context(woo_operation=woo_operation).meta_field_mapping(customer_val, "import",
-                                                                                          parent_partner)
-            else:
-                customer_queue_line.write({'state': 'failed', 'last_process_date': datetime.now()})
-                log_line_id = common_log_line_obj.create({
-                    'model_id': model_id,
-                    'message': "Please check customer name or addresses in WooCommerce.",
-                    'woo_customer_data_queue_line_id': customer_queue_line.id
-                })
-                log_lines.append(log_line_id.id)
-            customer_queue_line.queue_id.is_process_queue = False
-            _logger.info("End processing Woo customer Id %s for instance %s.", customer_val.get('id', False),
-                         instance.name)
-        return True
+        if customer_val:
+            parent_partner = partner_obj.woo_create_contact_customer(customer_val, instance)
+        if parent_partner:
+            partner_obj.woo_create_or_update_customer(customer_val.get('billing'), instance,
+                                                      parent_partner, 'invoice')
+            partner_obj.woo_create_or_update_customer(customer_val.get('shipping'), instance, parent_partner,
+                                                      'delivery')
+            # WooCommerce Meta Mapping for import Customers
+            woo_operation = 'import_customer'
+            if instance.meta_mapping_ids.filtered(
+                    lambda meta: meta.woo_operation == woo_operation):
+                instance.with_context(woo_operation=woo_operation).meta_field_mapping(customer_val, "import",
+                                                                                      parent_partner)
+        _logger.info("End processing Woo customer Id %s for instance %s.", customer_val.get('id', False),
+                     instance.name)
+        return bool(parent_partner)
 
     def woo_customer_data_queue_to_odoo(self):
         """
@@ -3,7 +3,7 @@
 import logging
 import json
 from calendar import monthrange
-from datetime import date, datetime, timedelta
+from datetime import datetime, timedelta
 import requests
 
 from odoo import models, fields, api, _
@@ -28,6 +28,7 @@ _secondsConverter = {
 
 class WooInstanceEpt(models.Model):
     _name = "woo.instance.ept"
+    _inherit = ["api.cassette.mixin.ept", "api.rate.limit.mixin.ept"]
     _description = "WooCommerce Instance"
     _check_company_auto = True
 
@@ -349,22 +350,21 @@ class WooInstanceEpt(models.Model):
             context = dict(self.env.context)
             context.update({'sort': 'week'})
             self.env.context = context
+        rollup = self.env['sale.dashboard.rollup.ept']
         for record in self:
-            # Prepare values for Graph
-            values = record.get_graph_data(record)
-            data_type, comparison_value = record.get_compare_data(record)
-            # Total sales
-            total_sales = round(sum([key['y'] for key in values]), 2)
-            # Order count query
-            order_data = record.get_total_orders()
+            # Prepare values for Graph, comparison and counts from the daily rollup
+            dashboard_data = rollup.get_dashboard_rollup_data(self._context.get('sort'), woo_instance_id=record.id)
+            values = dashboard_data.get('values')
+            # Order count
+            order_data = record.get_total_orders(count=dashboard_data.get('order_count'))
             # Product count query
             product_data = record.get_total_products()
-            # Order shipped count query
-            order_shipped = record.get_shipped_orders()
+            # Order shipped count
+            order_shipped = record.get_shipped_orders(count=dashboard_data.get('shipped_order_count'))
             # Customer count query
             customer_data = record.get_customers()
-            # refund count query
-            refund_data = record.get_refund()
+            # refund count
+            refund_data = record.get_refund(count=dashboard_data.get('refund_count'))
             record.woo_order_data = json.dumps({
                 "values": values,
                 "title": "",
@@ -372,7 +372,7 @@ class WooInstanceEpt(models.Model):
                 "area": True,
                 "color": "#875A7B",
                 "is_sample_data": False,
-                "total_sales": total_sales,
+                "total_sales": dashboard_data.get('total_sales'),
                 "order_data": order_data,
                 "product_date": product_data,
                 "customer_data": customer_data,
@@ -381,287 +381,54 @@ class WooInstanceEpt(models.Model):
                 "refund_count": refund_data.get('refund_count'),
                 "sort_on": self._context.get('sort'),
                 "currency_symbol": record.company_id.currency_id.symbol or '',
-                "graph_sale_percentage": {'type': data_type, 'value': comparison_value}
+                "graph_sale_percentage": dashboard_data.get('graph_sale_percentage')
             })
 
-    def get_graph_data(self, record):
+    def _get_dashboard_period_domain(self, domain, date_field='date_order'):
         """
-        Use: To get the details of woo sale orders and total amount month wise or year wise to prepare the graph
-        Task: 167063
-        Added by: Preet Bhatti @Emipro Technologies
-        Added on: 29/10/20
-        :return: woo sale order date or month and sum of sale orders amount of current instance
-        """
-
-        def get_current_week_date(record):
-            self._cr.execute("""SELECT to_char(date(d.day),'DAY'), t.amount_untaxed as sum
-                                    FROM  (
-                                       SELECT day
-                                       FROM generate_series(date(date_trunc('week', (current_date)))
-                                        , date(date_trunc('week', (current_date)) + interval '6 days')
-                                        , interval  '1 day') day
-                                       ) d
-                                    LEFT   JOIN 
-                                    (SELECT date(date_order)::date AS day, sum(amount_untaxed) as amount_untaxed
-                                       FROM   sale_order
-                                       WHERE  date(date_order) >= (select date_trunc('week', date(current_date)))
-                                       AND    date(date_order) <= (select date_trunc('week', date(current_date)) + interval '6 days')
-                                       AND woo_instance_id=%s and state in ('sale','done')
-                                       GROUP  BY 1
-                                       ) t USING (day)
-                                    ORDER  BY day;""" % record.id)
-            return self._cr.dictfetchall()
-
-        def graph_of_current_year(record):
-            self._cr.execute("""select TRIM(TO_CHAR(DATE_TRUNC('month',month),'MONTH')),sum(amount_untaxed) from
-                                        (
-                                        SELECT 
-                                          DATE_TRUNC('month',date(day)) as month,
-                                          0 as amount_untaxed
-                                        FROM generate_series(date(date_trunc('year', (current_date)))
-                                            , date(date_trunc('year', (current_date)) + interval '1 YEAR - 1 day')
-                                            , interval  '1 MONTH') day
-                                        union all
-                                        SELECT DATE_TRUNC('month',date(date_order)) as month,
-                                        sum(amount_untaxed) as amount_untaxed
-                                          FROM   sale_order
-                                        WHERE  date(date_order) >= (select date_trunc('year', date(current_date))) AND date(date_order)::date <= (select date_trunc('year', date(current_date)) + '1 YEAR - 1 day')
-                                        and woo_instance_id = %s and state in ('sale','done')
-                                        group by DATE_TRUNC('month',date(date_order))
-                                        order by month
-                                        )foo 
-                                        GROUP  BY foo.month
-                                        order by foo.month""" % record.id)
-            return self._cr.dictfetchall()
-
-        def graph_of_current_month(record):
-            self._cr.execute("""select EXTRACT(DAY from date(date_day)) :: integer,sum(amount_untaxed) from (
-                            SELECT 
-                              day::date as date_day,
-                              0 as amount_untaxed
-                            FROM generate_series(date(date_trunc('month', (current_date)))
-                                , date(date_trunc('month', (current_date)) + interval '1 MONTH - 1 day')
-                                , interval  '1 day') day
-                            union all
-                            SELECT date(date_order)::date AS date_day,
-                            sum(amount_untaxed) as amount_untaxed
-                              FROM   sale_order
-                            WHERE  date(date_order) >= (select date_trunc('month', date(current_date)))
-                            AND date(date_order)::date <= (select date_trunc('month', date(current_date)) + '1 MONTH - 1 day')
-                            and woo_instance_id = %s and state in ('sale','done')
-                            group by 1
-                            )foo 
-                            GROUP  BY 1
-                            ORDER  BY 1""" % record.id)
-            return self._cr.dictfetchall()
-
-        def graph_of_all_time(record):
-            self._cr.execute("""select TRIM(TO_CHAR(DATE_TRUNC('month',date_order),'YYYY-MM')),sum(amount_untaxed)
-                                    from sale_order where woo_instance_id = %s and state in ('sale','done')
-                                    group by DATE_TRUNC('month',date_order) order by DATE_TRUNC('month',date_order)""" %
-                             record.id)
-            return self._cr.dictfetchall()
-
-        # Prepare values for Graph
-        if self._context.get('sort') == 'week':
-            result = get_current_week_date(record)
-        elif self._context.get('sort') == "month":
-            result = graph_of_current_month(record)
-        elif self._context.get('sort') == "year":
-            result = graph_of_current_year(record)
-        else:
-            result = graph_of_all_time(record)
-        values = [{"x": ("{}".format(data.get(list(data.keys())[0]))), "y": data.get('sum') or 0.0} for data in result]
-        return values
-
-    def get_compare_data(self, record):
-        """
-        :param record: woo instance
-        :return: datatype > 'positive' or 'negative', comparison value
-        """
-        data_type = False
-        total_percentage = 0.0
-
-        def get_compared_week_data(record):
-            current_total = 0.0
-            previous_total = 0.0
-            day_of_week = date.weekday(date.today())
-            self._cr.execute("""select sum(amount_untaxed) as current_week from sale_order
-                                    where date(date_order) >= (select date_trunc('week', date(current_date))) and 
-                                    woo_instance_id=%s and state in ('sale','done')""" % record.id)
-            current_week_data = self._cr.dictfetchone()
-            if current_week_data:
-                current_total = current_week_data.get('current_week') if current_week_data.get('current_week') else 0
-            # Previous week data
-            self._cr.execute("""select sum(amount_untaxed) as previous_week from sale_order
-                                where date(date_order) between (select date_trunc('week', current_date) - interval '7 day') 
-                                and (select date_trunc('week', (select date_trunc('week', current_date) - interval '7 
-                                day')) + interval '%s day')
-                                and woo_instance_id=%s and state in ('sale','done')
-                                """ % (day_of_week, record.id))
-            previous_week_data = self._cr.dictfetchone()
-            if previous_week_data:
-                previous_total = previous_week_data.get('previous_week') if previous_week_data.get(
-                    'previous_week') else 0
-            return current_total, previous_total
-
-        def get_compared_month_data(record):
-            current_total = 0.0
-            previous_total = 0.0
-            day_of_month = date.today().day - 1
-            self._cr.execute("""select sum(amount_untaxed) as current_month from sale_order
-                                    where date(date_order) >= (select date_trunc('month', date(current_date)))
-                                    and woo_instance_id=%s and state in ('sale','done')""" % record.id)
-            current_data = self._cr.dictfetchone()
-            if current_data:
-                current_total = current_data.get('current_month') if current_data.get('current_month') else 0
-            # Previous week data
-            self._cr.execute("""select sum(amount_untaxed) as previous_month from sale_order where date(date_order)
-                                between (select date_trunc('month', current_date) - interval '1 month') and 
-                                (select date_trunc('month', (select date_trunc('month', current_date) - interval '1 
-                                month')) + interval '%s days')
-                                and woo_instance_id=%s and state in ('sale','done')
-                                """ % (day_of_month, record.id))
-            previous_data = self._cr.dictfetchone()
-            if previous_data:
-                previous_total = previous_data.get('previous_month') if previous_data.get('previous_month') else 0
-            return current_total, previous_total
-
-        def get_compared_year_data(record):
-            current_total = 0.0
-            previous_total = 0.0
-            year_begin = date.today().replace(month=1, day=1)
-            year_end = date.today()
-            delta = (year_end - year_begin).days - 1
-            self._cr.execute("""select sum(amount_untaxed) as current_year from sale_order
-                                    where date(date_order) >= (select date_trunc('year', date(current_date))) 
-                                    and woo_instance_id=%s and state in ('sale','done')""" % record.id)
-            current_data = self._cr.dictfetchone()
-            if current_data:
-                current_total = current_data.get('current_year') if current_data.get('current_year') else 0
-            # Previous week data
-            self._cr.execute("""select sum(amount_untaxed) as previous_year from sale_order where date(date_order)
-                                between (select date_trunc('year', date(current_date) - interval '1 year')) and 
-                                (select date_trunc('year', date(current_date) - interval '1 year') + interval '%s days') 
-                                and woo_instance_id=%s and state in ('sale','done')
-                                """ % (delta, record.id))
-            previous_data = self._cr.dictfetchone()
-            if previous_data:
-                previous_total = previous_data.get('previous_year') if previous_data.get('previous_year') else 0
-            return current_total, previous_total
-
-        if self._context.get('sort') == 'week':
-            current_total, previous_total = get_compared_week_data(record)
-        elif self._context.get('sort') == "month":
-            current_total, previous_total = get_compared_month_data(record)
-        elif self._context.get('sort') == "year":
-            current_total, previous_total = get_compared_year_data(record)
-        else:
-            current_total, previous_total = 0.0, 0.0
-        if current_total > 0.0:
-            if current_total >= previous_total:
-                data_type = 'positive'
-                total_percentage = (current_total - previous_total) * 100 / current_total
-            if previous_total > current_total:
-                data_type = 'negative'
-                total_percentage = (previous_total - current_total) * 100 / current_total
-        return data_type, round(total_percentage, 2)
-
-    def get_total_orders(self):
-        """
-        Use: To get the list of woo sale orders month wise or year wise
+        Use: To add the current week, month or year of the dashboard in the domain of dashboard action.
+        :param domain: Domain of the dashboard action.
+        :param date_field: Date field on which the period is applied.
+        :return: Domain
+        """
+        period_start = self.env['sale.dashboard.rollup.ept'].get_dashboard_period_start(self._context.get('sort'))
+        if period_start:
+            domain.append((date_field, '>=', period_start))
+        return domain
+
+    def get_total_orders(self, count=None):
+        """
+        Use: To get the woo sale orders of current week, month, year or all time
         Task: 167063
         Added by: Preet Bhatti @Emipro Technologies
         Added on: 29/10/20
-        :return: total number of woo sale orders ids and action for sale orders of current instance
-        """
-        order_query = """select id from sale_order where woo_instance_id= %s and state in ('sale','done')""" % self.id
-
-        def orders_of_current_week(order_query):
-            qry = order_query + " and date(date_order) >= (select date_trunc('week', date(current_date))) order by " \
-                                "date(date_order)"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def orders_of_current_month(order_query):
-            qry = order_query + " and date(date_order) >= (select date_trunc('month', date(current_date))) order by " \
-                                "date(date_order)"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def orders_of_current_year(order_query):
-            qry = order_query + " and date(date_order) >= (select date_trunc('year', date(current_date))) order by " \
-                                "date(date_order)"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def orders_of_all_time(record):
-            self._cr.execute("""select id from sale_order where woo_instance_id = %s and state in ('sale','done')"""
-                             % record.id)
-            return self._cr.dictfetchall()
-
-        order_data = {}
-        if self._context.get('sort') == "week":
-            result = orders_of_current_week(order_query)
-        elif self._context.get('sort') == "month":
-            result = orders_of_current_month(order_query)
-        elif self._context.get('sort') == "year":
-            result = orders_of_current_year(order_query)
-        else:
-            result = orders_of_all_time(self)
-        order_ids = [data.get('id') for data in result]
+        :param count: Order count when it is already known from the dashboard rollup.
+        :return: total number of woo sale orders and action for sale orders of current instance
+        """
+        domain = self._get_dashboard_period_domain([('woo_instance_id', '=', self.id),
+                                                    ('state', 'in', ['sale', 'done'])])
         view = self.env.ref('woo_commerce_ept.action_woo_orders').sudo().read()[0]
-        action = self.prepare_action(view, [('id', 'in', order_ids)])
-        order_data.update({'order_count': len(order_ids), 'order_action': action})
-        return order_data
+        action = self.prepare_action(view, domain)
+        if count is None:
+            count = self.env['sale.order'].search_count(domain)
+        return {'order_count': count, 'order_action': action}
 
-    def get_shipped_orders(self):
+    def get_shipped_orders(self, count=None):
         """
-        Use: To get the list of woo shipped orders month wise or year wise
+        Use: To get the woo shipped orders of current week, month, year or all time
         Task: 167063
         Added by: Preet Bhatti @Emipro Technologies
         Added on: 29/10/20
-        :return: total number of Woo shipped orders ids and action for shipped orders of current instance
-        """
-        shipped_query = """select so.id from stock_picking sp
-                                 inner join sale_order so on so.procurement_group_id=sp.group_id inner 
-                                 join stock_location on stock_location.id=sp.location_dest_id and stock_location.usage='customer' 
-                                 where sp.updated_in_woo = True and sp.state != 'cancel' and 
-                                 so.woo_instance_id=%s""" % self.id
-
-        def shipped_order_of_current_week(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('week', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_current_month(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('month', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_current_year(shipped_query):
-            qry = shipped_query + " and date(so.date_order) >= (select date_trunc('year', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def shipped_order_of_all_time(shipped_query):
-            self._cr.execute(shipped_query)
-            return self._cr.dictfetchall()
-
-        order_data = {}
-        if self._context.get('sort') == "week":
-            result = shipped_order_of_current_week(shipped_query)
-        elif self._context.get('sort') == "month":
-            result = shipped_order_of_current_month(shipped_query)
-        elif self._context.get('sort') == "year":
-            result = shipped_order_of_current_year(shipped_query)
-        else:
-            result = shipped_order_of_all_time(shipped_query)
-        order_ids = [data.get('id') for data in result]
+        :param count: Shipped order count when it is already known from the dashboard rollup.
+        :return: total number of Woo shipped orders and action for shipped orders of current instance
+        """
+        domain = self._get_dashboard_period_domain([('woo_instance_id', '=', self.id),
+                                                    ('woo_is_shipped', '=', True)])
         view = self.env.ref('woo_commerce_ept.action_woo_orders').sudo().read()[0]
-        action = self.prepare_action(view, [('id', 'in', order_ids)])
-        order_data.update({'order_count': len(order_ids), 'order_action': action})
-        return order_data
+        action = self.prepare_action(view, domain)
+        if count is None:
+            count = self.env['sale.order'].search_count(domain)
+        return {'order_count': count, 'order_action': action}
 
     def get_total_products(self):
         """
@@ -688,62 +455,30 @@ class WooInstanceEpt(models.Model):
         Task: 167349
         Added by: Preet Bhatti @Emipro Technologies
         Added on: 31/10/20
-        :return: total number of customer ids and action for customers
+        :return: total number of customers and action for customers
         """
-        customer_data = {}
-        self._cr.execute("""select partner_id from woo_res_partner_ept where woo_instance_id = %s"""
-                         % self.id)
-        result = self._cr.dictfetchall()
-        customer_ids = [data.get('partner_id') for data in result]
+        domain = [('woo_res_partner_ids.woo_instance_id', '=', self.id), ('active', 'in', [True, False])]
         view = self.env.ref('woo_commerce_ept.action_woo_partner').sudo().read()[0]
-        action = self.prepare_action(view, [('id', 'in', customer_ids), ('active', 'in', [True, False])])
-        customer_data.update({'customer_count': len(customer_ids), 'customer_action': action})
-        return customer_data
+        action = self.prepare_action(view, domain)
+        customer_count = self.env['res.partner'].with_context(active_test=False).search_count(domain)
+        return {'customer_count': customer_count, 'customer_action': action}
 
-    def get_refund(self):
+    def get_refund(self, count=None):
         """
-        Use: To get the list of refund orders of Woo instance for current Woo instance
+        Use: To get the refunds of Woo instance of current week, month, year or all time
         Task: 167349
         Added by: Preet Bhatti @Emipro Technologies
         Added on: 03/11/20
-        :return: total number of refund order ids and action for customers
-        """
-        refund_query = """select id from account_move where woo_instance_id=%s and move_type='out_refund'""" % self.id
-
-        def refund_of_current_week(refund_query):
-            qry = refund_query + " and date(invoice_date) >= (select date_trunc('week', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def refund_of_current_month(refund_query):
-            qry = refund_query + " and date(invoice_date) >= (select date_trunc('month', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def refund_of_current_year(refund_query):
-            qry = refund_query + " and date(invoice_date) >= (select date_trunc('year', date(current_date)))"
-            self._cr.execute(qry)
-            return self._cr.dictfetchall()
-
-        def refund_of_all_time(refund_query):
-            self._cr.execute(refund_query)
-            return self._cr.dictfetchall()
-
-        refund_data = {}
-        if self._context.get('sort') == "week":
-            result = refund_of_current_week(refund_query)
-        elif self._context.get('sort') == "month":
-            result = refund_of_current_month(refund_query)
-        elif self._context.get('sort') == "year":
-            result = refund_of_current_year(refund_query)
-        else:
-            result = refund_of_all_time(refund_query)
-        refund_ids = [data.get('id') for data in result]
+        :param count: Refund count when it is already known from the dashboard rollup.
+        :return: total number of refunds and action for refunds
+        """
+        domain = self._get_dashboard_period_domain([('woo_instance_id', '=', self.id),
+                                                    ('move_type', '=', 'out_refund')], 'date')
         view = self.env.ref('woo_commerce_ept.action_refund_woo_invoices_ept').sudo().read()[0]
-        # [('woo_instance_id', '=', record_id)]
-        action = self.prepare_action(view, [('id', 'in', refund_ids)])
-        refund_data.update({'refund_count': len(refund_ids), 'refund_action': action})
-        return refund_data
+        action = self.prepare_action(view, domain)
+        if count is None:
+            count = self.env['account.move'].search_count(domain)
+        return {'refund_count': count, 'refund_action': action}
 
     def prepare_action(self, view, domain):
         """
@@ -1102,8 +837,12 @@ class WooInstanceEpt(models.Model):
         host = self.woo_host
         consumer_key = self.woo_consumer_key
         consumer_secret = self.woo_consumer_secret
+        cassette = self.get_api_cassette_ept()
+        # Replayed requests are not sent to the store, so they are not limited.
+        rate_limiter = self.get_api_rate_limiter_ept() if not cassette or cassette.mode != 'replay' else None
         wc_api = woocommerce.api.API(url=host, consumer_key=consumer_key, consumer_secret=consumer_secret,
-                                     verify_ssl=self.woo_verify_ssl, version=self.woo_version, query_string_auth=True)
+                                     verify_ssl=self.woo_verify_ssl, version=self.woo_version, query_string_auth=True,
+                                     cassette=cassette, rate_limiter=rate_limiter)
         return wc_api
 
     def confirm(self):
@@ -11,7 +11,7 @@ class WooOrderDataQueueEpt(models.Model):
     """
     _name = "woo.order.data.queue.ept"
     _description = "WooCommerce Order Data Queue"
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'queue.lease.mixin.ept']
 
     name = fields.Char(help="Sequential name of imported order.", copy=False)
     instance_id = fields.Many2one("woo.instance.ept", copy=False,
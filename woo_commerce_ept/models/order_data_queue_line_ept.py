@@ -19,6 +19,10 @@ class WooOrderDataQueueLineEpt(models.Model):
     _name = "woo.order.data.queue.line.ept"
     _description = "WooCommerce Order Data Queue Line"
     _rec_name = "number"
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_payload_field = "order_data"
+    _archive_entity_field = "woo_order"
+    _archive_instance_field = "instance_id"
 
     order_data_queue_id = fields.Many2one("woo.order.data.queue.ept", ondelete="cascade")
     instance_id = fields.Many2one(related="order_data_queue_id.instance_id", copy=False,
@@ -62,8 +66,10 @@ class WooOrderDataQueueLineEpt(models.Model):
         woo_order_data_queue_obj = self.env["woo.order.data.queue.ept"]
         start = time.time()
 
+        # Reset only the queues of crashed workers, queues leased by other running workers are still in process.
         self.env.cr.execute(
-            """update woo_order_data_queue_ept set is_process_queue = False where is_process_queue = True""")
+            """update woo_order_data_queue_ept set is_process_queue = False where is_process_queue = True
+            and (lease_expire_at is null or lease_expire_at < (now() at time zone 'UTC'))""")
         self._cr.commit()
         query = """select queue.id from woo_order_data_queue_line_ept as queue_line
                 inner join woo_order_data_queue_ept as queue on queue_line.order_data_queue_id = queue.id
@@ -80,9 +86,13 @@ class WooOrderDataQueueLineEpt(models.Model):
             order_queue_process_cron_time = order_queues.instance_id.get_woo_cron_execution_time(
                 "woo_commerce_ept.process_woo_order_data_queue")
             for order_queue_id in order_queues:
+                # Skip the queue if another worker is processing it.
+                if not order_queue_id.claim_queue_lease_ept(lease_duration=order_queue_process_cron_time):
+                    continue
                 order_queue_lines = order_queue_id.order_data_queue_line_ids.filtered(lambda x: x.state == "draft")
                 order_queue_id.queue_process_count += 1
                 if order_queue_id.queue_process_count > 3:
+                    order_queue_id.release_queue_lease_ept()
                     order_queue_id.is_action_require = True
                     note = "<p>Attention %s queue is processed 3 times you need to process it manually.</p>" % (
                         order_queue_id.name)
@@ -94,6 +104,8 @@ class WooOrderDataQueueLineEpt(models.Model):
                 self._cr.commit()
                 if order_queue_lines:
                     order_queue_lines.process_order_queue_line()
+                order_queue_id.release_queue_lease_ept()
+                self._cr.commit()
                 if time.time() - start > order_queue_process_cron_time - 60:
                     break
         return True
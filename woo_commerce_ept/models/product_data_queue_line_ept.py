@@ -12,6 +12,12 @@ _logger = logging.getLogger("WooCommerce")
 class WooProductDataQueueLineEpt(models.Model):
     _name = "woo.product.data.queue.line.ept"
     _description = 'WooCommerce Product Data Queue Line'
+    _inherit = "queue.payload.archive.mixin.ept"
+    _archive_payload_field = "woo_synced_data"
+    _archive_entity_field = "woo_synced_data_id"
+    _archive_instance_field = "woo_instance_id"
+    # Payload of done lines is used to import the images later.
+    _archive_where_clause = "AND image_import_state = 'done'"
 
     woo_instance_id = fields.Many2one('woo.instance.ept', string='Instance')
     state = fields.Selection([('draft', 'Draft'), ('failed', 'Failed'),
@@ -1801,6 +1801,7 @@ class WooProductTemplateEpt(models.Model):
         template_images_updated = False
         template_updated = False
         product_dict = {}
+        variant_prices, variant_sale_prices = {}, {}
 
         template_info = self.prepare_template_vals(woo_instance, product_response)
         available_woo_products, available_odoo_products, odoo_template = self.available_woo_odoo_products(
@@ -1910,10 +1911,9 @@ class WooProductTemplateEpt(models.Model):
             update_price = woo_instance.sync_price_with_product
             update_images = woo_instance.sync_images_with_product
             if update_price:
-                woo_instance.woo_pricelist_id.set_product_price_ept(woo_product.product_id.id, variant_price)
-                if woo_instance.woo_extra_pricelist_id:
-                    woo_instance.woo_extra_pricelist_id.set_product_price_ept(woo_product.product_id.id,
-                                                                              variant_sale_price)
+                # Prices of the variants are set together after the loop.
+                variant_prices[woo_product.product_id.id] = variant_price
+                variant_sale_prices[woo_product.product_id.id] = variant_sale_price
             if update_images and isinstance(product_queue_id, str) and product_queue_id == 'from Order':
                 if not woo_template.product_tmpl_id.image_1920:
                     product_dict.update(
@@ -1921,6 +1921,9 @@ class WooProductTemplateEpt(models.Model):
                 self.update_product_images(product_response["images"], variant["image"], woo_template, woo_product,
                                            template_images_updated, product_dict)
                 template_images_updated = True
+        woo_instance.woo_pricelist_id.set_product_prices_ept(variant_prices)
+        if woo_instance.woo_extra_pricelist_id:
+            woo_instance.woo_extra_pricelist_id.set_product_prices_ept(variant_sale_prices)
         return woo_template
 
     def simple_product_sync(self, woo_instance, product_response, common_log_book_id, product_queue_id,
@@ -14,6 +14,7 @@ class ResPartner(models.Model):
 
     is_woo_customer = fields.Boolean(string="Is Woo Customer?",
                                      help="Used for identified that the customer is imported from WooCommerce store.")
+    woo_res_partner_ids = fields.One2many("woo.res.partner.ept", "partner_id", "Woo Customers")
 
     def woo_check_proper_response(self, response, common_log_id):
         """
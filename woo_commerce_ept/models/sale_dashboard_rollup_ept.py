@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# See LICENSE file for full copyright and licensing details.
+from odoo import models, fields
+
+WOO_ROLLUP_QUERIES = [
+    ('so.date_order', """
+        SELECT so.woo_instance_id AS instance_id, date(so.date_order) AS rollup_date, count(so.id) AS order_count,
+            sum(so.amount_untaxed) AS amount_untaxed
+            FROM sale_order AS so
+            WHERE so.woo_instance_id IS NOT NULL AND so.state in ('sale', 'done') {day_clause}
+            GROUP BY 1, 2
+    """),
+    ('so.date_order', """
+        SELECT so.woo_instance_id AS instance_id, date(so.date_order) AS rollup_date,
+            count(DISTINCT so.id) AS shipped_order_count
+            FROM stock_picking AS sp
+                JOIN sale_order AS so
+                    ON so.procurement_group_id = sp.group_id
+                JOIN stock_location AS sl
+                    ON sl.id = sp.location_dest_id AND sl.usage = 'customer'
+            WHERE sp.updated_in_woo = True AND sp.state != 'cancel' AND so.woo_instance_id IS NOT NULL {day_clause}
+            GROUP BY 1, 2
+    """),
+    ('am.date', """
+        SELECT am.woo_instance_id AS instance_id, am.date AS rollup_date, count(am.id) AS refund_count
+            FROM account_move AS am
+            WHERE am.move_type = 'out_refund' AND am.woo_instance_id IS NOT NULL {day_clause}
+            GROUP BY 1, 2
+    """),
+]
+
+WOO_ROLLUP_DIRTY_DAY_QUERY = """
+    SELECT date(date_order) FROM sale_order
+        WHERE woo_instance_id IS NOT NULL AND write_date >= %(last_sync)s
+    UNION
+    SELECT date(so.date_order) FROM stock_picking AS sp
+        JOIN sale_order AS so ON so.procurement_group_id = sp.group_id
+        WHERE sp.woo_instance_id IS NOT NULL AND sp.write_date >= %(last_sync)s
+    UNION
+    SELECT date FROM account_move
+        WHERE move_type = 'out_refund' AND woo_instance_id IS NOT NULL AND write_date >= %(last_sync)s
+"""
+
+
+class SaleDashboardRollupEpt(models.Model):
+    _inherit = "sale.dashboard.rollup.ept"
+
+    woo_instance_id = fields.Many2one("woo.instance.ept", "Woo Instance", ondelete="cascade", index=True)
+
+    def update_woo_dashboard_rollup(self):
+        """
+        This method is called by cron to recompute the Woo dashboard rollup of the days changed since the last run.
+        """
+        return self.update_dashboard_rollup('woo_instance_id', WOO_ROLLUP_QUERIES, WOO_ROLLUP_DIRTY_DAY_QUERY)
+
+    def rebuild_woo_dashboard_rollup(self):
+        """
+        This method is used to recompute the whole Woo dashboard rollup.
+        """
+        return self.rebuild_dashboard_rollup('woo_instance_id', WOO_ROLLUP_QUERIES)
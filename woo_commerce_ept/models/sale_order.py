@@ -9,6 +9,8 @@ import pytz
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 from odoo.tools.misc import split_every, format_date
+from odoo.addons.common_connector_library.models.queue_stage_timing_ept import time_queue_line_ept, \
+    queue_stage_ept
 
 _logger = logging.getLogger("WooCommerce")
 
@@ -63,6 +65,29 @@ class SaleOrder(models.Model):
         order_ids = list(set(order_ids))
         return [('id', 'in', order_ids)]
 
+    def _compute_woo_is_shipped(self):
+        """
+        Compute woo_is_shipped of order, it is shipped when a picking of its procurement group which is updated in
+        WooCommerce is delivered to the customer.
+        """
+        for order in self:
+            pickings = self.env["stock.picking"].search([("group_id", "=", order.procurement_group_id.id)]) \
+                if order.procurement_group_id else self.env["stock.picking"]
+            order.woo_is_shipped = bool(pickings.filtered(
+                lambda x: x.updated_in_woo and x.state != "cancel" and x.location_dest_id.usage == "customer"))
+
+    def _search_woo_is_shipped(self, operator, value):
+        """
+        Search the shipped orders like the dashboard rollup, the pickings are matched by a sub query, so a single
+        picking must match all conditions and the ids of the orders are not kept in the domain.
+        """
+        query = """SELECT so.id FROM stock_picking AS sp
+                        JOIN sale_order AS so ON so.procurement_group_id = sp.group_id
+                        JOIN stock_location AS sl ON sl.id = sp.location_dest_id AND sl.usage = 'customer'
+                    WHERE sp.updated_in_woo = True AND sp.state != 'cancel'"""
+        is_shipped = (operator == "=") == bool(value)
+        return [("id", "inselect" if is_shipped else "not inselect", (query, []))]
+
     woo_order_id = fields.Char("Woo Order Reference", help="WooCommerce Order Reference", copy=False)
     woo_order_number = fields.Char("Order Number", help="WooCommerce Order Number", copy=False)
     woo_instance_id = fields.Many2one("woo.instance.ept", "Woo Instance", copy=False)
@@ -72,6 +97,10 @@ class SaleOrder(models.Model):
     woo_customer_ip = fields.Char("Customer IP", help="WooCommerce Customer IP Address", copy=False)
     updated_in_woo = fields.Boolean("Updated In woo", compute="_compute_woo_order_status",
                                     search="_search_woo_order_ids", copy=False)
+    woo_is_shipped = fields.Boolean("Shipped in WooCommerce", compute="_compute_woo_is_shipped",
+                                    search="_search_woo_is_shipped",
+                                    help="Order has a picking delivered to the customer which is updated in "
+                                         "WooCommerce.")
     canceled_in_woo = fields.Boolean("Canceled In WooCommerce", default=False, copy=False)
     woo_status = fields.Selection([("pending", "Pending"), ("processing", "Processing"),
                                    ("on-hold", "On hold"), ("completed", "Completed"),
@@ -537,14 +566,7 @@ class SaleOrder(models.Model):
                 name = "%s (%s %% included)" % (title, rate)
             else:
                 name = "%s (%s %% excluded)" % (title, rate)
-            tax_id = tax_obj.search([('name', '=ilike', name),
-                                     ("price_include", "=", tax_included),
-                                     ("type_tax_use", "=", "sale"), ("amount", "=", rate),
-                                     ("company_id", "=", woo_instance.company_id.id)], limit=1)
-            if not tax_id:
-                tax_id = tax_obj.search([("price_include", "=", tax_included),
-                                         ("type_tax_use", "=", "sale"), ("amount", "=", rate),
-                                         ("company_id", "=", woo_instance.company_id.id)], limit=1)
+            tax_id = tax_obj.find_sale_tax_ept(rate, tax_included, title=name, company=woo_instance.company_id)
             if not tax_id:
                 tax_id = self.sudo().create_woo_tax(tax, tax_included, woo_instance)
                 _logger.info('New tax %s created in Odoo.', tax_id.name)
@@ -803,7 +825,8 @@ class SaleOrder(models.Model):
     @api.model
     def create_woo_orders(self, queue_lines, common_log_book_id):
         """
-        This method used to create a order in Odoo base on the response.
+        This method used to create a order in Odoo base on the response. Each queue line is processed
+        in a savepoint and the lines are committed in batches.
         @param : self, queue_lines, common_log_book_id
         @return: new_orders
         @author: Haresh Mori @Emipro Technologies Pvt. Ltd on date 4 September 2020 .
@@ -811,108 +834,144 @@ class SaleOrder(models.Model):
         """
         new_orders = self
         woo_instance = False
-        commit_count = 0
         woo_taxes = {}
-        rate_percent = ""
+        queue_lines.order_data_queue_id.is_process_queue = True
+
+        with self.env['data.queue.mixin.ept'].get_queue_commit_batch_ept(
+                lease_records=queue_lines.order_data_queue_id) as batch:
+            for queue_line in queue_lines:
+                if woo_instance != queue_line.instance_id:
+                    woo_instance = queue_line.instance_id
+                    woo_taxes = {}
+                sale_order, error = batch.process_line(self.create_woo_order_from_queue_line, queue_line,
+                                                       common_log_book_id, woo_taxes)
+                if error:
+                    # Taxes created by the failed line are rolled back with it.
+                    woo_taxes = {}
+                    batch.write_line_values(queue_line, {'state': 'failed'})
+                    batch.add_log_line({'message': "Order %s could not be imported. %s" % (queue_line.number, error),
+                                        'order_ref': queue_line.number, 'log_book_id': common_log_book_id.id,
+                                        'woo_order_data_queue_line_id': queue_line.id})
+                elif sale_order:
+                    new_orders += sale_order
+                batch.commit_if_needed()
+        queue_lines.order_data_queue_id.is_process_queue = False
+        return new_orders
 
-        for queue_line in queue_lines:
-            commit_count += 1
-            if commit_count == 5:
-                queue_line.order_data_queue_id.is_process_queue = True
-                self._cr.commit()
-                commit_count = 0
-            if woo_instance != queue_line.instance_id:
-                woo_instance = queue_line.instance_id
-                woo_taxes = {}
+    def create_woo_order_from_queue_line(self, queue_line, common_log_book_id, woo_taxes):
+        """
+        This method used to create a order in Odoo from the queue line.
+        @param queue_line: Record of order queue line.
+        @param common_log_book_id: Record of log book.
+        @param woo_taxes: Dictionary of taxes of the instance, updated with the created taxes.
+        @return: Record of sale order or False.
+        """
+        with time_queue_line_ept(queue_line, queue_line.instance_id):
+            return self._create_woo_order_from_queue_line(queue_line, common_log_book_id, woo_taxes)
 
-            order_data = ast.literal_eval(queue_line.order_data)
-            queue_line.processed_at = fields.Datetime.now()
+    def _create_woo_order_from_queue_line(self, queue_line, common_log_book_id, woo_taxes):
+        """
+        This method creates the order of the queue line, time of each stage is recorded if stage timing is enabled.
+        @param queue_line: Record of order queue line.
+        @param common_log_book_id: Record of log book.
+        @param woo_taxes: Dictionary of taxes of the instance, updated with the created taxes.
+        @return: Record of sale order or False.
+        """
+        woo_instance = queue_line.instance_id
+        order_data = ast.literal_eval(queue_line.order_data)
+        queue_line.processed_at = fields.Datetime.now()
 
-            # WooCommerce Meta Mapping for import Unshipped/Shipped Orders
-            woo_operation = 'import_completed_orders' if queue_line.order_data_queue_id.queue_type == 'shipped' else 'import_unshipped_orders'
-            meta_mapping_ids = woo_instance.meta_mapping_ids.filtered(
-                lambda meta: meta.woo_operation == woo_operation)
-            operation_type = "import"
+        # WooCommerce Meta Mapping for import Unshipped/Shipped Orders
+        woo_operation = 'import_completed_orders' if queue_line.order_data_queue_id.queue_type == 'shipped' else 'import_unshipped_orders'
+        meta_mapping_ids = woo_instance.meta_mapping_ids.filtered(
+            lambda meta: meta.woo_operation == woo_operation)
+        operation_type = "import"
 
-            if str(woo_instance.import_order_after_date) > order_data.get("date_created_gmt"):
-                message = "Order %s is not imported in Odoo due to configuration mismatch.\n Received order date is " \
-                          "%s. \n Please check the order after date in WooCommerce configuration." \
-                          % (order_data.get('number'), order_data.get("date_created_gmt"))
-                _logger.info(message)
-                self.create_woo_log_lines(message, common_log_book_id, queue_line)
-                continue
+        if str(woo_instance.import_order_after_date) > order_data.get("date_created_gmt"):
+            message = "Order %s is not imported in Odoo due to configuration mismatch.\n Received order date is " \
+                      "%s. \n Please check the order after date in WooCommerce configuration." \
+                      % (order_data.get('number'), order_data.get("date_created_gmt"))
+            _logger.info(message)
+            self.create_woo_log_lines(message, common_log_book_id, queue_line)
+            return False
 
-            existing_order = self.search_existing_woo_order(woo_instance, order_data)
+        existing_order = self.search_existing_woo_order(woo_instance, order_data)
 
-            if existing_order:
-                queue_line.state = "done"
-                continue
+        if existing_order:
+            queue_line.state = "done"
+            return False
 
+        with queue_stage_ept(self.env, 'financial_status'):
             workflow_config = self.create_update_payment_gateway_and_workflow(order_data, woo_instance,
                                                                               common_log_book_id, queue_line)
-            if not workflow_config:
-                continue
+        if not workflow_config:
+            return False
 
+        with queue_stage_ept(self.env, 'partner'):
             partner, billing_partner, shipping_partner = self.woo_order_billing_shipping_partner(
                 order_data, woo_instance, queue_line, common_log_book_id)
-            if not partner:
-                continue
+        if not partner:
+            return False
 
-            if woo_instance.apply_tax == "create_woo_tax":
-                woo_taxes = self.woo_prepare_tax_data(order_data.get('tax_lines'), rate_percent, woo_taxes,
-                                                      queue_line, common_log_book_id, woo_instance, order_data)
-                if isinstance(woo_taxes, bool):
-                    continue
+        if woo_instance.apply_tax == "create_woo_tax":
+            with queue_stage_ept(self.env, 'tax'):
+                tax_data = self.woo_prepare_tax_data(order_data.get('tax_lines'), "", woo_taxes, queue_line,
+                                                     common_log_book_id, woo_instance, order_data)
+            if isinstance(tax_data, bool):
+                return False
+            woo_taxes.update(tax_data)
 
-            if partner and meta_mapping_ids and meta_mapping_ids.filtered(
-                    lambda meta: meta.model_id.model == partner._name):
-                record = partner
-                woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
-                                                                                          record)
+        if partner and meta_mapping_ids and meta_mapping_ids.filtered(
+                lambda meta: meta.model_id.model == partner._name):
+            record = partner
+            woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
+                                                                                      record)
 
+        with queue_stage_ept(self.env, 'order_create'):
             order_values = self.prepare_woo_order_vals(order_data, woo_instance, partner, billing_partner,
                                                        shipping_partner, workflow_config)
             sale_order = self.create(order_values)
-            tax_included = order_data.get("prices_include_tax")
+        tax_included = order_data.get("prices_include_tax")
 
+        with queue_stage_ept(self.env, 'order_lines'):
             order_lines = sale_order.create_woo_sale_order_lines(queue_line, order_data, tax_included,
                                                                  common_log_book_id, woo_taxes)
-            if not order_lines:
-                sale_order.unlink()
-                queue_line.state = "failed"
-                continue
+        if not order_lines:
+            sale_order.unlink()
+            queue_line.state = "failed"
+            return False
 
+        with queue_stage_ept(self.env, 'order_lines'):
             sale_order.woo_create_extra_lines(order_data, tax_included, woo_taxes)
 
+        with queue_stage_ept(self.env, 'workflow'):
             if sale_order.woo_status == 'completed':
                 sale_order.auto_workflow_process_id.with_context(
                     log_book_id=common_log_book_id.id).shipped_order_workflow_ept(sale_order)
             else:
                 sale_order.with_context(log_book_id=common_log_book_id.id).process_orders_and_invoices_ept()
 
-            service_product = [product for product in sale_order.order_line.product_id if
-                               product.detailed_type == 'service']
-            sale_order.is_service_woo_order = bool(service_product)
+        service_product = [product for product in sale_order.order_line.product_id if
+                           product.detailed_type == 'service']
+        sale_order.is_service_woo_order = bool(service_product)
 
-            if meta_mapping_ids and meta_mapping_ids.filtered(
-                    lambda meta: meta.model_id.model == self._name):
-                record = sale_order
-                woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
-                                                                                          record)
+        if meta_mapping_ids and meta_mapping_ids.filtered(
+                lambda meta: meta.model_id.model == self._name):
+            record = sale_order
+            woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
+                                                                                      record)
 
-            if meta_mapping_ids and meta_mapping_ids.filtered(
-                    lambda meta: meta.model_id.model == sale_order.picking_ids._name):
-                record = sale_order.picking_ids
-                woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
-                                                                                          record)
+        if meta_mapping_ids and meta_mapping_ids.filtered(
+                lambda meta: meta.model_id.model == sale_order.picking_ids._name):
+            record = sale_order.picking_ids
+            woo_instance.with_context(woo_operation=woo_operation).meta_field_mapping(order_data, operation_type,
+                                                                                      record)
 
-            new_orders += sale_order
-            queue_line.write({"sale_order_id": sale_order.id, "state": "done"})
-            message = "Sale order: %s and Woo order number: %s is created." % (sale_order.name,
-                                                                               order_data.get('number'))
-            _logger.info(message)
-        queue_lines.order_data_queue_id.is_process_queue = False
-        return new_orders
+        queue_line.write({"sale_order_id": sale_order.id, "state": "done"})
+        message = "Sale order: %s and Woo order number: %s is created." % (sale_order.name,
+                                                                           order_data.get('number'))
+        _logger.info(message)
+        return sale_order
 
     def search_existing_woo_order(self, woo_instance, order_data):
         """
@@ -1287,6 +1346,14 @@ class SaleOrder(models.Model):
 
         return False
 
+    def unlink(self):
+        """
+        This method is used to mark the days of the deleted Woo orders to recompute them in the dashboard rollup.
+        """
+        days = [order.date_order.date() for order in self if order.woo_instance_id and order.date_order]
+        self.env["sale.dashboard.rollup.ept"].mark_dashboard_rollup_days_ept("woo_instance_id", days)
+        return super(SaleOrder, self).unlink()
+
     def cancel_in_woo(self):
         """
         This method used to open a wizard to cancel order in WooCommerce.
@@ -15,3 +15,16 @@ class StockPicking(models.Model):
     is_woo_delivery_order = fields.Boolean("WooCommerce Delivery Order")
     woo_instance_id = fields.Many2one("woo.instance.ept", "Woo Instance")
     canceled_in_woo = fields.Boolean("Cancelled In woo", default=False)
+
+    def unlink(self):
+        """
+        This method is used to mark the order days of the deleted Woo pickings to recompute them in the dashboard
+        rollup. Orders are found from the procurement group like in the rollup.
+        """
+        orders = self.env["sale.order"]
+        if self.group_id:
+            orders = orders.search([("procurement_group_id", "in", self.group_id.ids),
+                                    ("woo_instance_id", "!=", False)])
+        days = [order.date_order.date() for order in orders if order.date_order]
+        self.env["sale.dashboard.rollup.ept"].mark_dashboard_rollup_days_ept("woo_instance_id", days)
+        return super(StockPicking, self).unlink()
@@ -9,9 +9,11 @@ __version__ = "2.1.1"
 __author__ = "Claudio Sanches @ Automattic"
 __license__ = "MIT"
 
-from requests import request
 from json import dumps as jsonencode
 from time import time
+from odoo.addons.common_connector_library.models.api_metric_ept import record_api_call_ept
+from odoo.addons.common_connector_library.models.api_cassette_ept import send_api_request_ept
+from odoo.addons.common_connector_library.models.api_rate_limit_ept import send_rate_limited_request_ept
 from .oauth import OAuth
 
 try:
@@ -33,6 +35,8 @@ class API(object):
         self.timeout = kwargs.get("timeout", 60)
         self.verify_ssl = kwargs.get("verify_ssl", True)
         self.query_string_auth = kwargs.get("query_string_auth", False)
+        self.cassette = kwargs.get("cassette")
+        self.rate_limiter = kwargs.get("rate_limiter")
 
     def __is_ssl(self):
         """ Check if url use HTTPS """
@@ -91,17 +95,31 @@ class API(object):
             data = jsonencode(data, ensure_ascii=False).encode('utf-8')
             headers["content-type"] = "application/json;charset=utf-8"
 
-        return request(
-            method=method,
-            url=url,
-            verify=self.verify_ssl,
-            auth=auth,
-            params=params,
-            data=data,
-            timeout=self.timeout,
-            headers=headers,
-            **kwargs
-        )
+        start = time()
+        try:
+            response = send_rate_limited_request_ept(
+                self.rate_limiter,
+                send_api_request_ept,
+                self.cassette,
+                http_method=method,
+                method=method,
+                url=url,
+                verify=self.verify_ssl,
+                auth=auth,
+                params=params,
+                data=data,
+                timeout=self.timeout,
+                headers=headers,
+                **kwargs
+            )
+        except Exception as error:
+            record_api_call_ept("woocommerce", self.url, endpoint, method, error=error, duration=time() - start,
+                                bytes_out=len(data or b""))
+            raise
+        record_api_call_ept("woocommerce", self.url, endpoint, method, status_code=response.status_code,
+                            duration=time() - start, bytes_in=len(response.content or b""),
+                            bytes_out=len(data or b""))
+        return response
 
     def get(self, endpoint, **kwargs):
         """ Get requests """